@@ -1,12 +1,50 @@
 """
 Example of execution:
-    python execute_Xruns.py -r 30 -s main_sat_analysis.py -a "-fm fm_models/fms/Pizzas_complex.uvl -s g3"
+    python execute_Xruns.py -r 30 -d models/UNED/dimacs -s cadical153,minisat22,sat4j
+
+With 4 parallel slots of long-lived analysis workers, each one recycled after 50 jobs:
+    python execute_Xruns.py -r 30 -d models/UNED/dimacs -w 4 --max-jobs 50
+
+The completed runs are kept in the store (result_2024.jsonl), so running the
+same command again resumes the campaign where it stopped.
+
+Keeping the partial results of the analyses that reach the timeout, so that
+running the campaign again resumes them instead of recording a timeout:
+    python execute_Xruns.py -r 30 -d models/UNED/dimacs --partial-dir partial
+
+Sharing the campaign among several hosts: a coordinator hands out the tasks and
+keeps the store, and each host joins it with its own slots (the hosts need the
+models at the same paths, relative to their working directory). The coordinator
+listens on 127.0.0.1 unless --host is given, and only serves the workers with
+its token (--token, or the COORDINATOR_TOKEN environment variable):
+    export COORDINATOR_TOKEN=...
+    python execute_Xruns.py -r 30 -d models/UNED/dimacs --coordinator 5000 --host 0.0.0.0
+    python execute_Xruns.py --join coordinator-host:5000 -w 4
+
+Using every core without losing the precision of the timings: each slot pinned
+to its own CPU (with the hyperthread siblings left idle), and the runs that
+deviate more than 20% from the median of the model and solver run again:
+    python execute_Xruns.py -r 30 -d models/UNED/dimacs -w 8 --idle-siblings --rerun-threshold 0.2
 """
 import os
-import traceback
+import json
+import secrets
+import queue
+import socket
+import select
 import argparse
+import itertools
 import subprocess
 import locale
+import dataclasses
+from typing import Any, Callable, Iterator, Optional
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+
+from utils.campaign import ResultsStore, Task, order_longest_first, pending_tasks
+from utils.coordinator import COORDINATOR_TOKEN, DEFAULT_HOST, LEASE_SECONDS, Coordinator, parse_address, run_leased_tasks
+from utils.noise_control import MAX_RERUNS, CoreSetPool, VarianceCheck, get_core_sets, pin_runner, pinned_command, run_pinned
+from utils.results import parse_result_row, read_results
 
 
 PYTHON = 'python3'
@@ -15,8 +53,13 @@ OUTPUT_FILE = 'result_2024.csv'
 ALREADY_ANALYZED_RESULTS = 'result_analyzed_2024.csv'
 SCRIPT_PYTHON = 'main_sat_analysis.py'
 SCRIPT_JAVA = 'fide_sat_analysis.jar'
+STORE_FILE = 'result_2024.jsonl'
+JAVA_TOOL_NAME = 'FeatureIDE'
 COLUMNS_VALUES = [3]
 TIMEOUT = 3600
+DEADLINE_FRACTION = 0.95  # of the timeout, so that the analysis reports its partial result before being killed
+SOLVERS = ['cadical153', 'minisat22', 'sat4j']
+JAVA_SOLVERS = ['sat4j']
 
 def get_fm_filepath_models(dir: str) -> list[str]:
     """Get all models from the given directory."""
@@ -28,126 +71,399 @@ def get_fm_filepath_models(dir: str) -> list[str]:
     return sorted(models)
 
 
-def main(runs: int, filepath: str, solver_name: str, command: list[str]) -> None:
-    # Get path and filename
-    path, filename = os.path.split(filepath)
-    filename = '.'.join(filename.split('.')[:-1])
+def get_tasks(dir: str, solver_names: list[str], runs: int) -> list[Task]:
+    """Runs of the models of the folder with each solver, avoiding the models analyzed in previous campaigns."""
+    analyzed_models = set()
+    if os.path.exists(ALREADY_ANALYZED_RESULTS):
+        analyzed_models = {row.model for row in read_results(ALREADY_ANALYZED_RESULTS)}
+    tasks = []
+    for filepath in get_fm_filepath_models(dir):
+        for solver_name in solver_names:
+            for i in range(1, runs + 1):
+                task = Task(filepath, solver_name, i)
+                if task.model not in analyzed_models:
+                    tasks.append(task)
+    return tasks
+
+
+class AnalysisWorker:
+    """A long-lived `main_sat_analysis.py --worker` process that runs one job at a time.
+
+    The process is recycled (killed and lazily restarted) after a timeout, after
+    dying, or after `max_jobs` jobs (0 for no limit). With `cpus`, the process
+    is pinned to them.
+    """
+
+    def __init__(self, max_jobs: int = 0, cpus: Optional[list[int]] = None) -> None:
+        self.max_jobs = max_jobs
+        self.cpus = cpus
+        self.jobs = 0
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        command = [PYTHON, SCRIPT_PYTHON, '--worker']
+        self.process = subprocess.Popen(args=command if self.cpus is None else pinned_command(command, self.cpus),
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, encoding='utf8')
+        self.jobs = 0
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def run(self, job: dict[str, Any], timeout: float) -> dict[str, Any]:
+        """Send a job to the worker and wait for its result."""
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        self.process.stdin.write(json.dumps(job) + '\n')
+        self.process.stdin.flush()
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            self.stop()
+            raise subprocess.TimeoutExpired(cmd=SCRIPT_PYTHON, timeout=timeout)
+        line = self.process.stdout.readline()
+        if not line:
+            self.stop()
+            raise RuntimeError(f'Analysis worker died with job: {job}')
+        self.jobs += 1
+        if self.max_jobs and self.jobs >= self.max_jobs:
+            self.stop()
+        return json.loads(line)
+
 
-    #results = []
-    print(f'Executing {runs} runs for model {filepath} with solver {solver_name}:')
-    for i in range(1, runs + 1):
-        print(f'{i} ', end='', flush=True)
+class AnalysisWorkerPool:
+    """Keep a pool of analysis workers busy with jobs submitted from the main thread.
+
+    With core sets (one per worker), each worker is pinned to its own.
+    """
+
+    def __init__(self, size: int, max_jobs: int = 0, core_sets: Optional[list[list[int]]] = None) -> None:
+        self.workers = [AnalysisWorker(max_jobs, core_sets[i] if core_sets is not None else None) for i in range(size)]
+        self.idle_workers: queue.Queue = queue.Queue()
+        for worker in self.workers:
+            self.idle_workers.put(worker)
+        self.executor = ThreadPoolExecutor(max_workers=size)
+
+    def submit(self, job: dict[str, Any], timeout: float = TIMEOUT) -> Future:
+        return self.executor.submit(self.run, job, timeout)
+
+    def run(self, job: dict[str, Any], timeout: float) -> dict[str, Any]:
+        with self.reserve() as worker:
+            return worker.run(job, timeout)
+
+    @contextmanager
+    def reserve(self) -> Iterator[AnalysisWorker]:
+        """An idle worker, kept busy (e.g., so that a process can use its CPUs) until the block exits."""
+        worker = self.idle_workers.get()
         try:
-            process = subprocess.run(args=command, stdout=subprocess.PIPE, timeout=TIMEOUT) #, stderr=subprocess.DEVNULL)
-            result = process.stdout.decode(locale.getlocale()[1])
-            print(result)
-            # Parse result:
-            result_split = [l for l in result.split(os.linesep) if l]
-            header = result_split[-2]
-            res = result_split[-1]
-
-            with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
-                file.write(f'{res}{os.linesep}')
-
-        except subprocess.TimeoutExpired as e:
-            print(f'Timeout for model: {filepath}')
-            with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
-                res = [';'.join([filename, TOOL_NAME, solver_name, '-1', '-1', 'timeout'])]
-                file.write(f"{res}{os.linesep}")
-            return None
-        except Exception as e:
-            print(f'Other exception: {e}')
+            yield worker
+        finally:
+            self.idle_workers.put(worker)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for worker in self.workers:
+            worker.stop()
+
+    def __enter__(self) -> 'AnalysisWorkerPool':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def get_partial_filepath(task: Task, partial_dir: Optional[str]) -> Optional[str]:
+    """File with the partial result of the analysis of the model with the solver, if they are kept."""
+    if partial_dir is None or task.solver in JAVA_SOLVERS:
+        return None
+    return os.path.join(partial_dir, f'{task.model}.{task.solver}.json')
+
+
+def get_command(task: Task, timeout: Optional[float] = None, partial_filepath: Optional[str] = None) -> list[str]:
+    if task.solver in JAVA_SOLVERS:
+        return ['java', '-jar', SCRIPT_JAVA, task.filepath]
+    command = [PYTHON, SCRIPT_PYTHON, '-fm', task.filepath, '-s', task.solver]
+    if partial_filepath is not None:
+        command += ['-t', str(timeout * DEADLINE_FRACTION), '--resume', partial_filepath]
+    return command
+
+
+def run_process(task: Task, timeout: float, partial_filepath: Optional[str] = None, cpus: Optional[list[int]] = None) -> dict[str, Any]:
+    """Run the task in a new process and parse the result from the last line of its output.
+
+    With `cpus`, the process is pinned to them and its counters (context
+    switches, migrations) are returned too.
+    """
+    counters = None
+    if cpus is not None:
+        result, counters = run_pinned(get_command(task, timeout, partial_filepath), cpus, timeout)
+    else:
+        process = subprocess.run(args=get_command(task, timeout, partial_filepath), stdout=subprocess.PIPE, timeout=timeout)
+        result = process.stdout.decode(locale.getlocale()[1] or 'utf8')
+    result_split = [l for l in result.splitlines() if l]
+    row = parse_result_row(result_split[-1]) if result_split else None
+    if row is not None and row.timeout and partial_filepath is not None:
+        return {'complete': False}  # the partial result is in its file
+    if row is not None and row.timeout:
+        raise subprocess.TimeoutExpired(cmd=get_command(task), timeout=timeout)  # the tool reported its own timeout (e.g., sat4j)
+    if row is None:
+        raise RuntimeError(f'Unexpected output: {result_split[-1:]}')
+    record = {'core': row.core, 'dead': row.dead, 'seconds': row.seconds, 'complete': True}
+    if counters is not None:
+        record.update(dataclasses.asdict(counters))
+    return record
+
+
+def run_task(task: Task,
+             pool: Optional[AnalysisWorkerPool],
+             timeout: float,
+             partial_dir: Optional[str] = None,
+             cores: Optional[CoreSetPool] = None) -> dict[str, Any]:
+    """Run the task, in a long-lived worker of the pool if given, and return its record.
+
+    With a folder for partial results, the analysis stops itself before the
+    timeout and keeps its partial result, to be resumed when the campaign is
+    run again (the record has status 'partial' and is not stored).
+
+    With pinned workers or core sets, the process runs on dedicated CPUs, and
+    the record has its context switches and CPU migrations. The tasks that are
+    not run by a worker (e.g., sat4j) use the CPUs of an idle worker.
+    """
+    partial_filepath = get_partial_filepath(task, partial_dir)
+    record: dict[str, Any] = {'model': task.model, 'filepath': task.filepath,
+                              'tool': JAVA_TOOL_NAME if task.solver in JAVA_SOLVERS else TOOL_NAME,
+                              'solver': task.solver, 'run': task.run, 'status': 'ok',
+                              'core': None, 'dead': None, 'seconds': None, 'error': None}
+    if partial_filepath is not None:
+        record['resumed'] = os.path.exists(partial_filepath)
+    try:
+        if pool is not None and task.solver not in JAVA_SOLVERS:
+            job = {'id': task.run, 'model': task.filepath, 'solver': task.solver, 'runs': 1}
+            if partial_filepath is not None:
+                job.update({'deadline': timeout * DEADLINE_FRACTION, 'resume': partial_filepath})
+            result = pool.run(job, timeout)
+            if result['error'] is not None:
+                raise RuntimeError(result['error'])
+            record.update({key: result['runs'][0][key] for key in ('core', 'dead', 'seconds', 'complete')})
+            if pool.workers[0].cpus is not None:
+                record.update(result['runs'][0]['counters'])
+        elif pool is not None and pool.workers[0].cpus is not None:
+            with pool.reserve() as worker:
+                record.update(run_process(task, timeout, partial_filepath, worker.cpus))
+        elif cores is not None:
+            with cores.acquire() as cpus:
+                record.update(run_process(task, timeout, partial_filepath, cpus))
+        else:
+            record.update(run_process(task, timeout, partial_filepath))
+        if not record.pop('complete'):
+            record['status'] = 'partial'
+        elif partial_filepath is not None and os.path.exists(partial_filepath):
+            os.remove(partial_filepath)  # so that the next runs analyze the model from scratch
+    except subprocess.TimeoutExpired:
+        record['status'] = 'timeout'
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+    return record
+
+
+def write_result(record: dict[str, Any]) -> None:
+    """Append the record as a 'Model;Tool;SAT-solver;Cores;Deads;Seconds' row of the output file.
+
+    Resumed analyses only time their last part, so their row has 'resumed'
+    instead of the seconds (as timeouts have 'timeout'), and is never read as
+    a measured time.
+    """
+    if record['status'] == 'timeout':
+        values = [record['model'], record['tool'], record['solver'], '-1', '-1', 'timeout']
+    elif record.get('resumed'):
+        values = [record['model'], record['tool'], record['solver'], str(record['core']), str(record['dead']), 'resumed']
+    else:
+        values = [record['model'], record['tool'], record['solver'], str(record['core']), str(record['dead']), str(record['seconds'])]
+    with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
+        file.write(';'.join(values) + os.linesep)
+
+
+def main(tasks: list[Task],
+         store: ResultsStore,
+         slots: int,
+         use_workers: bool,
+         max_jobs: int,
+         timeout: float = TIMEOUT,
+         partial_dir: Optional[str] = None,
+         core_sets: Optional[list[list[int]]] = None,
+         check: Optional[VarianceCheck] = None) -> None:
+    """Run the pending tasks of the campaign in parallel slots, longest expected first.
+
+    Completed tasks (including timeouts) are kept in the store, so an interrupted
+    campaign resumes where it stopped. After a timeout or an error, the remaining
+    runs of the same model and solver are skipped; errors and partial results
+    are retried when resuming.
+
+    With core sets, each slot runs on its own CPUs. With a variance check, the
+    runs that deviate from the other runs of the model and solver are run again.
+    """
+    pending = order_longest_first(pending_tasks(tasks, store), store.median_seconds())
+    n_tasks = len(pending)
+    print(f'{len(tasks) - n_tasks} tasks already completed, {n_tasks} pending.')
+    skipped: set[tuple[str, str]] = set()
+    pool = AnalysisWorkerPool(slots, max_jobs, core_sets) if use_workers else None
+    cores = CoreSetPool(core_sets) if core_sets is not None and not use_workers else None
+    if partial_dir is not None and not os.path.exists(partial_dir):
+        os.makedirs(partial_dir)
+
+    def run(task: Task) -> Optional[dict[str, Any]]:
+        if (task.model, task.solver) in skipped:
             return None
-    
-        # Parse result:
-        # result_split = [l for l in result.split(os.linesep) if l]
-        # header = result_split[-2]
-        # res = result_split[-1]
-        # if i == 1:
-        #     header_file = header
-        #     with open(OUTPUT_FILE, 'w+', encoding='utf8') as file:
-        #         file.write(f'{header_file}{os.linesep}')
-        # else:
-        #     with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
-        #         file.write(f'{res}{os.linesep}')
-
-    # print()
-    # results_str = os.linesep.join(results)
-    # print(results_str)
-
-    # return (header, results)
-    return None
+        record = run_task(task, pool, timeout, partial_dir, cores)
+        if check is not None:
+            record = rerun_noisy(task, record, lambda: run_task(task, pool, timeout, partial_dir, cores), store, check)
+        if record['status'] != 'ok':
+            skipped.add((task.model, task.solver))  # at once, so that the other slots do not start the next runs
+        return record
+
+    try:
+        with ThreadPoolExecutor(max_workers=slots) as executor:
+            futures = {executor.submit(run, task): task for task in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                task = futures[future]
+                record = future.result()
+                report_record(task, record, store, i, n_tasks)
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+def rerun_noisy(task: Task,
+                record: dict[str, Any],
+                run: Callable[[], dict[str, Any]],
+                store: ResultsStore,
+                check: VarianceCheck) -> dict[str, Any]:
+    """Run the task again while its time deviates from the median of the other runs of the model and solver.
+
+    The record keeps the number of reruns, and is flagged as noisy if the last
+    run still deviates after check.max_reruns reruns.
+    """
+    reruns = 0
+    while (record['status'] == 'ok' and not record.get('resumed')
+           and check.is_noisy(record['seconds'], store.run_seconds(task.model, task.solver))):
+        if reruns == check.max_reruns:
+            record['noisy'] = True
+            break
+        print(f'Run {task.run} of {task.model} with {task.solver} deviates from the other runs ({record["seconds"]} s); running it again.')
+        record = run()
+        reruns += 1
+    if reruns:
+        record['reruns'] = reruns
+    return record
+
+
+def report_record(task: Task, record: Optional[dict[str, Any]], store: ResultsStore, i: int, n_tasks: int) -> None:
+    """Keep the record of the task in the store and the output file, or report why it is not kept (None if skipped)."""
+    if record is None:
+        print(f'Task {i}/{n_tasks}: {task.model} with {task.solver}, run {task.run}: skipped.')
+        return
+    if record['status'] == 'error':
+        print(f'Task {i}/{n_tasks}: error in model {task.filepath} with {task.solver}: {record["error"]}')
+        return
+    if record['status'] == 'partial':
+        print(f'Task {i}/{n_tasks}: partial result of {task.model} with {task.solver} kept to be resumed.')
+        return
+    store.append(record)
+    write_result(record)
+    print(f'Task {i}/{n_tasks} ({round(i/n_tasks*100, 2)}%): {task.model} with {task.solver}, run {task.run}: '
+          f'{"timeout" if record["status"] == "timeout" else str(record["seconds"]) + " s"}.')
+
+
+def coordinate(tasks: list[Task],
+               store: ResultsStore,
+               address: tuple[str, int],
+               token: str,
+               lease_seconds: float = LEASE_SECONDS) -> None:
+    """Hand out the pending tasks of the campaign to the hosts that join it, keeping their records in the store.
+
+    The tasks of the hosts that stop renewing their leases (e.g., they died)
+    are handed out again. The campaign resumes from the store as in main.
+    """
+    pending = order_longest_first(pending_tasks(tasks, store), store.median_seconds())
+    n_tasks = len(pending)
+    print(f'{len(tasks) - n_tasks} tasks already completed, {n_tasks} pending.')
+    counter = itertools.count(1)
+    coordinator = Coordinator(pending, lambda task, record: report_record(task, record, store, next(counter), n_tasks), token, lease_seconds)
+    print(f'Coordinator listening on {address[0]}:{address[1]}.')
+    coordinator.serve(address)
+
+
+def join(address: tuple[str, int],
+         token: str,
+         slots: int,
+         use_workers: bool,
+         max_jobs: int,
+         timeout: float = TIMEOUT,
+         partial_dir: Optional[str] = None,
+         core_sets: Optional[list[list[int]]] = None) -> None:
+    """Run the tasks handed out by the coordinator of a campaign in parallel slots, until it is done."""
+    pool = AnalysisWorkerPool(slots, max_jobs, core_sets) if use_workers else None
+    cores = CoreSetPool(core_sets) if core_sets is not None and not use_workers else None
+    if partial_dir is not None and not os.path.exists(partial_dir):
+        os.makedirs(partial_dir)
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    try:
+        with ThreadPoolExecutor(max_workers=slots) as executor:
+            futures = [executor.submit(run_leased_tasks, address, token, f'{name}/{slot}', lambda task: run_task(task, pool, timeout, partial_dir, cores))
+                       for slot in range(slots)]
+            n_tasks = sum(future.result() for future in futures)
+    finally:
+        if pool is not None:
+            pool.close()
+    print(f'Finished {n_tasks} tasks for the coordinator at {address[0]}:{address[1]}.')
 
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Execute X runs the given script with its arguments.')
+    parser = argparse.ArgumentParser(description='Execute X runs of the analysis of all models with several solvers.')
     parser.add_argument('-r', '--runs', dest='runs', type=int, required=False, default=1, help='Number of executions (default 1).')
-    parser.add_argument('-d', '--dir', dest='dir', type=str, required=True, help='Folder with the models in Dimacs (.cnf).')
+    parser.add_argument('-d', '--dir', dest='dir', type=str, required=False, help='Folder with the models in Dimacs (.cnf). Required except with --join.')
+    parser.add_argument('-s', '--solvers', dest='solvers', type=str, required=False, default=','.join(SOLVERS), help=f'Comma-separated solvers (default {",".join(SOLVERS)}).')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, required=False, default=0, help='Number of parallel slots, with long-lived analysis workers for the Python solvers (default 0, runs one after another with one process per run).')
+    parser.add_argument('--fresh', dest='fresh', action='store_true', help='Use one process per run in the parallel slots instead of long-lived workers.')
+    parser.add_argument('--max-jobs', dest='max_jobs', type=int, required=False, default=0, help='Recycle each analysis worker after this number of jobs (default 0, never).')
+    parser.add_argument('--store', dest='store', type=str, required=False, default=STORE_FILE, help=f'Store of completed tasks to resume the campaign (default {STORE_FILE}).')
+    parser.add_argument('--partial-dir', dest='partial_dir', type=str, required=False, default=None, help='Folder where the analyses reaching the timeout keep their partial results, resumed by the next run of the model with the solver.')
+    parser.add_argument('--coordinator', dest='coordinator', type=str, required=False, default=None, help='Hand out the tasks to the hosts that join the campaign at [HOST:]PORT instead of running them.')
+    parser.add_argument('--host', dest='host', type=str, required=False, default=DEFAULT_HOST, help=f'Interface the coordinator listens on when --coordinator has no HOST (default {DEFAULT_HOST}, only local workers; 0.0.0.0 for every interface).')
+    parser.add_argument('--token', dest='token', type=str, required=False, default=COORDINATOR_TOKEN, help='Shared token of the coordinator and the hosts that join it (default the COORDINATOR_TOKEN environment variable; a random one is printed by the coordinator if not given).')
+    parser.add_argument('--join', dest='join', type=str, required=False, default=None, help='Run the tasks of the campaign of the coordinator at HOST:PORT.')
+    parser.add_argument('--lease', dest='lease', type=float, required=False, default=LEASE_SECONDS, help=f'Seconds without renewal after which the task of a host is handed out again (default {LEASE_SECONDS}).')
+    parser.add_argument('--pin', dest='pin', action='store_true', help='Pin each slot to its own CPU (with taskset), keeping this runner off them if there are CPUs left, and record the context switches and CPU migrations of each run.')
+    parser.add_argument('--idle-siblings', dest='idle_siblings', action='store_true', help='Pin each slot to its own physical core, leaving the hyperthread siblings idle (implies --pin).')
+    parser.add_argument('--rerun-threshold', dest='rerun_threshold', type=float, required=False, default=None, help='Run again the runs whose time deviates more than this fraction (e.g., 0.2) from the median of the other runs of the model and solver.')
+    parser.add_argument('--max-reruns', dest='max_reruns', type=int, required=False, default=MAX_RERUNS, help=f'Reruns of a deviating run before it is kept and flagged as noisy (default {MAX_RERUNS}).')
     args = parser.parse_args()
 
-    analyzed_models = []
-    # to avoid already analyzed models
-    with open(ALREADY_ANALYZED_RESULTS, 'r') as f:
-        analyzed_models = f.read()
-
-    n_runs = args.runs
-    all_models = get_fm_filepath_models(args.dir)
-    n_models = len(all_models)
-    header_file = None
-    for i, filepath in enumerate(all_models, 1):
-        print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {filepath}')
-
-        # Avoid already analyzed models
-        path, filename = os.path.split(filepath)
-        filename = '.'.join(filename.split('.')[:-1])
-        if filename in analyzed_models:
-            print(f'Skypped model.')
+    slots = max(args.workers, 1)
+    core_sets = None
+    if args.pin or args.idle_siblings:
+        core_sets = get_core_sets(slots, args.idle_siblings)
+        pin_runner(core_sets)
+    check = VarianceCheck(threshold=args.rerun_threshold, max_reruns=args.max_reruns) if args.rerun_threshold is not None else None
+
+    if args.join is not None:
+        if not args.token:
+            parser.error('--join requires the token of the coordinator (--token or the COORDINATOR_TOKEN environment variable)')
+        join(parse_address(args.join), args.token, slots, args.workers > 0 and not args.fresh, args.max_jobs, TIMEOUT, args.partial_dir, core_sets)
+    elif args.dir is None:
+        parser.error('the following arguments are required: -d/--dir')
+    else:
+        tasks = get_tasks(args.dir, [name for name in args.solvers.split(',') if name], args.runs)
+        if args.coordinator is not None:
+            token = args.token
+            if not token:
+                token = secrets.token_urlsafe(16)
+                print(f'Token of the campaign (for --token or COORDINATOR_TOKEN of the hosts that join it): {token}')
+            coordinate(tasks, ResultsStore(args.store), parse_address(args.coordinator, args.host), token, args.lease)
         else:
-            try:
-                # cadical solver
-                solver_name = 'cadical153'
-                main(n_runs, filepath, solver_name, [PYTHON, SCRIPT_PYTHON, '-fm', filepath, '-s', solver_name])
-                
-                # Glucose4 solver
-                #solver_name = 'glucose4'
-                #main(n_runs, filepath, solver_name, [PYTHON, SCRIPT_PYTHON, '-fm', filepath, '-s', solver_name])
-                # header, result = main(n_runs, filepath, solver_name, ['python', SCRIPT_PYTHON, '-fm', filepath, '-s', solver_name])
-                # if header_file is None:
-                #     header_file = header
-                #     with open(OUTPUT_FILE, 'w+', encoding='utf8') as file:
-                #         file.write(f'{header_file}{os.linesep}')
-                # with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
-                #         file.write(f'{os.linesep.join(result)}{os.linesep}')
-                
-                # lingeling solver
-                #solver_name = 'lingeling'
-                #main(n_runs, filepath, solver_name, [PYTHON, SCRIPT_PYTHON, '-fm', filepath, '-s', solver_name])
-                # _, result = main(n_runs, filepath, solver_name, ['python', SCRIPT_PYTHON, '-fm', filepath, '-s', solver_name])
-                # with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
-                #         file.write(f'{os.linesep.join(result)}{os.linesep}')
-
-                # minisat22 solver
-                solver_name = 'minisat22'
-                main(n_runs, filepath, solver_name, [PYTHON, SCRIPT_PYTHON, '-fm', filepath, '-s', solver_name])
-                # _, result = main(n_runs, filepath, solver_name, ['python', SCRIPT_PYTHON, '-fm', filepath, '-s', solver_name])
-                # with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
-                #     file.write(f'{os.linesep.join(result)}{os.linesep}')
-
-                # sat4j solver (FeatureIDE)
-                #path, filename = os.path.split(filepath)
-                #filename = '.'.join(filename.split('.')[:-1])
-                #filepath_dimacs = os.path.join(path, filename + '.dimacs')
-                #print(f'DIMACS file: {filepath_dimacs}')
-                solver_name = 'sat4j'
-                #main(n_runs, filepath_dimacs, solver_name, ['java', '-jar', SCRIPT_JAVA, filepath_dimacs])
-                main(n_runs, filepath, solver_name, ['java', '-jar', SCRIPT_JAVA, filepath])
-                #_, result = main(n_runs, filepath_dimacs, solver_name, ['java', '-jar', SCRIPT_JAVA, filepath_dimacs])
-                # with open(OUTPUT_FILE, 'a', encoding='utf8') as file:
-                #     file.write(f'{os.linesep.join(result)}{os.linesep}')
-
-
-            except Exception as e:
-                print(f'Error in model: {filepath}')
-                print(e)
-            #    traceback.print_exc()
-    print(f'Finished all.')
\ No newline at end of file
+            main(tasks, ResultsStore(args.store), slots, args.workers > 0 and not args.fresh, args.max_jobs, TIMEOUT, args.partial_dir,
+                 core_sets, check)
+        print(f'Finished all.')
@@ -0,0 +1,108 @@
+import os
+import csv
+import time
+import argparse
+from typing import Any, Optional
+
+from operations.bdd_compilation import BDD_CACHE_DIR, COMPILE_SECONDS, MAX_NODES, BDDCache, BDDCoreDeadFeatures, CompilationBudget
+from operations.coredead_ordering import ORDERINGS
+from operations.pysat_coredead_features import SATCoreDeadFeatures
+from transformations import model_cache
+
+
+RESULTS_FILE = 'bdd_analysis.csv'
+COLUMNS = ['model', 'variables', 'clauses', 'backend', 'nodes', 'compile_seconds', 'query_seconds', 'sat_seconds',
+           'configurations', 'core', 'dead', 'same_result', 'break_even']
+MODEL_EXTENSIONS = ('.uvl', '.dimacs', '.cnf')
+
+
+def get_fm_filepath_models(dir: str) -> list[str]:
+    """Get all models from the given directory."""
+    models = []
+    for root, dirs, files in os.walk(dir):
+        for file in files:
+            filepath = os.path.join(root, file)
+            if filepath.endswith(MODEL_EXTENSIONS):
+                models.append(filepath)
+    return sorted(models)
+
+
+def get_model_name(fm_filepath: str) -> str:
+    path, filename = os.path.split(fm_filepath)
+    return '.'.join(filename.split('.')[:-1])
+
+
+def analyze(fm_filepath: str, solver_name: str, budget: CompilationBudget, ordering: str, cache: Optional[BDDCache]) -> dict[str, Any]:
+    """Compile the model and answer the queries from the BDD, compared with the SAT analysis of the core/dead features.
+
+    The break-even is the number of analyses of the model after which compiling
+    it pays off: compile time / (SAT time - query time).
+    """
+    sat_model = model_cache.read_model(fm_filepath)
+    operation = BDDCoreDeadFeatures(solver_name, budget, ordering, cache).execute(sat_model)
+    statistics = operation.get_statistics()
+    start_time = time.perf_counter()
+    sat_result = SATCoreDeadFeatures(solver_name).execute(sat_model).get_result()
+    sat_seconds = time.perf_counter() - start_time
+    core_features, dead_features = operation.get_result()
+    break_even = None
+    if statistics.backend == 'bdd' and sat_seconds > statistics.query_seconds:
+        break_even = round(statistics.compile_seconds / (sat_seconds - statistics.query_seconds), 2)
+    return {'model': get_model_name(fm_filepath), 'variables': len(sat_model.variables),
+            'clauses': len(sat_model.get_all_clauses().clauses), 'backend': statistics.backend,
+            'nodes': statistics.nodes, 'compile_seconds': round(statistics.compile_seconds, 4),
+            'query_seconds': round(statistics.query_seconds, 4), 'sat_seconds': round(sat_seconds, 4),
+            'configurations': operation.get_configurations_number(), 'core': len(core_features), 'dead': len(dead_features),
+            'same_result': (core_features, dead_features) == sat_result, 'break_even': break_even}
+
+
+def main(dir: str, solver_name: str, budget: CompilationBudget, ordering: str, cache: Optional[BDDCache], output: str) -> None:
+    models_filepaths = get_fm_filepath_models(dir)
+    n_models = len(models_filepaths)
+    rows = []
+    with open(output, 'w', encoding='utf8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS, delimiter=';')
+        writer.writeheader()
+        for i, fm_filepath in enumerate(models_filepaths, 1):
+            print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {fm_filepath}')
+            try:
+                row = analyze(fm_filepath, solver_name, budget, ordering, cache)
+            except Exception as e:
+                print(e)
+                print(f'Error in model: {fm_filepath}')
+                continue
+            if row['backend'] == 'bdd':
+                print(f'  |-> {row["nodes"]} nodes, compile: {row["compile_seconds"]} s, queries: {row["query_seconds"]} s, '
+                      f'SAT: {row["sat_seconds"]} s, break-even: {row["break_even"]} analyses')
+            else:
+                print(f'  |-> compilation exceeded the budget, SAT: {row["sat_seconds"]} s')
+            writer.writerow(row)
+            file.flush()
+            rows.append(row)
+    compiled = [row for row in rows if row['backend'] == 'bdd']
+    print()
+    print(f'Models compiled: {len(compiled)}/{len(rows)}')
+    if compiled:
+        print(f'Compile time: {sum(row["compile_seconds"] for row in compiled):.2f} s, '
+              f'query time: {sum(row["query_seconds"] for row in compiled):.2f} s, '
+              f'SAT time: {sum(row["sat_seconds"] for row in compiled):.2f} s (on the compiled models)')
+        print(f'Models where compiling pays off after one analysis: {sum(1 for row in compiled if row["break_even"] is not None and row["break_even"] <= 1)}')
+    mismatches = [row['model'] for row in rows if not row['same_result']]
+    if mismatches:
+        print(f'Different results: {mismatches}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile the models to BDDs and compare the compile and query time with the SAT analysis of the core/dead features.')
+    parser.add_argument(dest='dir', type=str, help='Folder with the models (.uvl, .dimacs, .cnf).')
+    parser.add_argument('-s', '--solver', dest='solver', type=str, required=False, default='glucose3', help='Solver of the SAT analysis (default "glucose3").')
+    parser.add_argument('--order', dest='ordering', type=str, required=False, default='graph', choices=ORDERINGS, help='Variable order of the BDD (default graph).')
+    parser.add_argument('--max-nodes', dest='max_nodes', type=int, required=False, default=MAX_NODES, help=f'Nodes of the BDD manager after which the compilation gives up and the SAT analysis is used (default {MAX_NODES}).')
+    parser.add_argument('--compile-timeout', dest='compile_timeout', type=float, required=False, default=COMPILE_SECONDS, help=f'Seconds after which the compilation gives up (default {COMPILE_SECONDS}).')
+    parser.add_argument('--cache-dir', dest='cache_dir', type=str, required=False, default=BDD_CACHE_DIR, help=f'Folder of the compiled BDDs (default {BDD_CACHE_DIR}, or the BDD_CACHE_DIR environment variable).')
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true', help='Compile the models again instead of loading the compiled BDDs.')
+    parser.add_argument('-o', '--output', dest='output', type=str, required=False, default=RESULTS_FILE, help=f'CSV file with a row per model (default {RESULTS_FILE}).')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else BDDCache(args.cache_dir)
+    main(args.dir, args.solver, CompilationBudget(args.max_nodes, args.compile_timeout), args.ordering, cache, args.output)
@@ -0,0 +1,110 @@
+"""
+Example of execution (Flama with minisat22 against the sat4j jar, 3 warmup and 30 measured runs):
+    python main_benchmark.py -fm models/Pizzas.dimacs -s minisat22 --warmup 3 -r 30 --sat4j fide_sat_analysis.jar
+"""
+import os
+import sys
+import argparse
+from typing import Callable, Optional
+
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat
+
+from operations.pysat_coredead_session import CoreDeadSession
+from transformations.fast_dimacs_reader import FastDimacsReader
+from utils.benchmark import Benchmark, Measurement, measure, measure_command, write_csv
+from utils.memory_profiler import SamplingMemoryProfiler
+
+
+SCRIPT_PYTHON = 'main_sat_analysis.py'
+ROWS_FILE = 'benchmark_runs.csv'
+SUMMARY_FILE = 'benchmark_summary.csv'
+
+
+def flama_phases(fm_filepath: str, solver_name: str, memory_interval: Optional[float] = None) -> Callable[[int], list[Measurement]]:
+    """Analysis measured by phases: parse, encode (to CNF), load solver and solve (core/dead).
+
+    With a memory interval, the RSS/USS of each phase is also sampled in the background.
+    """
+    def run(i: int) -> list[Measurement]:
+        if memory_interval is None:
+            return run_phases(None)
+        with SamplingMemoryProfiler(logger=None, interval=memory_interval) as profiler:
+            return run_phases(profiler)
+
+    def run_phases(profiler: Optional[SamplingMemoryProfiler]) -> list[Measurement]:
+        with measure('parse', profiler) as parse:
+            if fm_filepath.endswith('.uvl'):
+                feature_model = UVLReader(fm_filepath).transform()
+            else:
+                dimacs = FastDimacsReader(fm_filepath).read()
+        with measure('encode', profiler) as encode:
+            if fm_filepath.endswith('.uvl'):
+                sat_model = FmToPysat(feature_model).transform()
+            else:
+                sat_model = dimacs.to_pysat_model()
+        with measure('load solver', profiler) as load:
+            session = CoreDeadSession(sat_model, solver_name)
+        with measure('solve', profiler) as solve:
+            session.core_dead()
+        session.close()
+        return [parse, encode, load, solve]
+    return run
+
+
+def command_process(command: list[str], timeout: Optional[float]) -> Callable[[int], list[Measurement]]:
+    """Whole process measured as a single phase (e.g., the sat4j jar, including the JVM startup)."""
+    def run(i: int) -> list[Measurement]:
+        return [measure_command(command, timeout)]
+    return run
+
+
+def main(fm_filepath: str,
+         solver_name: str,
+         warmup: int,
+         repetitions: int,
+         process: bool,
+         sat4j_jar: Optional[str],
+         timeout: Optional[float],
+         memory_interval: Optional[float],
+         rows_filepath: str,
+         summary_filepath: str) -> None:
+    benchmarks = []
+    if process:
+        command = [sys.executable, SCRIPT_PYTHON, '-fm', fm_filepath, '-s', solver_name]
+        benchmarks.append(Benchmark(f'Flama-{solver_name}', warmup, repetitions).run(command_process(command, timeout)))
+    else:
+        benchmarks.append(Benchmark(f'Flama-{solver_name}', warmup, repetitions).run(flama_phases(fm_filepath, solver_name, memory_interval)))
+    if sat4j_jar is not None:
+        command = ['java', '-jar', sat4j_jar, fm_filepath]
+        benchmarks.append(Benchmark('FeatureIDE-sat4j', warmup, repetitions).run(command_process(command, timeout)))
+
+    model_name = '.'.join(os.path.basename(fm_filepath).split('.')[:-1])
+    rows = [{'model': model_name, **row} for benchmark in benchmarks for row in benchmark.rows]
+    summary = [{'model': model_name, **row} for benchmark in benchmarks for row in benchmark.summary()]
+    write_csv(rows_filepath, rows)
+    write_csv(summary_filepath, summary)
+    for row in summary:
+        if row['metric'] == 'wall':
+            print(f'{row["benchmark"]} {row["phase"]}: median {row["median"]:.4f} s, IQR {row["iqr"]:.4f} s, '
+                  f'CI [{row["ci_low"]:.4f}, {row["ci_high"]:.4f}] s.')
+    if any(not row.get('peak_rss_per_phase', True) for row in summary):
+        print('The peak RSS could not be reset between phases (/proc/self/clear_refs): '
+              'the peak_rss_kb of the phases is the peak of the whole process (peak_rss_per_phase is False).')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the core/dead analysis of an FM with warmup and repetitions.')
+    parser.add_argument('-fm', '--featuremodel', dest='feature_model', type=str, required=True, help='Input feature model. Supported formats: .uvl (UVL), .dimacs (Dimacs).')
+    parser.add_argument('-s', '--solver', dest='solver', type=str, required=False, default='glucose3', help='Solver to use (default "glucose3").')
+    parser.add_argument('--warmup', dest='warmup', type=int, required=False, default=1, help='Number of warmup executions, not recorded (default 1).')
+    parser.add_argument('-r', '--runs', dest='runs', type=int, required=False, default=10, help='Number of measured executions (default 10).')
+    parser.add_argument('--process', dest='process', action='store_true', help=f'Measure Flama as a whole process running {SCRIPT_PYTHON}, as the sat4j jar is measured.')
+    parser.add_argument('--sat4j', dest='sat4j', type=str, required=False, default=None, help='Also benchmark the given FeatureIDE/sat4j jar.')
+    parser.add_argument('-t', '--timeout', dest='timeout', type=float, required=False, default=None, help='Timeout in seconds of each process run.')
+    parser.add_argument('-m', '--memory-interval', dest='memory_interval', type=float, required=False, default=None, help='Sample the RSS/USS of each phase every given seconds in a background thread.')
+    parser.add_argument('-o', '--output', dest='output', type=str, required=False, default=ROWS_FILE, help=f'Per-run rows (default {ROWS_FILE}).')
+    parser.add_argument('--summary', dest='summary', type=str, required=False, default=SUMMARY_FILE, help=f'Summary statistics (default {SUMMARY_FILE}).')
+    args = parser.parse_args()
+
+    main(args.feature_model, args.solver, args.warmup, args.runs, args.process, args.sat4j, args.timeout, args.memory_interval, args.output, args.summary)
@@ -0,0 +1,138 @@
+import os
+import re
+import sys
+import time
+import signal
+import secrets
+import socket
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+from typing import Optional
+
+from execute_Xruns import get_tasks
+from utils.campaign import ResultsStore
+from utils.coordinator import DEFAULT_HOST, request
+
+
+EXECUTE_XRUNS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'execute_Xruns.py')
+SOLVERS = ['cadical153', 'minisat22']
+LEASE_SECONDS = 5.0  # short, so that the tasks of a killed worker are handed out again soon
+STARTUP_SECONDS = 30.0
+TASK_LINE = re.compile(r'^Task (\d+)/(\d+)')
+FINISHED_LINE = re.compile(r'^Finished (\d+) tasks')
+EXPIRED_LINE = re.compile(r'^Lease of .* expired')
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((DEFAULT_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_coordinator(address: tuple[str, int], coordinator: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_SECONDS
+    while coordinator.poll() is None and time.monotonic() < deadline:
+        try:
+            with socket.create_connection(address, timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'The coordinator did not start listening on {address[0]}:{address[1]}.')
+
+
+def is_rejected(address: tuple[str, int]) -> bool:
+    """Whether a request with a wrong token is rejected."""
+    try:
+        request(address, 'wrong-' + secrets.token_urlsafe(8), {'op': 'lease', 'worker': 'check'})
+    except RuntimeError:
+        return True
+    return False
+
+
+def read_lines(filepath: str) -> list[str]:
+    with open(filepath, 'r', encoding='utf8', errors='replace') as file:
+        return file.read().splitlines()
+
+
+def main(dir: str, solver_names: list[str], runs: int, n_workers: int, kill_after: Optional[float], timeout: float) -> bool:
+    tasks = get_tasks(os.path.abspath(dir), solver_names, runs)
+    token = secrets.token_urlsafe(16)
+    address = (DEFAULT_HOST, get_free_port())
+    env = dict(os.environ, COORDINATOR_TOKEN=token)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_filepath = os.path.join(tmp_dir, 'store.jsonl')
+        coordinator_log = os.path.join(tmp_dir, 'coordinator.log')
+        worker_logs = [os.path.join(tmp_dir, f'worker{i}.log') for i in range(n_workers)]
+        print(f'Coordinator on {address[0]}:{address[1]} with {len(tasks)} tasks and {n_workers} local workers.')
+        with open(coordinator_log, 'w', encoding='utf8') as log:
+            # The coordinator writes its output files in the temporary folder; the workers run the analyses from the repository
+            coordinator = subprocess.Popen([sys.executable, EXECUTE_XRUNS, '-d', os.path.abspath(dir), '-s', ','.join(solver_names),
+                                            '-r', str(runs), '--coordinator', str(address[1]), '--lease', str(LEASE_SECONDS),
+                                            '--store', store_filepath], cwd=tmp_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        workers = []
+        try:
+            wait_for_coordinator(address, coordinator)
+            rejected = is_rejected(address)
+            print(f'Request with a wrong token rejected: {rejected}')
+            for worker_log in worker_logs:
+                with open(worker_log, 'w', encoding='utf8') as log:
+                    workers.append(subprocess.Popen([sys.executable, EXECUTE_XRUNS, '--join', f'{address[0]}:{address[1]}'],
+                                                    cwd=os.path.dirname(EXECUTE_XRUNS), env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True))
+            if kill_after is not None:
+                time.sleep(kill_after)
+                os.killpg(workers[0].pid, signal.SIGKILL)  # with the analysis it is running
+                print(f'Worker 0 killed after {kill_after} s.')
+            coordinator.wait(timeout=timeout)
+            for worker in workers:
+                worker.wait(timeout=timeout)
+        finally:
+            for process in [coordinator, *workers]:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+
+        # Each pending task is reported once by the coordinator, and stored at most once
+        coordinator_lines = read_lines(coordinator_log)
+        task_lines = [match for match in map(TASK_LINE.match, coordinator_lines) if match]
+        reported = Counter(int(match.group(1)) for match in task_lines)
+        n_pending = int(task_lines[0].group(2)) if task_lines else 0
+        n_expired = sum(1 for line in coordinator_lines if EXPIRED_LINE.match(line))
+        keys = Counter((record['model'], record['solver'], record['run']) for record in ResultsStore(store_filepath).records)
+        tasks_per_worker = []
+        for worker_log in worker_logs:
+            matches = [match for match in map(FINISHED_LINE.match, read_lines(worker_log)) if match]
+            tasks_per_worker.append(int(matches[-1].group(1)) if matches else None)
+        problems = []
+        if not rejected:
+            problems.append('a request with a wrong token was served')
+        if coordinator.returncode != 0:
+            problems.append(f'the coordinator exited with code {coordinator.returncode}')
+        if set(reported) != set(range(1, n_pending + 1)) or any(count > 1 for count in reported.values()):
+            problems.append(f'{len(reported)} of {n_pending} tasks reported, {sum(1 for count in reported.values() if count > 1)} more than once')
+        duplicated = [key for key, count in keys.items() if count > 1]
+        if duplicated:
+            problems.append(f'{len(duplicated)} tasks stored more than once: {duplicated}')
+        print(f'Tasks reported: {len(reported)}/{n_pending}, stored: {len(keys)}, expired leases: {n_expired}, '
+              f'tasks per worker: {tasks_per_worker} (None if the worker did not finish).')
+        if problems:
+            print('Problems: ' + '; '.join(problems) + '.')
+            print(f'Coordinator output:{os.linesep}' + os.linesep.join(coordinator_lines[-20:]))
+        else:
+            print('OK.')
+        return not problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the coordinator of execute_Xruns.py on this machine: run a campaign with a local coordinator and several local worker processes, optionally killing one of them, and check that every task is reported and stored once and that the requests with a wrong token are rejected.')
+    parser.add_argument(dest='dir', type=str, help='Folder with (small) models in Dimacs (.cnf).')
+    parser.add_argument('-s', '--solvers', dest='solvers', type=str, required=False, default=','.join(SOLVERS), help=f'Comma-separated solvers (default {",".join(SOLVERS)}).')
+    parser.add_argument('-r', '--runs', dest='runs', type=int, required=False, default=2, help='Number of executions (default 2).')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, required=False, default=2, help='Number of local worker processes (default 2).')
+    parser.add_argument('--kill-after', dest='kill_after', type=float, required=False, default=None, help='Kill the first worker after these seconds, so that its leases expire and its tasks are handed out to the others.')
+    parser.add_argument('-t', '--timeout', dest='timeout', type=float, required=False, default=600.0, help='Seconds to wait for the campaign (default 600).')
+    args = parser.parse_args()
+
+    ok = main(args.dir, [name for name in args.solvers.split(',') if name], args.runs, args.workers, args.kill_after, args.timeout)
+    sys.exit(0 if ok else 1)
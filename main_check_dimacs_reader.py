@@ -0,0 +1,54 @@
+import os
+import argparse
+
+from flamapy.metamodels.pysat_metamodel.transformations import DimacsReader
+
+from transformations.fast_dimacs_reader import FastDimacsReader
+from utils import timer
+
+
+def get_fm_filepath_models(dir: str) -> list[str]:
+    """Get all models from the given directory."""
+    models = []
+    for root, dirs, files in os.walk(dir):
+        for file in files:
+            filepath = os.path.join(root, file)
+            models.append(filepath)
+    return sorted(models)
+
+
+def main(dir: str) -> None:
+    models_filepaths = [f for f in get_fm_filepath_models(dir) if f.endswith('.cnf') or f.endswith('.dimacs')]
+    n_models = len(models_filepaths)
+
+    n_errors = 0
+    for i, fm_filepath in enumerate(models_filepaths, 1):
+        print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {fm_filepath}')
+        with timer.Timer(name='DimacsReader', logger=None):
+            expected = DimacsReader(fm_filepath).transform()
+        with timer.Timer(name='FastDimacsReader', logger=None):
+            sat_model = FastDimacsReader(fm_filepath).transform()
+        if list(sat_model.variables.items()) != list(expected.variables.items()):
+            n_errors += 1
+            print(f'  |-> Different variables.')
+        if sat_model.features != expected.features:
+            n_errors += 1
+            print(f'  |-> Different features.')
+        if list(sat_model.get_all_clauses().clauses) != expected.get_all_clauses().clauses:
+            n_errors += 1
+            print(f'  |-> Different clauses.')
+        if sat_model.get_all_clauses().nv != expected.get_all_clauses().nv:
+            n_errors += 1
+            print(f'  |-> Different number of variables in the CNF.')
+
+    print(f'DimacsReader: {round(timer.Timer.timers["DimacsReader"], 4)} s, '
+          f'FastDimacsReader: {round(timer.Timer.timers["FastDimacsReader"], 4)} s.')
+    print(f'Models: {n_models}, differences: {n_errors}.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that FastDimacsReader reads the same models as DimacsReader.')
+    parser.add_argument(dest='dir', type=str, help='Folder with the models in Dimacs (.dimacs, .cnf).')
+    args = parser.parse_args()
+
+    main(args.dir)
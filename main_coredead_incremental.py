@@ -0,0 +1,103 @@
+import os
+import csv
+import time
+import argparse
+from typing import Any, Optional
+
+from operations.coredead_incremental import CoreDeadVerdicts, IncrementalCoreDeadFeatures
+from operations.pysat_coredead_features import SATCoreDeadFeatures
+from transformations import model_cache
+
+
+RESULTS_FILE = 'coredead_incremental.csv'
+COLUMNS = ['old_model', 'model', 'features', 'new_features', 'removed_features', 'added_clauses', 'removed_clauses',
+           'implied_clauses', 'fallback', 'witnesses', 'valid_witnesses', 'carried_verdicts', 'rechecked', 'incremental_calls',
+           'full_calls', 'avoided_calls', 'incremental_seconds', 'full_seconds', 'same_result']
+
+
+def get_model_name(fm_filepath: str) -> str:
+    path, filename = os.path.split(fm_filepath)
+    return '.'.join(filename.split('.')[:-1])
+
+
+def analyze_version(old_filepath: str, old_verdicts: CoreDeadVerdicts, fm_filepath: str, solver_name: str) -> tuple[dict[str, Any], CoreDeadVerdicts]:
+    """Analyze a model version incrementally from the verdicts of the previous version, and compare it with its full analysis."""
+    old_model = model_cache.read_model(old_filepath)
+    sat_model = model_cache.read_model(fm_filepath)
+    start_time = time.perf_counter()
+    operation = IncrementalCoreDeadFeatures(solver_name, old_model, old_verdicts).execute(sat_model)
+    incremental_seconds = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    full = SATCoreDeadFeatures(solver_name).execute(sat_model)
+    full_seconds = time.perf_counter() - start_time
+    statistics = operation.get_statistics()
+    full_calls = full.get_statistics().solver_calls
+    row = {'old_model': get_model_name(old_filepath), 'model': get_model_name(fm_filepath), 'features': len(sat_model.variables),
+           'new_features': statistics.new_features, 'removed_features': statistics.removed_features,
+           'added_clauses': statistics.added_clauses, 'removed_clauses': statistics.removed_clauses,
+           'implied_clauses': statistics.implied_clauses, 'fallback': statistics.fallback, 'witnesses': statistics.witnesses,
+           'valid_witnesses': statistics.valid_witnesses, 'carried_verdicts': statistics.carried_verdicts,
+           'rechecked': statistics.rechecked, 'incremental_calls': statistics.solver_calls, 'full_calls': full_calls,
+           'avoided_calls': full_calls - statistics.solver_calls, 'incremental_seconds': round(incremental_seconds, 4),
+           'full_seconds': round(full_seconds, 4), 'same_result': operation.get_result() == full.get_result()}
+    return (row, operation.get_verdicts())
+
+
+def main(fm_filepaths: list[str], solver_name: str, verdicts_filepath: Optional[str], output: str) -> None:
+    first_model = model_cache.read_model(fm_filepaths[0])
+    verdicts = None
+    if verdicts_filepath is not None and os.path.exists(verdicts_filepath):
+        verdicts = CoreDeadVerdicts.load(verdicts_filepath)
+        if verdicts.matches(first_model):
+            print(f'Verdicts of {fm_filepaths[0]} loaded from {verdicts_filepath}.')
+        else:
+            print(f'The verdicts of {verdicts_filepath} are not of {fm_filepaths[0]}; it is analyzed from scratch.')
+            verdicts = None
+    if verdicts is None:
+        operation = IncrementalCoreDeadFeatures(solver_name).execute(first_model)
+        verdicts = operation.get_verdicts()
+        print(f'{fm_filepaths[0]}: {len(verdicts.core)} core, {len(verdicts.dead)} dead, {len(verdicts.witnesses)} witnesses, '
+              f'{operation.get_statistics().solver_calls} solver calls')
+    n_versions = len(fm_filepaths) - 1
+    rows = []
+    with open(output, 'w', encoding='utf8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS, delimiter=';')
+        writer.writeheader()
+        for i, (old_filepath, fm_filepath) in enumerate(zip(fm_filepaths, fm_filepaths[1:]), 1):
+            print(f'Version {i}/{n_versions}: {old_filepath} -> {fm_filepath}')
+            row, verdicts = analyze_version(old_filepath, verdicts, fm_filepath, solver_name)
+            if row['fallback']:
+                print(f'  |-> {row["added_clauses"]} added, {row["removed_clauses"]} removed clauses in the largest component: full analysis')
+            else:
+                print(f'  |-> {row["added_clauses"]} added, {row["removed_clauses"]} removed clauses ({row["implied_clauses"]} implied), '
+                      f'{row["carried_verdicts"]} verdicts carried over, {row["valid_witnesses"]}/{row["witnesses"]} valid witnesses')
+            print(f'  |-> solver calls: {row["incremental_calls"]} (full analysis: {row["full_calls"]}, avoided: {row["avoided_calls"]}), '
+                  f'{row["incremental_seconds"]} s (full analysis: {row["full_seconds"]} s)')
+            if not row['same_result']:
+                print('  |-> The incremental result differs from the full analysis.')
+            writer.writerow(row)
+            file.flush()
+            rows.append(row)
+    if verdicts_filepath is not None:
+        verdicts.save(verdicts_filepath)
+    if rows:
+        incremental_calls = sum(row['incremental_calls'] for row in rows)
+        full_calls = sum(row['full_calls'] for row in rows)
+        print()
+        print(f'Solver calls: {incremental_calls} (full analyses: {full_calls}, avoided: {full_calls - incremental_calls}), '
+              f'verdicts carried over: {sum(row["carried_verdicts"] for row in rows)}, '
+              f'full analyses as fallback: {sum(1 for row in rows if row["fallback"])}/{len(rows)}')
+        mismatches = [row['model'] for row in rows if not row['same_result']]
+        if mismatches:
+            print(f'Different results: {mismatches}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze the core/dead features of consecutive versions of a model incrementally, reusing the verdicts and witnesses of the previous version, and compare the solver calls with the full analysis of each version.')
+    parser.add_argument(dest='models', type=str, nargs='+', help='Versions of the model, from the oldest (.uvl, .dimacs, .cnf).')
+    parser.add_argument('-s', '--solver', dest='solver', type=str, required=False, default='glucose3', help='Solver (default "glucose3").')
+    parser.add_argument('--verdicts', dest='verdicts', type=str, required=False, default=None, help='File (.npz) with the verdicts of the first version, used instead of analyzing it if it exists and has the same features and CNF; the verdicts of the last version are saved to it.')
+    parser.add_argument('-o', '--output', dest='output', type=str, required=False, default=RESULTS_FILE, help=f'CSV file with a row per version (default {RESULTS_FILE}).')
+    args = parser.parse_args()
+
+    main(args.models, args.solver, args.verdicts, args.output)
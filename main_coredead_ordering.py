@@ -0,0 +1,122 @@
+import os
+import csv
+import time
+import argparse
+import itertools
+import statistics
+from typing import Any, Optional
+
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+from operations.coredead_ordering import ORDERINGS, feature_tree_order
+from operations.pysat_coredead_features import SATCoreDeadFeatures, CoreDeadBudget
+from transformations import model_cache
+
+
+RESULTS_FILE = 'coredead_ordering.csv'
+COLUMNS = ['model', 'ordering', 'atomic', 'phases', 'core', 'dead', 'solver_calls', 'atomic_set_variables', 'seconds', 'complete', 'same_result']
+MODEL_EXTENSIONS = ('.uvl', '.dimacs', '.cnf')
+
+
+def get_fm_filepath_models(dir: str) -> list[str]:
+    """Get all models from the given directory."""
+    models = []
+    for root, dirs, files in os.walk(dir):
+        for file in files:
+            filepath = os.path.join(root, file)
+            if filepath.endswith(MODEL_EXTENSIONS):
+                models.append(filepath)
+    return sorted(models)
+
+
+def get_model_name(fm_filepath: str) -> str:
+    path, filename = os.path.split(fm_filepath)
+    return '.'.join(filename.split('.')[:-1])
+
+
+def analyze(fm_filepath: str, solver_name: str, timeout: Optional[float]) -> list[dict[str, Any]]:
+    """Rows of the analysis of the model with each ordering, with and without atomic sets and refuting phases.
+
+    The first row (model order, no atomic sets nor phases) is the baseline the others are compared with.
+    """
+    sat_model = model_cache.read_model(fm_filepath)
+    feature_order = feature_tree_order(UVLReader(fm_filepath).transform()) if fm_filepath.endswith('.uvl') else None
+    rows: list[dict[str, Any]] = []
+    baseline = None
+    for ordering in ORDERINGS:
+        for atomic, phases in itertools.product((False, True), repeat=2):
+            budget = CoreDeadBudget(seconds=timeout) if timeout is not None else None
+            start_time = time.perf_counter()
+            operation = SATCoreDeadFeatures(solver_name, budget=budget, ordering=ordering, atomic=atomic,
+                                            feature_order=feature_order, phases=phases).execute(sat_model)
+            seconds = time.perf_counter() - start_time
+            core_features, dead_features = operation.get_result()
+            complete = operation.get_state().complete
+            if not rows:
+                baseline = (core_features, dead_features) if complete else None
+            rows.append({'model': get_model_name(fm_filepath), 'ordering': ordering, 'atomic': atomic, 'phases': phases,
+                         'core': len(core_features), 'dead': len(dead_features),
+                         'solver_calls': operation.get_statistics().solver_calls,
+                         'atomic_set_variables': operation.get_statistics().atomic_set_variables,
+                         'seconds': round(seconds, 4), 'complete': complete,
+                         'same_result': '' if baseline is None or not complete else baseline == (core_features, dead_features)})
+    return rows
+
+
+def print_summary(rows: list[dict[str, Any]]) -> None:
+    """Totals of solver calls and time of each configuration on the models completed by all of them, relative to the model order."""
+    by_model: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        by_model.setdefault(row['model'], []).append(row)
+    completed = [model_rows for model_rows in by_model.values() if all(row['complete'] for row in model_rows)]
+    print(f'Models completed by all configurations: {len(completed)}/{len(by_model)}')
+    if not completed:
+        return
+    baseline_calls = sum(model_rows[0]['solver_calls'] for model_rows in completed)
+    baseline_seconds = sum(model_rows[0]['seconds'] for model_rows in completed)
+    for i, row in enumerate(completed[0]):
+        calls = sum(model_rows[i]['solver_calls'] for model_rows in completed)
+        seconds = sum(model_rows[i]['seconds'] for model_rows in completed)
+        speedups = [model_rows[0]['seconds'] / model_rows[i]['seconds'] for model_rows in completed if model_rows[i]['seconds'] > 0]
+        name = row['ordering'] + (' + atomic sets' if row['atomic'] else '') + (' + phases' if row['phases'] else '')
+        print(f'{name:<35} solver calls: {calls} ({(calls - baseline_calls) / baseline_calls * 100:+.2f}%), '
+              f'time: {seconds:.2f} s ({(seconds - baseline_seconds) / baseline_seconds * 100:+.2f}%), '
+              f'median speedup: {statistics.median(speedups) if speedups else 1.0:.3f}')
+    mismatches = [row['model'] for model_rows in completed for row in model_rows if row['same_result'] is False]
+    if mismatches:
+        print(f'Different results: {sorted(set(mismatches))}')
+
+
+def main(dir: str, solver_name: str, timeout: Optional[float], output: str) -> None:
+    models_filepaths = get_fm_filepath_models(dir)
+    n_models = len(models_filepaths)
+    rows = []
+    with open(output, 'w', encoding='utf8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS, delimiter=';')
+        writer.writeheader()
+        for i, fm_filepath in enumerate(models_filepaths, 1):
+            print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {fm_filepath}')
+            try:
+                model_rows = analyze(fm_filepath, solver_name, timeout)
+            except Exception as e:
+                print(e)
+                print(f'Error in model: {fm_filepath}')
+                continue
+            print('  |-> ' + ', '.join(f'{row["ordering"]}{"+atomic" if row["atomic"] else ""}{"+phases" if row["phases"] else ""}: '
+                                     f'{row["solver_calls"]}' for row in model_rows) + ' solver calls')
+            writer.writerows(model_rows)
+            file.flush()
+            rows.extend(model_rows)
+    print()
+    print_summary(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the solver calls and time of the core/dead analysis with each query ordering, atomic sets and refuting phases.')
+    parser.add_argument(dest='dir', type=str, help='Folder with the models (.uvl, .dimacs, .cnf).')
+    parser.add_argument('-s', '--solver', dest='solver', type=str, required=False, default='glucose3', help='Solver to use (default "glucose3").')
+    parser.add_argument('-t', '--timeout', dest='timeout', type=float, required=False, default=None, help='Seconds allowed to each analysis; models where any configuration runs out of time are left out of the summary.')
+    parser.add_argument('-o', '--output', dest='output', type=str, required=False, default=RESULTS_FILE, help=f'CSV file with a row per model and configuration (default {RESULTS_FILE}).')
+    args = parser.parse_args()
+
+    main(args.dir, args.solver, args.timeout, args.output)
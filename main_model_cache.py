@@ -0,0 +1,58 @@
+import os
+import argparse
+
+from transformations.model_cache import ModelCache, CACHE_DIR
+
+
+def get_fm_filepath_models(dir: str) -> list[str]:
+    """Get all models from the given directory."""
+    models = []
+    for root, dirs, files in os.walk(dir):
+        for file in files:
+            filepath = os.path.join(root, file)
+            models.append(filepath)
+    return sorted(models)
+
+
+def get_supported_models(dirs: list[str]) -> list[str]:
+    return [filepath for dir in dirs for filepath in get_fm_filepath_models(dir)
+            if filepath.endswith('.uvl') or filepath.endswith('.dimacs') or filepath.endswith('.cnf')]
+
+
+def warm(cache: ModelCache, dirs: list[str]) -> None:
+    models_filepaths = get_supported_models(dirs)
+    n_models = len(models_filepaths)
+    for i, fm_filepath in enumerate(models_filepaths, 1):
+        try:
+            print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {fm_filepath}')
+            compiled_model = cache.load(fm_filepath)
+            print(f'  |-> |F| = {len(compiled_model.variables)}, |Clauses| = {compiled_model.n_clauses}')
+        except Exception as e:
+            print(e)
+            print(f'Error in model: {fm_filepath}')
+
+
+def prune(cache: ModelCache, dirs: list[str], remove_all: bool) -> None:
+    keep = set()
+    if not remove_all:
+        keep = {cache.get_key(fm_filepath) for fm_filepath in get_supported_models(dirs)}
+    removed = cache.keys() - keep
+    for key in removed:
+        cache.remove(key)
+    print(f'Removed {len(removed)} cached models, kept {len(cache.keys())}.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage the on-disk cache of compiled models.')
+    parser.add_argument(dest='command', type=str, choices=['warm', 'prune'], help='"warm" compiles the models of the given folders, "prune" removes the cached models that do not belong to any of them.')
+    parser.add_argument(dest='dirs', type=str, nargs='*', help='Folders with the models (.uvl, .dimacs, .cnf).')
+    parser.add_argument('--all', dest='all', action='store_true', help='Remove all cached models when pruning.')
+    parser.add_argument('--cache-dir', dest='cache_dir', type=str, required=False, default=CACHE_DIR, help=f'Cache folder (default {CACHE_DIR}, or the MODEL_CACHE_DIR environment variable).')
+    args = parser.parse_args()
+
+    if args.command == 'warm':
+        warm(ModelCache(args.cache_dir), args.dirs)
+    else:
+        if not args.dirs and not args.all:
+            parser.error('prune requires the model folders to keep, or --all')
+        prune(ModelCache(args.cache_dir), args.dirs, args.all)
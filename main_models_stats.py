@@ -1,9 +1,10 @@
 import os
 import argparse
 
-from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+from utils.model_stats import CNF_EXTENSIONS, UVL_EXTENSIONS, scan_models, write_stats
 
-from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat, DimacsWriter, DimacsReader
+
+STATS_FILE = 'models_stats.csv'
 
 
 def get_fm_filepath_models(dir: str) -> list[str]:
@@ -12,36 +13,35 @@ def get_fm_filepath_models(dir: str) -> list[str]:
     for root, dirs, files in os.walk(dir):
         for file in files:
             filepath = os.path.join(root, file)
-            models.append(filepath)
-    return models
+            if filepath.endswith(CNF_EXTENSIONS + UVL_EXTENSIONS):
+                models.append(filepath)
+    return sorted(models)
 
     
-def main(dir: str):
+def main(dir: str, jobs: int, output: str):
     models_filepaths = get_fm_filepath_models(dir)
     n_models = len(models_filepaths)
     
-    for i, fm_filepath in enumerate(models_filepaths, 1):
-        try:
-            print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {fm_filepath}')
-            if fm_filepath.endswith('.uvl'):
-                # Get FM name
-                fm_name = '.'.join(os.path.basename(fm_filepath).split('.')[:-1])
-
-                # Load the feature model
-                feature_model = UVLReader(fm_filepath).transform()
-                print(f'  |-> |F| = {len(feature_model.get_features())}, |CTCs| = {len(feature_model.get_constraints())}')
-                
-            elif fm_filepath.endswith('.cnf') or fm_filepath.endswith('.dimacs'):
-                sat_model = DimacsReader(fm_filepath).transform()
-                print(f'  |-> |F| = {len(sat_model.variables)}, |Clauses| = {len(sat_model.get_all_clauses().clauses)}')
-        except Exception as e:
-            print(e)
+    rows = []
+    for i, (fm_filepath, row) in enumerate(zip(models_filepaths, scan_models(models_filepaths, jobs)), 1):
+        print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {fm_filepath}')
+        if 'error' in row:
+            print(row['error'])
             print(f'Error in model: {fm_filepath}')
+        elif row['format'] == 'uvl':
+            print(f'  |-> |F| = {row["features"]}, |CTCs| = {row["constraints"]}')
+        else:
+            print(f'  |-> |F| = {row["named_variables"]}, |Clauses| = {row["clauses"]}')
+        rows.append(row)
+    write_stats(output, rows)
+    print(f'Statistics of {n_models} models written to {output}.')
 
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Convert all FMs in .uvl from the given folder to dimacs (.cnf).')
+    parser = argparse.ArgumentParser(description='Statistics of all FMs (.uvl) and CNF models (.cnf, .dimacs) from the given folder.')
     parser.add_argument(dest='dir', type=str, help='Folder with the models.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, required=False, default=None, help='Number of processes scanning models (default: number of CPUs).')
+    parser.add_argument('-o', '--output', dest='output', type=str, required=False, default=STATS_FILE, help=f'CSV file with the statistics of each model (default {STATS_FILE}).')
     args = parser.parse_args()
 
-    main(args.dir)
+    main(args.dir, args.jobs, args.output)
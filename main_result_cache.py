@@ -0,0 +1,67 @@
+import os
+import argparse
+
+from operations.coredead_cache import RESULT_CACHE_DIR, RESULT_CACHE_MAX_ENTRIES, ResultCache, get_coredead_features
+from transformations import model_cache
+
+
+def get_fm_filepath_models(dir: str) -> list[str]:
+    """Get all models from the given directory."""
+    models = []
+    for root, dirs, files in os.walk(dir):
+        for file in files:
+            filepath = os.path.join(root, file)
+            models.append(filepath)
+    return sorted(models)
+
+
+def get_supported_models(dirs: list[str]) -> list[str]:
+    return [filepath for dir in dirs for filepath in get_fm_filepath_models(dir)
+            if filepath.endswith('.uvl') or filepath.endswith('.dimacs') or filepath.endswith('.cnf')]
+
+
+def get_model_name(fm_filepath: str) -> str:
+    path, filename = os.path.split(fm_filepath)
+    return '.'.join(filename.split('.')[:-1])
+
+
+def show(cache: ResultCache, dirs: list[str], solver_name: str, compute: bool) -> None:
+    """Print the core and dead features of each model from the cache ('-' if not cached), analyzing the misses if compute."""
+    print('Model;Cores;Deads')
+    for fm_filepath in get_supported_models(dirs):
+        try:
+            result = get_coredead_features(model_cache.read_model(fm_filepath), solver_name, cache, compute)
+        except Exception as e:
+            print(f'Error in model: {fm_filepath}: {e}')
+            continue
+        core, dead = (str(len(result[0])), str(len(result[1]))) if result is not None else ('-', '-')
+        print(f'{get_model_name(fm_filepath)};{core};{dead}')
+
+
+def prune(cache: ResultCache, dirs: list[str], remove_all: bool) -> None:
+    keep = set()
+    if not remove_all:
+        keep = {cache.get_key(model_cache.read_model(fm_filepath)) for fm_filepath in get_supported_models(dirs)}
+    removed = cache.keys() - keep
+    for key in removed:
+        cache.remove(key)
+    print(f'Removed {len(removed)} cached results, kept {len(cache.keys())}.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage the on-disk cache of core/dead results.')
+    parser.add_argument(dest='command', type=str, choices=['show', 'warm', 'prune'], help='"show" prints the cached results of the models of the given folders without calling a solver, "warm" also analyzes the models without a cached result, "prune" removes the cached results that do not belong to any of them.')
+    parser.add_argument(dest='dirs', type=str, nargs='*', help='Folders with the models (.uvl, .dimacs, .cnf).')
+    parser.add_argument('-s', '--solver', dest='solver', type=str, required=False, default='glucose3', help='Solver used to analyze the models when warming (default "glucose3").')
+    parser.add_argument('--all', dest='all', action='store_true', help='Remove all cached results when pruning.')
+    parser.add_argument('--max-entries', dest='max_entries', type=int, required=False, default=RESULT_CACHE_MAX_ENTRIES, help=f'Cached results kept; the least recently used are evicted (default {RESULT_CACHE_MAX_ENTRIES}).')
+    parser.add_argument('--cache-dir', dest='cache_dir', type=str, required=False, default=RESULT_CACHE_DIR, help=f'Cache folder (default {RESULT_CACHE_DIR}, or the RESULT_CACHE_DIR environment variable).')
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir, args.max_entries)
+    if args.command == 'prune':
+        if not args.dirs and not args.all:
+            parser.error('prune requires the model folders to keep, or --all')
+        prune(cache, args.dirs, args.all)
+    else:
+        show(cache, args.dirs, args.solver, args.command == 'warm')
@@ -0,0 +1,36 @@
+import os
+import argparse
+
+from utils.results_analytics import BASELINE_SOLVER, ResultsAggregates, solver_summary, write_summary
+
+
+SUMMARY_FILE = 'results_summary.csv'
+STATE_FILE = '.results_summary.npz'
+
+
+def main(filepaths: list[str], output: str, state: str, baseline: str, fresh: bool) -> None:
+    aggregates = ResultsAggregates.load(state) if os.path.exists(state) and not fresh else ResultsAggregates()
+    n_rows = aggregates.update(filepaths)
+    aggregates.save(state)
+    print(f'{n_rows} new rows parsed, {len(aggregates.seconds)} runs of {len(aggregates.keys)} (model, tool, solver) in total.')
+    rows = aggregates.summary(baseline)
+    write_summary(output, rows)
+    print(f'Summary of {len(rows)} (model, tool, solver) written to {output}.')
+    print()
+    print(f'{"Tool":<12}{"Solver":<14}{"Models":>8}{"Runs":>9}{"Timeouts":>10}{"Sum of medians (s)":>20}{"Speedup vs " + baseline:>20}')
+    for total in solver_summary(rows):
+        speedup = '-' if total['speedup_geomean'] is None else f'{total["speedup_geomean"]:.3f}'
+        print(f'{total["tool"]:<12}{total["solver"]:<14}{total["models"]:>8}{total["runs"]:>9}{total["timeouts"]:>10}'
+              f'{total["median_sum"]:>20.4f}{speedup:>20}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize results files and terminal logs (UTF-8 or UTF-16) per model and solver: runs, timeouts, median and min seconds, and speedup over a baseline solver.')
+    parser.add_argument(dest='files', type=str, nargs='+', help='Results files (.csv) or terminal logs with "Model;Tool;SAT-solver;[Cores;Deads;]Seconds" rows.')
+    parser.add_argument('-o', '--output', dest='output', type=str, required=False, default=SUMMARY_FILE, help=f'CSV file with a row per model, tool and solver (default {SUMMARY_FILE}).')
+    parser.add_argument('-b', '--baseline', dest='baseline', type=str, required=False, default=BASELINE_SOLVER, help=f'Solver the speedups are relative to (default {BASELINE_SOLVER}).')
+    parser.add_argument('--state', dest='state', type=str, required=False, default=STATE_FILE, help=f'File with the parsed runs, so that the next summary only parses the rows appended since (default {STATE_FILE}).')
+    parser.add_argument('--fresh', dest='fresh', action='store_true', help='Parse the files from the start, ignoring the state.')
+    args = parser.parse_args()
+
+    main(args.files, args.output, args.state, args.baseline, args.fresh)
@@ -1,10 +1,23 @@
 import os
+import sys
+import time
+import json
 import argparse
+import functools
+import dataclasses
 
-from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat, DimacsReader
-from operations.pysat_coredead_features import SATCoreDeadFeatures
+from typing import Any, Optional
+
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+from operations.coredead_cache import CACHE_MODES, RESULT_CACHE_DIR, ResultCache, record_result
+from operations.coredead_ordering import ORDERINGS, feature_tree_order
+from operations.pysat_coredead_features import SATCoreDeadFeatures, CoreDeadBudget, CoreDeadState
+from operations.pysat_coredead_portfolio import PORTFOLIO_SOLVERS, SATCoreDeadPortfolio, SolverChoice
+from transformations import model_cache
 
 from utils import timer, memory_profiler
+from utils.noise_control import ProcessCounters
 
 
 SOLVER_NAMES = """
@@ -25,22 +38,180 @@ SOLVER_NAMES = """
 
 HEADER = ['Model', 'Tool', 'SAT-solver', 'Seconds']
 TOOL_NAME = 'Flama'
+MODEL_CACHE_SIZE = 8  # parsed models kept in memory by a worker
 
 
-def main(fm_filepath: str, solver_name: str) -> None:
-    # Get feature model name
+def get_model_name(fm_filepath: str) -> str:
     path, filename = os.path.split(fm_filepath)
-    filename = '.'.join(filename.split('.')[:-1])
+    return '.'.join(filename.split('.')[:-1])
+
+
+def read_model(fm_filepath: str) -> PySATModel:
+    """Load the model, reusing the parsed model while the file does not change."""
+    stat = os.stat(fm_filepath)
+    return _read_model(os.path.abspath(fm_filepath), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _read_model(fm_filepath: str, mtime_ns: int, size: int) -> PySATModel:
+    return model_cache.read_model(fm_filepath)
+
+
+def get_budget(deadline: Optional[float], conflicts: Optional[int], progress: bool = False) -> Optional[CoreDeadBudget]:
+    """Budget of the analysis, printing its progress events to stderr if enabled."""
+    if deadline is None and conflicts is None and not progress:
+        return None
+    callback = (lambda event: print(event, file=sys.stderr, flush=True)) if progress else None
+    return CoreDeadBudget(seconds=deadline, conflicts=conflicts, progress=callback)
+
+
+def read_state(filepath: Optional[str]) -> Optional[CoreDeadState]:
+    """Partial result saved by a previous analysis, if any."""
+    if filepath is None or not os.path.exists(filepath):
+        return None
+    return CoreDeadState.load(filepath)
+
+
+def get_feature_order(fm_filepath: str, ordering: str) -> Optional[list[str]]:
+    """Features in the order of the feature tree, for the tree ordering of UVL models."""
+    if ordering != 'tree' or not fm_filepath.endswith('.uvl'):
+        return None
+    return feature_tree_order(UVLReader(fm_filepath).transform())
 
-    sat_model = DimacsReader(fm_filepath).transform()
 
-    # Core features
-    with timer.Timer(name='Time', logger=None):
-        core_features, dead_features = SATCoreDeadFeatures(solver_name).execute(sat_model).get_result()
+def run_job(job: dict[str, Any]) -> dict[str, Any]:
+    """Execute a worker job: `runs` timed analyses of a model with a solver.
+
+    With a `deadline` (seconds) or `conflicts` budget, an incomplete analysis is
+    reported with complete = false, and it is saved to the `resume` file (if
+    given) to be resumed by a later job. With `result_cache` (record or
+    validate), the complete results are kept in (or checked against) the result
+    cache at `result_cache_dir`; the timed runs always call the solver.
+    """
+    fm_filepath = job['model']
+    solver_name = job.get('solver', 'glucose3')
+    result: dict[str, Any] = {'id': job.get('id'), 'model': get_model_name(fm_filepath), 'tool': TOOL_NAME,
+                              'solver': solver_name, 'runs': [], 'error': None}
+    try:
+        sat_model = read_model(fm_filepath)
+        ordering = job.get('ordering', 'model')
+        feature_order = get_feature_order(fm_filepath, ordering)
+        cache_mode = job.get('result_cache')
+        if cache_mode not in (None, 'record', 'validate'):
+            raise ValueError(f'Result cache mode not allowed in timed runs: {cache_mode}')
+        cache = ResultCache(job.get('result_cache_dir', RESULT_CACHE_DIR)) if cache_mode is not None else None
+        cache_key = cache.get_key(sat_model) if cache is not None else None
+        # Every run resumes from the same state, and only the state of the last run is saved
+        resume_state = read_state(job.get('resume'))
+        state = None
+        for _ in range(job.get('runs', 1)):
+            run_timer = timer.Timer(logger=None, clock=time.perf_counter_ns if job.get('jobs', 1) > 1 else time.process_time_ns)
+            start_counters = ProcessCounters.of_self()
+            run_timer.start()
+            budget = get_budget(job.get('deadline'), job.get('conflicts'))
+            operation = SATCoreDeadFeatures(solver_name, job.get('preprocess', True), job.get('jobs', 1), job.get('simplify', False),
+                                            budget, resume_state, ordering, job.get('atomic', False),
+                                            feature_order, job.get('phases', False)).execute(sat_model)
+            time_seconds = run_timer.stop()
+            counters = ProcessCounters.of_self() - start_counters
+            core_features, dead_features = operation.get_result()
+            state = operation.get_state()
+            if cache is not None:
+                record_result(cache, cache_key, operation, cache_mode)
+            result['runs'].append({'core': len(core_features), 'dead': len(dead_features),
+                                   'seconds': round(time_seconds, 4),
+                                   'complete': state.complete, 'undecided': len(state.undecided),
+                                   'counters': dataclasses.asdict(counters),
+                                   'statistics': dataclasses.asdict(operation.get_statistics())})
+        if job.get('resume') is not None and state is not None:
+            state.save(job['resume'])
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    return result
+
+
+def worker() -> None:
+    """Serve jobs read as JSON lines from stdin, answering one JSON line per job on stdout."""
+    for line in sys.stdin:
+        if line.strip():
+            result = run_job(json.loads(line))
+            sys.stdout.write(json.dumps(result) + '\n')
+            sys.stdout.flush()
+
+
+def main(fm_filepath: str,
+         solver_name: str,
+         preprocess: bool = True,
+         jobs: int = 1,
+         portfolio: Optional[list[str]] = None,
+         history: Optional[list[str]] = None,
+         simplify: bool = False,
+         deadline: Optional[float] = None,
+         conflicts: Optional[int] = None,
+         progress: bool = False,
+         resume: Optional[str] = None,
+         ordering: str = 'model',
+         atomic: bool = False,
+         phases: bool = False,
+         cache_mode: Optional[str] = None,
+         cache_dir: str = RESULT_CACHE_DIR,
+         statistics: bool = False) -> None:
+    # Get feature model name
+    filename = get_model_name(fm_filepath)
+
+    sat_model = read_model(fm_filepath)
+
+    # Result cache: keyed by the normalized CNF, computed out of the timed analysis
+    cache = ResultCache(cache_dir) if cache_mode is not None else None
+    cache_key = cache.get_key(sat_model) if cache is not None else None
+    if cache_mode == 'serve':
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f'Result served from the cache (analyzed with {cached.get("solver")})')
+            print(f'Core features: {len(cached["core"])} {cached["core"]}')
+            print(f'Dead features: {len(cached["dead"])} {cached["dead"]}')
+            print()
+            print(';'.join(HEADER))
+            print(';'.join([filename, TOOL_NAME, cached.get('solver', solver_name), str(len(cached['core'])), str(len(cached['dead'])), 'cached']))
+            return
+
+    # Solver learned from previous results for this model, if any
+    if history:
+        chosen_solver = SolverChoice.from_results(history, portfolio or None).choose(filename)
+        if chosen_solver is not None:
+            print(f'Solver chosen from previous results: {chosen_solver}')
+            solver_name = chosen_solver
+            portfolio = None
+
+    # Core features (measured in wall time when the work is done by other processes)
+    clock = time.perf_counter_ns if portfolio is not None or jobs > 1 else time.process_time_ns
+    with timer.Timer(name='Time', logger=None, clock=clock):
+        if portfolio is not None:
+            operation = SATCoreDeadPortfolio(portfolio, preprocess).execute(sat_model)
+        else:
+            operation = SATCoreDeadFeatures(solver_name, preprocess, jobs, simplify,
+                                            get_budget(deadline, conflicts, progress), read_state(resume),
+                                            ordering, atomic, get_feature_order(fm_filepath, ordering), phases).execute(sat_model)
+            if resume is not None:
+                operation.get_state().save(resume)
+    if portfolio is not None:
+        solver_name = operation.get_winner()
+        print(f'Portfolio winner: {solver_name}')
+    elif cache is not None:
+        cached = record_result(cache, cache_key, operation, 'record' if cache_mode == 'record' else 'validate')
+        if cache_mode == 'validate':
+            print('Result validated against the cache' if cached else 'No cached result to validate against')
+    core_features, dead_features = operation.get_result()
     print(f'Core features: {len(core_features)} {core_features}')
     print(f'Dead features: {len(dead_features)} {dead_features}')
-    
-    time_seconds = str(round(timer.Timer.timers['Time'], 4))
+    if statistics:
+        print(operation.get_statistics())
+    complete = portfolio is not None or operation.get_state().complete
+    if not complete:
+        undecided_features = operation.get_undecided_features()
+        print(f'Undecided features: {len(undecided_features)} {undecided_features}')
+
+    time_seconds = str(round(timer.Timer.timers['Time'], 4)) if complete else 'timeout'
 
     print()
     header = ';'.join(HEADER)
@@ -51,9 +222,33 @@ def main(fm_filepath: str, solver_name: str) -> None:
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Analyze an FM using the SAT Solver.')
-    parser.add_argument('-fm', '--featuremodel', dest='feature_model', type=str, required=True, help='Input feature model. Supported formats: .uvl (UVL), .dimacs (Dimacs).')
+    parser.add_argument('-fm', '--featuremodel', dest='feature_model', type=str, required=False, help='Input feature model. Supported formats: .uvl (UVL), .dimacs (Dimacs).')
     parser.add_argument('-s', '--solver', dest='solver', type=str, required=False, default='glucose3', help='Solver to use (default "glucose3").' + SOLVER_NAMES)
+    parser.add_argument('--no-preprocess', dest='preprocess', action='store_false', help='Disable the propagation and failed-literal preprocessing.')
+    parser.add_argument('--simplify', dest='simplify', action='store_true', help='Simplify the CNF (equivalent variables, subsumed clauses, variable elimination) and analyze one feature per class of equivalent features.')
+    parser.add_argument('--order', dest='ordering', type=str, required=False, default='model', choices=ORDERINGS, help='Order in which the variables are queried: model (default), occurrences (most-constrained first), graph (clause occurrence graph) or tree (feature tree of .uvl models, else recovered from the CNF).')
+    parser.add_argument('--atomic-sets', dest='atomic', action='store_true', help='Decide the features that always appear together (atomic sets) as a unit.')
+    parser.add_argument('--phases', dest='phases', action='store_true', help='Steer the solver towards models that refute the remaining core/dead candidates, so that fewer solver calls are needed.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, required=False, default=1, help='Number of processes for the analysis (default 1).')
+    parser.add_argument('-p', '--portfolio', dest='portfolio', type=str, nargs='?', const='', default=None, help='Race several solvers (comma-separated, default "cadical153,minisat22,glucose4") and keep the first result.')
+    parser.add_argument('--history', dest='history', type=str, nargs='+', required=False, help='Results files (.csv) used to choose the fastest solver for the model.')
+    parser.add_argument('-t', '--timeout', dest='timeout', type=float, required=False, default=None, help='Stop the analysis after these seconds and report the partial result (the last column is "timeout").')
+    parser.add_argument('--conflicts', dest='conflicts', type=int, required=False, default=None, help='Conflict budget of each solver call; the variables whose calls exceed it are left undecided.')
+    parser.add_argument('--progress', dest='progress', action='store_true', help='Print progress events (decided/undecided features, solver calls per second) to stderr.')
+    parser.add_argument('--resume', dest='resume', type=str, required=False, default=None, help='File (.json) with the partial result of a previous analysis to resume from, updated with the new result.')
+    parser.add_argument('--result-cache', dest='cache_mode', type=str, required=False, default=None, choices=CACHE_MODES, help='Keep the result in the result cache (record), check it against the cached result of the same CNF (validate), or print the cached result without calling the solver if there is one (serve; the last column is "cached").')
+    parser.add_argument('--result-cache-dir', dest='cache_dir', type=str, required=False, default=RESULT_CACHE_DIR, help=f'Result cache folder (default {RESULT_CACHE_DIR}, or the RESULT_CACHE_DIR environment variable).')
+    parser.add_argument('--stats', dest='statistics', action='store_true', help='Print the statistics of the analysis (solver calls, pruned candidates, times) before the results.')
+    parser.add_argument('--worker', dest='worker', action='store_true', help='Stay alive serving analysis jobs as JSON lines from stdin (used by execute_Xruns.py).')
     args = parser.parse_args()
 
-    main(args.feature_model, args.solver)
+    if args.worker:
+        worker()
+    elif args.feature_model is None:
+        parser.error('the following arguments are required: -fm/--featuremodel')
+    else:
+        portfolio = None if args.portfolio is None else [name for name in args.portfolio.split(',') if name] or PORTFOLIO_SOLVERS
+        main(args.feature_model, args.solver, args.preprocess, args.jobs, portfolio, args.history, args.simplify,
+             args.timeout, args.conflicts, args.progress, args.resume, args.ordering, args.atomic, args.phases,
+             args.cache_mode, args.cache_dir, args.statistics)
     
\ No newline at end of file
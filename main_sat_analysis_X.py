@@ -5,6 +5,7 @@ from flamapy.metamodels.fm_metamodel.transformations import UVLReader
 
 from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat, DimacsReader
 from flamapy.metamodels.pysat_metamodel.operations import SATCoreDeadFeatures
+from transformations import model_cache
 
 from utils import timer, memory_profiler
 
@@ -34,26 +35,22 @@ def main(fm_filepath: str, solver_name: str, runs: int) -> None:
     path, filename = os.path.split(fm_filepath)
     filename = '.'.join(filename.split('.')[:-1])
 
-    # Load the feature model
-    if fm_filepath.endswith('.uvl'):
-        feature_model = UVLReader(fm_filepath).transform()
+    # Load the feature model (UVL or DIMACS) through the compiled-model cache
+    sat_model = model_cache.read_model(fm_filepath)
 
-        # Create the BDD from the FM
-        sat_model = FmToPysat(feature_model).transform()
-    else:
-        sat_model = DimacsReader(fm_filepath).transform()
-
-    for i in range(1, runs):
+    for i in range(1, runs + 1):
         #print(f'FM {i}/{runs}: {filename}') 
     
-        # Core features
-        with timer.Timer(name='Time', logger=None):
-            core_features, dead_features = SATCoreDeadFeatures(solver_name).execute(sat_model).get_result()
+        # Core features (time of this run, not accumulated over the runs)
+        run_timer = timer.Timer(logger=None)
+        run_timer.start()
+        core_features, dead_features = SATCoreDeadFeatures(solver_name).execute(sat_model).get_result()
+        elapsed_time = run_timer.stop()
         if i == 1:
             print(f'Core features: {len(core_features)} {core_features}')
             print(f'Dead features: {len(dead_features)} {dead_features}')
     
-        time_seconds = str(round(timer.Timer.timers['Time'], 4))
+        time_seconds = str(round(elapsed_time, 4))
 
         values = ';'.join([filename, TOOL_NAME, solver_name, time_seconds])
         print(values)
@@ -1,9 +1,17 @@
 import os
+import json
+import hashlib
 import argparse
+from typing import Any, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from flamapy.metamodels.fm_metamodel.transformations import UVLReader
 
-from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat, DimacsWriter
+from transformations.cnf_encoding import TSEITIN_THRESHOLD, encode_feature_model, write_dimacs
+from transformations.model_cache import get_tool_version
+
+
+MANIFEST_FILE = '.uvl2cnf.json'  # content hash of the source of each converted model, in the destination folder
 
 
 def get_fm_filepath_models(dir: str) -> list[str]:
@@ -15,41 +23,101 @@ def get_fm_filepath_models(dir: str) -> list[str]:
             models.append(filepath)
     return models
 
-    
-def main(dir: str, output_dir: str):
+
+def get_conversion_key(fm_filepath: str, options: dict[str, Any]) -> str:
+    """Hash of the content of the model, the encoding options and the tool version."""
+    digest = hashlib.sha256(get_tool_version().encode('utf-8'))
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    with open(fm_filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(output_dir: str) -> dict[str, str]:
+    filepath = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(filepath):
+        return {}
+    with open(filepath, 'r', encoding='utf8') as file:
+        return json.load(file)
+
+
+def write_manifest(output_dir: str, manifest: dict[str, str]) -> None:
+    filepath = os.path.join(output_dir, MANIFEST_FILE)
+    with open(filepath + '.tmp', 'w', encoding='utf8') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(filepath + '.tmp', filepath)
+
+
+def convert_model(fm_filepath: str, output_filepath: str, options: dict[str, Any]) -> dict[str, Any]:
+    """Convert a UVL model to a DIMACS file, returning the sizes of the model and of its CNF."""
+    # Load the feature model
+    feature_model = UVLReader(fm_filepath).transform()
+    n_features = len(feature_model.get_features())
+    n_constraints = len(feature_model.get_constraints())
+
+    # Convert to CNF (throught the PySAT metamodel) and stream it to dimacs (.cnf)
+    cnf = encode_feature_model(feature_model, options['tseitin'], options['simplify'], options['subsumption'])
+    write_dimacs(output_filepath, cnf)
+    return {'features': n_features, 'constraints': n_constraints, 'tseitin_constraints': cnf.tseitin_constraints,
+            'original_vars': cnf.original_vars, 'vars': cnf.n_vars,
+            'original_clauses': cnf.original_clauses, 'clauses': len(cnf.clauses)}
+
+
+def get_change(original: int, value: int) -> str:
+    return f'{(value - original) / original * 100:+.2f}%' if original else '+0.00%'
+
+
+def main(dir: str, output_dir: str, jobs: Optional[int], tseitin: Optional[int], simplify: bool, subsumption: bool, force: bool):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    models_filepaths = get_fm_filepath_models(dir)
+    options = {'tseitin': tseitin, 'simplify': simplify, 'subsumption': subsumption}
+    manifest = {} if force else read_manifest(output_dir)
+    models_filepaths = [filepath for filepath in get_fm_filepath_models(dir) if filepath.endswith('.uvl')]
     n_models = len(models_filepaths)
-    
-    for i, fm_filepath in enumerate(models_filepaths, 1):
-        try:
-            print(f'FM {i}/{n_models} ({round(i/n_models*100, 2)}%): {fm_filepath}')
-            if fm_filepath.endswith('.uvl'):
-                # Get FM name
-                fm_name = '.'.join(os.path.basename(fm_filepath).split('.')[:-1])
-                output_filepath = f'{os.path.join(output_dir,fm_name)}.cnf'
-
-                if not os.path.exists(output_filepath):
-                    # Load the feature model
-                    feature_model = UVLReader(fm_filepath).transform()
-                    print(f'  |-> |F| = {len(feature_model.get_features())}, |CTCs| = {len(feature_model.get_constraints())}')
-                    
-                    # Convert to CNF (throught the PySAT metamodel)
-                    sat_model = FmToPysat(feature_model).transform()
-
-                    # Convert to dimacs (.cnf)
-                    DimacsWriter(path=output_filepath, source_model=sat_model).transform()
-        except Exception as e:
-            print(e)
-            print(f'Error in model: {fm_filepath}')
+
+    pending = {}
+    for fm_filepath in models_filepaths:
+        # Get FM name
+        fm_name = '.'.join(os.path.basename(fm_filepath).split('.')[:-1])
+        output_filepath = f'{os.path.join(output_dir,fm_name)}.cnf'
+        key = get_conversion_key(fm_filepath, options)
+        if os.path.exists(output_filepath) and manifest.get(os.path.basename(output_filepath)) == key:
+            continue  # up to date
+        pending[fm_filepath] = (output_filepath, key)
+    print(f'{n_models - len(pending)}/{n_models} models up to date.')
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(convert_model, fm_filepath, output_filepath, options): fm_filepath
+                   for fm_filepath, (output_filepath, _) in pending.items()}
+        for i, future in enumerate(as_completed(futures), 1):
+            fm_filepath = futures[future]
+            output_filepath, key = pending[fm_filepath]
+            print(f'FM {i}/{len(pending)} ({round(i/len(pending)*100, 2)}%): {fm_filepath}')
+            try:
+                sizes = future.result()
+            except Exception as e:
+                print(e)
+                print(f'Error in model: {fm_filepath}')
+                continue
+            print(f'  |-> |F| = {sizes["features"]}, |CTCs| = {sizes["constraints"]} ({sizes["tseitin_constraints"]} Tseitin-encoded)')
+            print(f'  |-> vars: {sizes["original_vars"]} -> {sizes["vars"]}, '
+                  f'clauses: {sizes["original_clauses"]} -> {sizes["clauses"]} '
+                  f'({get_change(sizes["original_clauses"], sizes["clauses"])})')
+            manifest[os.path.basename(output_filepath)] = key
+            write_manifest(output_dir, manifest)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Convert all FMs in .uvl from the given folder to dimacs (.cnf).')
     parser.add_argument(dest='dir', type=str, help='Folder with the models.')
     parser.add_argument('-o', dest='output', type=str, required=False, default='.', help='Destination folder (default .).')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, required=False, default=None, help='Number of processes converting models (default: number of CPUs).')
+    parser.add_argument('--tseitin', dest='tseitin', type=int, nargs='?', const=TSEITIN_THRESHOLD, default=None, help=f'Tseitin-encode the constraints whose CNF has more clauses than the given threshold (default {TSEITIN_THRESHOLD}).')
+    parser.add_argument('--simplify', dest='simplify', action='store_true', help='Remove repeated literals, tautologies and duplicated clauses.')
+    parser.add_argument('--subsumption', dest='subsumption', action='store_true', help='Also remove the clauses subsumed by other clauses.')
+    parser.add_argument('--force', dest='force', action='store_true', help='Convert all models, even if they are up to date.')
     args = parser.parse_args()
 
-    main(args.dir, args.output)
+    main(args.dir, args.output, args.jobs, args.tseitin, args.simplify, args.subsumption, args.force)
@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import hashlib
+from typing import Any, Iterable, Optional
+from dataclasses import dataclass, field, asdict
+
+import numpy as np
+
+from dd.autoref import BDD
+
+from flamapy.core.operations import Operation
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+
+from operations.coredead_cache import get_cnf_hash
+from operations.coredead_ordering import ORDERINGS, order_variables
+from operations.pysat_coredead_features import SATCoreDeadFeatures, CoreDeadStatistics
+from transformations.clause_store import ClauseStore
+from transformations.model_cache import get_tool_version
+
+
+BDD_CACHE_DIR = os.environ.get('BDD_CACHE_DIR', '.bdd_cache')
+BDD_FORMAT_VERSION = 1
+MAX_NODES = 1_000_000  # nodes of the BDD manager (with dd.autoref, roughly 1 GB)
+COMPILE_SECONDS = 60.0
+
+
+class CompilationBudgetExceeded(Exception):
+    """The compilation of a model exceeded its size or time budget."""
+
+
+@dataclass
+class CompilationBudget:
+    """Limits of the compilation of a model: live nodes of the BDD manager and seconds."""
+
+    max_nodes: int = MAX_NODES
+    seconds: float = COMPILE_SECONDS
+
+    def covers(self, other: 'CompilationBudget') -> bool:
+        """Whether this budget is at most the other one (so it would also be exceeded)."""
+        return self.max_nodes <= other.max_nodes and self.seconds <= other.seconds
+
+
+@dataclass
+class CompiledBDD:
+    """A BDD of a CNF flattened into arrays, which queries traverse once without the BDD manager.
+
+    Node i tests the variable at level levels[i], with children lows[i] and
+    highs[i]. Nodes 0 and 1 are the false and true terminals (level
+    len(variables)), and every node comes after its children. The levels are
+    positions in variables, the CNF variables in the order of the BDD.
+    """
+
+    variables: list[int]
+    levels: np.ndarray
+    lows: np.ndarray
+    highs: np.ndarray
+    root: int
+    compile_seconds: float = 0.0
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.levels)
+
+    def _model_counts(self) -> list[int]:
+        """Models of the function of each node over the variables at its level and below."""
+        levels, lows, highs = self.levels.tolist(), self.lows.tolist(), self.highs.tolist()
+        counts = [0, 1]
+        for node in range(2, self.n_nodes):
+            level, low, high = levels[node], lows[node], highs[node]
+            counts.append((counts[low] << (levels[low] - level - 1)) + (counts[high] << (levels[high] - level - 1)))
+        return counts
+
+    def count(self) -> int:
+        """Number of configurations (models of the CNF over all its variables)."""
+        return self._model_counts()[self.root] << int(self.levels[self.root])
+
+    def selection_counts(self) -> tuple[int, dict[int, int]]:
+        """Number of configurations, and of configurations where each variable is selected, in one pass over the nodes.
+
+        The paths reaching each node are counted top-down and the models below
+        it bottom-up. A variable is selected in the models of the high edges of
+        its nodes, and in half the models of the edges that skip its level.
+        """
+        n_levels = len(self.variables)
+        levels, lows, highs = self.levels.tolist(), self.lows.tolist(), self.highs.tolist()
+        counts = self._model_counts()
+        total = counts[self.root] << levels[self.root]
+        selected = [0] * n_levels
+        skipped = [0] * (n_levels + 1)  # difference array of the selections of the skipped levels
+        paths = [0] * self.n_nodes
+        paths[self.root] = 1 << levels[self.root]
+        if levels[self.root] > 0 and counts[self.root] > 0:
+            skipped[0] += total >> 1
+            skipped[levels[self.root]] -= total >> 1
+        for node in range(self.n_nodes - 1, 1, -1):
+            if not paths[node]:
+                continue
+            level = levels[node]
+            for child, is_high in ((lows[node], False), (highs[node], True)):
+                gap = levels[child] - level - 1
+                paths[child] += paths[node] << gap
+                if not counts[child]:
+                    continue
+                models = (paths[node] * counts[child]) << gap
+                if is_high:
+                    selected[level] += models
+                if gap > 0:
+                    skipped[level + 1] += models >> 1
+                    skipped[levels[child]] -= models >> 1
+        running = 0
+        for level in range(n_levels):
+            running += skipped[level]
+            selected[level] += running
+        return (total, {var: selected[level] for level, var in enumerate(self.variables)})
+
+    def save(self, filepath: str) -> None:
+        # Write to a temporary file and rename, so concurrent runs never see partial files
+        with open(f'{filepath}.{os.getpid()}.tmp', 'wb') as file:
+            np.savez_compressed(file, variables=np.asarray(self.variables, dtype=np.int32), levels=self.levels,
+                                lows=self.lows, highs=self.highs, root=np.int64(self.root),
+                                compile_seconds=np.float64(self.compile_seconds))
+        os.replace(f'{filepath}.{os.getpid()}.tmp', filepath)
+
+    @staticmethod
+    def load(filepath: str) -> 'CompiledBDD':
+        with np.load(filepath) as data:
+            return CompiledBDD(data['variables'].tolist(), data['levels'], data['lows'], data['highs'],
+                               int(data['root']), float(data['compile_seconds']))
+
+
+def compile_bdd(clauses: Iterable[list[int]], variables: list[int], budget: Optional[CompilationBudget] = None) -> CompiledBDD:
+    """BDD of the conjunction of the clauses with the given variable order (the first variable at the top).
+
+    The clauses are conjoined from the bottom of the order upwards, so that the
+    intermediate BDDs stay small. Raise CompilationBudgetExceeded if the live
+    nodes or the time exceed the budget.
+    """
+    budget = CompilationBudget() if budget is None else budget
+    start_time = time.perf_counter()
+    bdd = BDD()
+    bdd.configure(reordering=False)
+    names = [f'x{var}' for var in variables]
+    bdd.declare(*names)
+    level = {var: i for i, var in enumerate(variables)}
+    literals = {var: bdd.var(name) for var, name in zip(variables, names)}
+    root = bdd.true
+    clauses = sorted((sorted(clause, key=lambda lit: -level[abs(lit)]) for clause in clauses),
+                     key=lambda clause: -level[abs(clause[0])] if clause else 0)
+    for i, clause in enumerate(clauses, 1):
+        disjunction = bdd.false
+        for lit in clause:
+            disjunction |= literals[lit] if lit > 0 else ~literals[-lit]
+        root &= disjunction
+        if root == bdd.false:
+            break
+        if time.perf_counter() - start_time > budget.seconds:
+            raise CompilationBudgetExceeded(f'Compilation time exceeded {budget.seconds} s ({i}/{len(clauses)} clauses).')
+        if len(bdd) > budget.max_nodes:
+            bdd.collect_garbage()
+            if len(bdd) > budget.max_nodes:
+                raise CompilationBudgetExceeded(f'BDD exceeded {budget.max_nodes} nodes ({i}/{len(clauses)} clauses).')
+    compiled = flatten_bdd(bdd, root, variables)
+    compiled.compile_seconds = time.perf_counter() - start_time
+    return compiled
+
+
+def flatten_bdd(bdd: BDD, root: Any, variables: list[int]) -> CompiledBDD:
+    """Arrays of the nodes reachable from the root, children first.
+
+    Complemented edges of the manager are resolved, so a node and its
+    complement are flattened as different nodes.
+    """
+    n_levels = len(variables)
+    index = {int(bdd.false): 0, int(bdd.true): 1}
+    levels, lows, highs = [n_levels, n_levels], [0, 0], [0, 0]
+    stack = [root]
+    while stack:
+        node = stack[-1]
+        if int(node) in index:
+            stack.pop()
+            continue
+        low, high = (~node.low, ~node.high) if node.negated else (node.low, node.high)
+        pending = [child for child in (low, high) if int(child) not in index]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        index[int(node)] = len(levels)
+        levels.append(node.level)
+        lows.append(index[int(low)])
+        highs.append(index[int(high)])
+    return CompiledBDD(variables, np.asarray(levels, dtype=np.int32), np.asarray(lows, dtype=np.int32),
+                       np.asarray(highs, dtype=np.int32), index[int(root)])
+
+
+class BDDCache:
+    """On-disk cache of compiled BDDs, keyed by the hash of the normalized CNF, the variable ordering and the tool version.
+
+    The models whose compilation exceeded a budget are also recorded, so that
+    they are not compiled again with the same or a smaller budget.
+    """
+
+    def __init__(self, cache_dir: str = BDD_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+        self.tool_version = f'bdd={BDD_FORMAT_VERSION};{get_tool_version()}'
+
+    def get_key(self, model: PySATModel, ordering: str) -> str:
+        digest = hashlib.sha256(f'{self.tool_version};ordering={ordering}'.encode('utf-8'))
+        digest.update(get_cnf_hash(model.get_all_clauses().clauses, model.variables).encode('utf-8'))
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[CompiledBDD]:
+        filepath = os.path.join(self.cache_dir, key + '.npz')
+        return CompiledBDD.load(filepath) if os.path.exists(filepath) else None
+
+    def save(self, key: str, compiled: CompiledBDD) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        compiled.save(os.path.join(self.cache_dir, key + '.npz'))
+
+    def exceeded_budget(self, key: str) -> Optional[CompilationBudget]:
+        """The largest budget the compilation exceeded, if any."""
+        filepath = os.path.join(self.cache_dir, key + '.exceeded.json')
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, 'r', encoding='utf8') as file:
+            return CompilationBudget(**json.load(file))
+
+    def save_exceeded_budget(self, key: str, budget: CompilationBudget) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        filepath = os.path.join(self.cache_dir, key + '.exceeded.json')
+        with open(f'{filepath}.{os.getpid()}.tmp', 'w', encoding='utf8') as file:
+            json.dump(asdict(budget), file)
+        os.replace(f'{filepath}.{os.getpid()}.tmp', filepath)
+
+
+@dataclass
+class BDDStatistics:
+    """Where the answers of a BDDCoreDeadFeatures came from and what they cost."""
+
+    backend: str = 'bdd'  # 'bdd', or 'sat' when the compilation exceeded its budget
+    cached: bool = False
+    nodes: int = 0
+    compile_seconds: float = 0.0  # of the compilation, even if it was done by a previous run
+    query_seconds: float = 0.0
+    fallback_reason: str = ''
+    sat_statistics: Optional[CoreDeadStatistics] = field(default=None, repr=False)
+
+    def __str__(self) -> str:
+        if self.backend == 'sat':
+            return f'Backend: sat ({self.fallback_reason})\n{self.sat_statistics}'
+        return (f'Backend: bdd ({self.nodes} nodes, {"cached, " if self.cached else ""}compiled in {round(self.compile_seconds, 4)} s), '
+                f'queries: {round(self.query_seconds, 4)} s')
+
+
+class BDDCoreDeadFeatures(Operation):
+    """Core and dead features, configurations and commonality of each feature from a compiled BDD of the model.
+
+    The BDD is compiled once (and kept in the cache, if given) and every query
+    is a linear pass over its nodes. If the compilation exceeds the budget, the
+    core and dead features are computed by SATCoreDeadFeatures instead, and the
+    configurations and commonalities are not available (None).
+    """
+
+    def __init__(self,
+                 solver_name: str = 'glucose3',
+                 budget: Optional[CompilationBudget] = None,
+                 ordering: str = 'graph',
+                 cache: Optional[BDDCache] = None) -> None:
+        if ordering not in ORDERINGS:
+            raise ValueError(f'Unknown ordering: {ordering} (choose from {", ".join(ORDERINGS)}).')
+        self.result: tuple[list[Any], list[Any]] = ()
+        self.solver_name = solver_name
+        self.budget = CompilationBudget() if budget is None else budget
+        self.ordering = ordering
+        self.cache = cache
+        self.configurations: Optional[int] = None
+        self.commonality: Optional[dict[str, float]] = None
+        self.statistics = BDDStatistics()
+
+    def get_result(self) -> tuple[list[Any], list[Any]]:
+        return self.result
+
+    def get_configurations_number(self) -> Optional[int]:
+        return self.configurations
+
+    def get_commonality(self) -> Optional[dict[str, float]]:
+        """Fraction of the configurations where each feature is selected."""
+        return self.commonality
+
+    def get_statistics(self) -> BDDStatistics:
+        return self.statistics
+
+    def execute(self, model: PySATModel) -> 'BDDCoreDeadFeatures':
+        self.statistics = BDDStatistics()
+        compiled = self.compile(model)
+        if compiled is None:
+            operation = SATCoreDeadFeatures(self.solver_name).execute(model)
+            self.statistics.backend = 'sat'
+            self.statistics.sat_statistics = operation.get_statistics()
+            self.result = operation.get_result()
+            self.configurations = self.commonality = None
+            return self
+        start_time = time.perf_counter()
+        total, selected = compiled.selection_counts()
+        features = [(name, var) for name, var in model.variables.items()]
+        self.configurations = total
+        self.commonality = {name: (selected[var] / total if total else 0.0) for name, var in features}
+        if total == 0:
+            self.result = ([], [])  # as the SAT analysis of an unsatisfiable model
+        else:
+            self.result = ([name for name, var in features if selected[var] == total],
+                           [name for name, var in features if selected[var] == 0])
+        self.statistics.query_seconds = time.perf_counter() - start_time
+        return self
+
+    def compile(self, model: PySATModel) -> Optional[CompiledBDD]:
+        """The compiled BDD of the model (from the cache if possible), or None if the compilation exceeds the budget."""
+        key = self.cache.get_key(model, self.ordering) if self.cache is not None else None
+        if key is not None:
+            compiled = self.cache.load(key)
+            if compiled is not None:
+                self.statistics.cached = True
+                self.statistics.nodes = compiled.n_nodes
+                self.statistics.compile_seconds = compiled.compile_seconds
+                return compiled
+            exceeded = self.cache.exceeded_budget(key)
+            if exceeded is not None and self.budget.covers(exceeded):
+                self.statistics.fallback_reason = f'compilation exceeded the budget of a previous run ({exceeded})'
+                return None
+        clauses = model.get_all_clauses().clauses
+        store = clauses if isinstance(clauses, ClauseStore) else ClauseStore.from_clauses(clauses)
+        max_var = max([store.max_var] + list(model.variables.values()))
+        variables = order_variables(clauses, range(1, max_var + 1), self.ordering)
+        try:
+            compiled = compile_bdd(clauses, variables, self.budget)
+        except CompilationBudgetExceeded as e:
+            self.statistics.fallback_reason = str(e)
+            if key is not None:
+                self.cache.save_exceeded_budget(key, self.budget)
+            return None
+        self.statistics.nodes = compiled.n_nodes
+        self.statistics.compile_seconds = compiled.compile_seconds
+        if key is not None:
+            self.cache.save(key, compiled)
+        return compiled
@@ -0,0 +1,179 @@
+import time
+from typing import Iterable, Optional
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from transformations.cnf_encoding import simplify_clauses
+
+
+BVE_MAX_OCCURRENCES = 16  # variables occurring more often in a polarity are not eliminated
+
+
+@dataclass
+class SimplifiedCNF:
+    """A CNF simplified for the analysis of some protected variables (e.g., the features).
+
+    Each substituted variable is equivalent to the literal of its representative,
+    and the eliminated variables are not protected, so the protected variables
+    (or their representatives) keep the same core/dead status.
+    """
+
+    clauses: list[list[int]]
+    substitution: dict[int, int] = field(default_factory=dict)  # variable -> literal of its representative
+    eliminated: list[int] = field(default_factory=list)
+    satisfiable: bool = True  # False if a literal is equivalent to its negation
+    original_variables: int = 0
+    original_clauses: int = 0
+    simplification_time: float = 0.0
+
+    def get_literal(self, var: int) -> int:
+        """Literal of the representative of the variable (the variable itself if not substituted)."""
+        return self.substitution.get(var, var)
+
+    @property
+    def variables(self) -> int:
+        return len({abs(lit) for clause in self.clauses for lit in clause})
+
+    def __str__(self) -> str:
+        return (f'Simplification: {len(self.substitution)} equivalent variables, {len(self.eliminated)} eliminated, '
+                f'variables: {self.original_variables} -> {self.variables}, '
+                f'clauses: {self.original_clauses} -> {len(self.clauses)} ({self.simplification_time:.4f} s)')
+
+
+def simplify_cnf(clauses: Iterable[list[int]], protected: Iterable[int], eliminate: bool = True) -> SimplifiedCNF:
+    """Substitute equivalent literals, remove subsumed clauses and eliminate unprotected variables.
+
+    The representative of a class of equivalent variables is its first protected
+    variable, in the given order.
+    """
+    start_time = time.perf_counter()
+    clauses = list(clauses)
+    protected = list(protected)
+    result = SimplifiedCNF(clauses=[], original_clauses=len(clauses),
+                           original_variables=len({abs(lit) for clause in clauses for lit in clause}))
+    substitution = equivalent_literals(clauses, protected)
+    if substitution is None:
+        result.satisfiable = False
+        result.clauses = clauses
+    else:
+        result.substitution = substitution
+        clauses = [[substitution.get(abs(lit), abs(lit)) * (1 if lit > 0 else -1) for lit in clause] for clause in clauses]
+        clauses = simplify_clauses(clauses, subsumption=True)
+        if eliminate:
+            kept = {abs(substitution.get(var, var)) for var in protected}
+            clauses, result.eliminated = eliminate_variables(clauses, kept)
+        result.clauses = clauses
+    result.simplification_time = time.perf_counter() - start_time
+    return result
+
+
+def equivalent_literals(clauses: list[list[int]], preferred: list[int]) -> Optional[dict[int, int]]:
+    """Equivalent literals, found as the strongly connected components of the binary implication graph.
+
+    Return the substitution of each variable by the literal of the representative
+    of its class (preferred variables first, then the lowest), or None if a
+    literal is equivalent to its negation (the formula is unsatisfiable).
+    """
+    graph: dict[int, list[int]] = defaultdict(list)
+    for clause in clauses:
+        if len(clause) == 2:
+            a, b = clause
+            graph[-a].append(b)
+            graph[-b].append(a)
+    rank = {var: i for i, var in enumerate(preferred)}
+    substitution: dict[int, int] = {}
+    for component in strongly_connected_components(graph):
+        if len(component) < 2:
+            continue
+        representative = min(component, key=lambda lit: (rank.get(abs(lit), len(rank)), abs(lit)))
+        literals = set(component)
+        for lit in component:
+            if -lit in literals:
+                return None
+            if lit != representative:
+                substitution[abs(lit)] = representative if lit > 0 else -representative
+    return substitution
+
+
+def strongly_connected_components(graph: dict[int, list[int]]) -> list[list[int]]:
+    """Tarjan's algorithm, iterative so that long implication chains do not overflow the stack."""
+    index: dict[int, int] = {}
+    lowlink: dict[int, int] = {}
+    on_stack: set[int] = set()
+    stack: list[int] = []
+    components = []
+    for root in list(graph):
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, i = work.pop()
+            if i == 0:
+                index[node] = lowlink[node] = len(index)
+                stack.append(node)
+                on_stack.add(node)
+            successors = graph.get(node, ())
+            if i > 0:
+                lowlink[node] = min(lowlink[node], lowlink[successors[i - 1]])
+            while i < len(successors) and successors[i] in index:
+                if successors[i] in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successors[i]])
+                i += 1
+            if i < len(successors):
+                work.append((node, i + 1))
+                work.append((successors[i], 0))
+                continue
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    other = stack.pop()
+                    on_stack.discard(other)
+                    component.append(other)
+                    if other == node:
+                        break
+                components.append(component)
+    return components
+
+
+def eliminate_variables(clauses: list[list[int]], kept: set[int]) -> tuple[list[list[int]], list[int]]:
+    """Bounded variable elimination of the variables not kept (BVE-lite).
+
+    A variable is eliminated, replacing its clauses by their resolvents on it,
+    only if it does not increase the number of clauses. The solutions projected
+    on the other variables do not change.
+    """
+    clauses = list(clauses)
+    alive = [True] * len(clauses)
+    occurrences: dict[int, set[int]] = defaultdict(set)
+    for i, clause in enumerate(clauses):
+        for lit in clause:
+            occurrences[lit].add(i)
+    eliminated = []
+    candidates = sorted({abs(lit) for lit in occurrences} - kept)
+    for var in candidates:
+        positive, negative = occurrences[var], occurrences[-var]
+        if len(positive) > BVE_MAX_OCCURRENCES or len(negative) > BVE_MAX_OCCURRENCES:
+            continue
+        resolvents = []
+        for i in positive:
+            for j in negative:
+                resolvent = set(clauses[i]) | set(clauses[j])
+                resolvent.discard(var)
+                resolvent.discard(-var)
+                if not any(-lit in resolvent for lit in resolvent):
+                    resolvents.append(sorted(resolvent, key=abs))
+            if len(resolvents) > len(positive) + len(negative):
+                break
+        if len(resolvents) > len(positive) + len(negative):
+            continue
+        for i in positive | negative:
+            alive[i] = False
+            for lit in clauses[i]:
+                occurrences[lit].discard(i)
+        for resolvent in resolvents:
+            alive.append(True)
+            clauses.append(resolvent)
+            for lit in resolvent:
+                occurrences[lit].add(len(clauses) - 1)
+        eliminated.append(var)
+    return (simplify_clauses(clause for i, clause in enumerate(clauses) if alive[i]), eliminated)
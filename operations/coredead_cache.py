@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+
+from operations.pysat_coredead_features import SATCoreDeadFeatures
+from transformations.clause_store import ClauseStore
+from transformations.model_cache import get_tool_version
+
+
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', '.result_cache')
+RESULT_CACHE_FORMAT_VERSION = 1
+RESULT_CACHE_MAX_ENTRIES = 10000  # least recently used entries beyond this are evicted
+RESULT_EXTENSION = '.json'
+CACHE_MODES = ('record', 'validate', 'serve')
+
+
+class CachedResultMismatch(Exception):
+    """The result of an analysis differs from the cached result of the same CNF."""
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer of each value (uint64 arithmetic wraps around)."""
+    x = values.astype(np.int64).view(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def get_cnf_hash(clauses: Iterable[list[int]], variables: dict[str, int]) -> str:
+    """Hash of the normalized CNF and the names of its variables.
+
+    The CNF is normalized as a set of clauses, each one a set of literals, so
+    the order of clauses and literals and repeated literals or clauses do not
+    change the hash.
+    """
+    digest = hashlib.sha256(np.unique(_mix(get_clause_hashes(clauses).view(np.int64))).tobytes())
+    digest.update(json.dumps(sorted(variables.items())).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_clause_hashes(clauses: Iterable[list[int]]) -> np.ndarray:
+    """Hash of each clause as a set of literals (the order and repetitions of its literals do not matter).
+
+    Each clause is hashed (vectorized) as the sum of a mix of its distinct literals.
+    """
+    store = clauses if isinstance(clauses, ClauseStore) else ClauseStore.from_clauses(clauses)
+    start, end = int(store.offsets[0]), int(store.offsets[-1])
+    literals = np.asarray(store.literals[start:end])
+    clause_ids = np.repeat(np.arange(len(store)), store.lengths())
+    order = np.lexsort((literals, clause_ids))
+    literals, clause_ids = literals[order], clause_ids[order]
+    repeated = np.zeros(len(literals), dtype=bool)
+    repeated[1:] = (literals[1:] == literals[:-1]) & (clause_ids[1:] == clause_ids[:-1])
+    mixed = _mix(literals)
+    mixed[repeated] = 0
+    clause_hashes = np.zeros(len(store), dtype=np.uint64)
+    np.add.at(clause_hashes, clause_ids, mixed)
+    return clause_hashes
+
+
+class ResultCache:
+    """On-disk cache of core/dead results, keyed by the hash of the normalized CNF and the tool version.
+
+    The result does not depend on the solver, which is kept as metadata. Each
+    read refreshes the modification time of the entry, so the least recently
+    used entries are evicted when there are more than max_entries.
+    """
+
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, max_entries: int = RESULT_CACHE_MAX_ENTRIES) -> None:
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.tool_version = f'results={RESULT_CACHE_FORMAT_VERSION};{get_tool_version()}'
+
+    def get_key(self, model: PySATModel) -> str:
+        digest = hashlib.sha256(self.tool_version.encode('utf-8'))
+        digest.update(get_cnf_hash(model.get_all_clauses().clauses, model.variables).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_entry_filepath(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + RESULT_EXTENSION)
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        filepath = self.get_entry_filepath(key)
+        try:
+            with open(filepath, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+            os.utime(filepath)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry
+
+    def put(self, key: str, core: list[str], dead: list[str], **metadata: Any) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        filepath = self.get_entry_filepath(key)
+        entry = {'core': core, 'dead': dead, 'created': time.time(), **metadata}
+        # Write to a temporary file and rename, so concurrent runs never see partial entries
+        with open(f'{filepath}.{os.getpid()}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(entry, file)
+        os.replace(f'{filepath}.{os.getpid()}.tmp', filepath)
+        self.evict()
+
+    def keys(self) -> set[str]:
+        if not os.path.isdir(self.cache_dir):
+            return set()
+        return {filename[:-len(RESULT_EXTENSION)] for filename in os.listdir(self.cache_dir)
+                if filename.endswith(RESULT_EXTENSION)}
+
+    def remove(self, key: str) -> None:
+        filepath = self.get_entry_filepath(key)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries beyond max_entries."""
+        keys = self.keys()
+        if len(keys) <= self.max_entries:
+            return
+        mtimes = {}
+        for key in keys:
+            try:
+                mtimes[key] = os.path.getmtime(self.get_entry_filepath(key))
+            except FileNotFoundError:
+                continue
+        for key in sorted(mtimes, key=mtimes.get)[:len(mtimes) - self.max_entries]:
+            self.remove(key)
+
+
+def compare_results(cached: dict[str, Any], core: list[str], dead: list[str]) -> Optional[str]:
+    """Differences between a cached result and a new one, or None if they are the same sets."""
+    differences = []
+    for name, features in (('core', core), ('dead', dead)):
+        missing = set(cached[name]) - set(features)
+        extra = set(features) - set(cached[name])
+        if missing or extra:
+            differences.append(f'{name}: {len(missing)} missing {sorted(missing)[:10]}, {len(extra)} extra {sorted(extra)[:10]}')
+    return '; '.join(differences) if differences else None
+
+
+def record_result(cache: ResultCache, key: str, operation: SATCoreDeadFeatures, mode: str = 'record', **metadata: Any) -> bool:
+    """Keep the result of an executed analysis in the cache (only if it is complete).
+
+    In validate mode, raise CachedResultMismatch if it differs from the cached
+    result, which is kept. Return whether there was a cached result.
+    """
+    if not operation.get_state().complete:
+        return False
+    core, dead = operation.get_result()
+    cached = cache.get(key)
+    if cached is not None and mode == 'validate':
+        differences = compare_results(cached, core, dead)
+        if differences is not None:
+            raise CachedResultMismatch(f'The result differs from the cached result ({cached.get("solver")}): {differences}')
+    if cached is None or mode == 'record':
+        cache.put(key, core, dead, solver=operation.solver_name, solver_calls=operation.get_statistics().solver_calls, **metadata)
+    return cached is not None
+
+
+def get_coredead_features(model: PySATModel,
+                          solver_name: str = 'glucose3',
+                          cache: Optional[ResultCache] = None,
+                          compute: bool = True) -> Optional[tuple[list[str], list[str]]]:
+    """Core and dead features for callers that do not time the analysis (serve mode).
+
+    The cached result is returned without calling a solver. On a miss, the
+    analysis is run and cached, unless compute is False (then None is returned).
+    """
+    cache = ResultCache() if cache is None else cache
+    key = cache.get_key(model)
+    cached = cache.get(key)
+    if cached is not None:
+        return (cached['core'], cached['dead'])
+    if not compute:
+        return None
+    operation = SATCoreDeadFeatures(solver_name).execute(model)
+    record_result(cache, key, operation)
+    return operation.get_result()
@@ -0,0 +1,382 @@
+import os
+import json
+import time
+from typing import Any, Iterable, Optional
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from pysat.solvers import Solver
+
+from flamapy.core.operations import Operation
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+
+from operations.coredead_cache import get_clause_hashes, get_cnf_hash
+from operations.pysat_coredead_features import (CoreDeadPruning, CoreDeadStatistics, decide_candidates, probe_failed_literals,
+                                                propagate_root, prune_with_model)
+from transformations.clause_store import ClauseStore, append_formula
+
+
+@dataclass
+class CoreDeadVerdicts:
+    """Core/dead features of a model version and the models (witnesses) that refuted the other candidates.
+
+    Each witness is a satisfying assignment of the features (one row, in the
+    order of features). The verdicts and witnesses of a version are the
+    starting point of the incremental analysis of the next version. The hash
+    of the CNF identifies the version they belong to.
+    """
+
+    features: list[str] = field(default_factory=list)
+    core: list[str] = field(default_factory=list)
+    dead: list[str] = field(default_factory=list)
+    witnesses: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=bool))
+    satisfiable: bool = True
+    cnf_hash: str = ''
+
+    def matches(self, model: PySATModel) -> bool:
+        """Whether these are the verdicts of the model (same features and CNF)."""
+        return (self.features == list(model.variables)
+                and self.cnf_hash == get_cnf_hash(model.get_all_clauses().clauses, model.variables))
+
+    @staticmethod
+    def from_pruning(model: PySATModel, pruning: 'WitnessPruning', satisfiable: bool = True) -> 'CoreDeadVerdicts':
+        cnf_hash = get_cnf_hash(model.get_all_clauses().clauses, model.variables)
+        if not satisfiable:
+            return CoreDeadVerdicts(features=list(model.variables), satisfiable=False, cnf_hash=cnf_hash)
+        core = [name for name, var in model.variables.items() if var in pruning.core]
+        dead = [name for name, var in model.variables.items() if var in pruning.dead]
+        witnesses = np.array(pruning.witnesses, dtype=bool).reshape(len(pruning.witnesses), len(model.variables))
+        return CoreDeadVerdicts(list(model.variables), core, dead, witnesses, cnf_hash=cnf_hash)
+
+    def save(self, filepath: str) -> None:
+        # Write to a temporary file and rename, so an interrupted save keeps the previous verdicts
+        with open(filepath + '.tmp', 'wb') as file:
+            np.savez_compressed(file, witnesses=self.witnesses, verdicts=np.array(json.dumps(
+                {'features': self.features, 'core': self.core, 'dead': self.dead, 'satisfiable': self.satisfiable,
+                 'cnf_hash': self.cnf_hash})))
+        os.replace(filepath + '.tmp', filepath)
+
+    @staticmethod
+    def load(filepath: str) -> 'CoreDeadVerdicts':
+        with np.load(filepath) as data:
+            return CoreDeadVerdicts(witnesses=data['witnesses'], **json.loads(str(data['verdicts'])))
+
+
+class WitnessPruning(CoreDeadPruning):
+    """Candidate pruning that keeps the models that refuted some candidate, as assignments of the features."""
+
+    def __init__(self, variables: Iterable[int], features: list[int]) -> None:
+        super().__init__(variables)
+        self.indexes = np.asarray(features, dtype=np.int64) - 1  # of the features in the assignments
+        self.witnesses: list[np.ndarray] = []
+
+    def prune(self, assignment: list[int]) -> tuple[list[int], list[int]]:
+        not_core, not_dead = super().prune(assignment)
+        if not_core or not_dead:
+            literals = np.array(assignment, dtype=np.int32)
+            if len(literals) > self.indexes.max(initial=-1):
+                self.witnesses.append(literals[self.indexes] > 0)
+            else:  # the variables missing in the assignment are false
+                self.witnesses.append(np.concatenate([literals, np.zeros(int(self.indexes.max()) + 1 - len(literals), dtype=np.int32)])[self.indexes] > 0)
+        return (not_core, not_dead)
+
+
+@dataclass
+class CNFDiff:
+    """Clauses added and removed between two versions of a model, matching the variables by name.
+
+    Clauses with variables without name (e.g., auxiliary variables of the
+    encoding) never match, so they are always added and removed.
+    """
+
+    added: list[list[int]] = field(default_factory=list)  # in the variables of the new version
+    removed: list[Optional[list[int]]] = field(default_factory=list)  # in the variables of the new version, or None if a variable is not in it
+    touched: set[int] = field(default_factory=set)  # variables of the removed clauses, in the old version
+    common: int = 0
+    new_features: list[str] = field(default_factory=list)
+    removed_features: list[str] = field(default_factory=list)
+
+
+def _named_clause_hashes(store: ClauseStore, ids: np.ndarray) -> np.ndarray:
+    """Hash of each clause with its variables replaced by their ids (the same id for the same name in both versions)."""
+    start, end = int(store.offsets[0]), int(store.offsets[-1])
+    literals = np.asarray(store.literals[start:end], dtype=np.int64)
+    named = np.sign(literals) * ids[np.abs(literals)]
+    return get_clause_hashes(ClauseStore(named, np.asarray(store.offsets, dtype=np.int64) - start))
+
+
+def diff_cnf(old_model: PySATModel, new_model: PySATModel) -> CNFDiff:
+    """Set difference of the clauses (each one a set of literals) of two versions of a model.
+
+    The clauses are compared by their hashes (vectorized), with the variables
+    replaced by an id per name; the variables without name get ids of their own.
+    """
+    old_store = _as_store(old_model.get_all_clauses().clauses)
+    new_store = _as_store(new_model.get_all_clauses().clauses)
+    names = {name: i for i, name in enumerate(dict.fromkeys([*old_model.variables, *new_model.variables]), 1)}
+    n_old = max([old_store.max_var, *old_model.variables.values()], default=0)
+    n_new = max([new_store.max_var, *new_model.variables.values()], default=0)
+    old_ids = len(names) + np.arange(n_old + 1, dtype=np.int64)
+    new_ids = len(names) + n_old + 1 + np.arange(n_new + 1, dtype=np.int64)
+    for ids, model in ((old_ids, old_model), (new_ids, new_model)):
+        for name, var in model.variables.items():
+            ids[var] = names[name]
+    old_hashes, old_first = np.unique(_named_clause_hashes(old_store, old_ids), return_index=True)
+    new_hashes, new_first = np.unique(_named_clause_hashes(new_store, new_ids), return_index=True)
+    diff = CNFDiff(new_features=[name for name in new_model.variables if name not in old_model.variables],
+                   removed_features=[name for name in old_model.variables if name not in new_model.variables])
+    common = np.isin(new_hashes, old_hashes, assume_unique=True)
+    diff.common = int(common.sum())
+    diff.added = [new_store[int(i)] for i in np.sort(new_first[~common])]
+    old_names = {var: name for name, var in old_model.variables.items()}
+    for i in np.sort(old_first[~np.isin(old_hashes, new_hashes, assume_unique=True)]):
+        clause = old_store[int(i)]
+        diff.touched.update(abs(lit) for lit in clause)
+        clause_names = [old_names.get(abs(lit)) for lit in clause]
+        if all(name in new_model.variables for name in clause_names):
+            diff.removed.append([new_model.variables[name] if lit > 0 else -new_model.variables[name]
+                                 for name, lit in zip(clause_names, clause)])
+        else:
+            diff.removed.append(None)
+    return diff
+
+
+def _as_store(clauses: Iterable[list[int]]) -> ClauseStore:
+    return clauses if isinstance(clauses, ClauseStore) else ClauseStore.from_clauses(clauses)
+
+
+def valid_witnesses(verdicts: CoreDeadVerdicts, new_model: PySATModel, added: list[list[int]]) -> np.ndarray:
+    """Witnesses of the old version that satisfy the added clauses, as assignments of the variables of the new version.
+
+    The common clauses are satisfied by any witness, so a witness that also
+    satisfies the added clauses is a model of the new version. The variables
+    that are not features of the old version are false in the witnesses (as
+    any variable not in the clauses, which are all matched by name).
+    Return a matrix with a row per valid witness and a column per variable (column 0 unused).
+    """
+    n_vars = max([*new_model.variables.values(), *(abs(lit) for clause in added for lit in clause)], default=0)
+    values = np.zeros((len(verdicts.witnesses), n_vars + 1), dtype=bool)
+    old_columns = {name: i for i, name in enumerate(verdicts.features)}
+    matched = [(var, old_columns[name]) for name, var in new_model.variables.items() if name in old_columns]
+    if matched:
+        new_vars, columns = (np.array(indexes) for indexes in zip(*matched))
+        values[:, new_vars] = verdicts.witnesses[:, columns]
+    if not added or not len(values):
+        return values
+    if min(len(clause) for clause in added) == 0:
+        return values[:0]  # an empty clause is never satisfied
+    lengths = np.array([len(clause) for clause in added])
+    literals = np.concatenate([np.asarray(clause, dtype=np.int64) for clause in added])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    true_literals = values[:, np.abs(literals)] == (literals > 0)
+    satisfied = np.logical_or.reduceat(true_literals, offsets, axis=1).all(axis=1)
+    return values[satisfied]
+
+
+def connected_components(clauses: Iterable[list[int]], n_vars: int = 0) -> np.ndarray:
+    """Component (its lowest variable) of each variable, connecting the variables that share clauses.
+
+    The labels are propagated (vectorized) from the variables to their clauses
+    and back until they do not change, with pointer jumping between rounds.
+    Return an array indexed by variable (the variables in no clause are their
+    own component).
+    """
+    store = _as_store(clauses)
+    start, end = int(store.offsets[0]), int(store.offsets[-1])
+    variables = np.abs(np.asarray(store.literals[start:end], dtype=np.int64))
+    lengths = store.lengths()
+    offsets = (np.asarray(store.offsets[:-1], dtype=np.int64) - start)[lengths > 0]
+    labels = np.arange(max(n_vars, int(variables.max(initial=0))) + 1)
+    if not len(variables):
+        return labels
+    clause_ids = np.repeat(np.arange(len(offsets)), lengths[lengths > 0])
+    while True:
+        clause_labels = np.minimum.reduceat(labels[variables], offsets)
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, variables, clause_labels[clause_ids])
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+@dataclass
+class IncrementalStatistics:
+    """What the incremental analysis carried over from the previous version, and its solver calls."""
+
+    added_clauses: int = 0
+    removed_clauses: int = 0
+    common_clauses: int = 0
+    new_features: int = 0
+    removed_features: int = 0
+    witnesses: int = 0
+    valid_witnesses: int = 0
+    implied_clauses: int = 0  # removed clauses implied by the new version
+    carried_verdicts: int = 0
+    rechecked: int = 0  # variables decided by the solver
+    fallback: bool = False  # the changes touch the largest component: full analysis
+    coredead: CoreDeadStatistics = field(default_factory=CoreDeadStatistics)
+    diff_time: float = 0.0
+
+    @property
+    def solver_calls(self) -> int:
+        return self.coredead.solver_calls
+
+    def __str__(self) -> str:
+        return os.linesep.join([
+            f'Diff: {self.added_clauses} added, {self.removed_clauses} removed ({self.implied_clauses} implied), '
+            f'{self.common_clauses} common clauses, {self.new_features} new and {self.removed_features} removed features ({self.diff_time:.4f} s)',
+            'Full analysis: the changes touch the largest component' if self.fallback else
+            f'Carried over: {self.carried_verdicts} verdicts, {self.valid_witnesses} of {self.witnesses} witnesses',
+            f'Rechecked: {self.rechecked} variables with {self.solver_calls} solver calls'])
+
+
+def coredead_verdicts(model: PySATModel,
+                      solver_name: str = 'glucose3',
+                      previous: Optional[tuple[PySATModel, CoreDeadVerdicts]] = None,
+                      statistics: Optional[IncrementalStatistics] = None) -> CoreDeadVerdicts:
+    """Core/dead verdicts and witnesses of a model, reusing those of its previous version if given.
+
+    The witnesses of the previous version that satisfy the added clauses are
+    models of the new version, so they refute candidates without calling the
+    solver. A core/dead verdict of the previous version holds if no removed
+    clause is in its connected component of the old clauses (the component
+    is unsatisfiable with the negated verdict, and it is still part of the
+    new version), or if the new version implies the old one, i.e., if it
+    implies each removed clause (one solver call per removed clause, unless
+    there are more removed clauses than verdicts to carry). Only the
+    remaining candidates are decided by the solver, as in the full analysis.
+    When the changes touch the component with most features (where most
+    candidates are), little can be reused, so it falls back to the full
+    analysis (recording the witnesses for the next version).
+    """
+    statistics = IncrementalStatistics() if statistics is None else statistics
+    coredead = statistics.coredead
+    clauses = model.get_all_clauses().clauses
+    variables = list(model.variables.values())
+    coredead.variables = len(variables)
+    pruning = WitnessPruning(variables, variables)
+    solver = Solver(name=solver_name)
+    try:
+        append_formula(solver, clauses)
+        propagate_root(clauses, pruning, coredead)
+        probe_failed_literals(variables, solver, pruning, coredead)
+        satisfiable = None
+        if previous is not None:
+            satisfiable = _reuse_verdicts(model, previous[0], previous[1], solver, pruning, statistics)
+        start_time = time.perf_counter()
+        if satisfiable is None:
+            coredead.solver_calls += 1
+            satisfiable = solver.solve()
+            if satisfiable:
+                prune_with_model(solver, pruning)
+        if satisfiable:
+            undecided = pruning.count_undecided()
+            decide_candidates(variables, solver, pruning, coredead)
+            statistics.rechecked = undecided - pruning.count_undecided()
+        coredead.solving_time += time.perf_counter() - start_time
+    finally:
+        solver.delete()
+    return CoreDeadVerdicts.from_pruning(model, pruning, satisfiable)
+
+
+def _reuse_verdicts(model: PySATModel,
+                    old_model: PySATModel,
+                    verdicts: CoreDeadVerdicts,
+                    solver: Solver,
+                    pruning: WitnessPruning,
+                    statistics: IncrementalStatistics) -> Optional[bool]:
+    """Prune with the valid witnesses and carry over the verdicts that the changes cannot invalidate.
+
+    Return True if the new version is known to be satisfiable, None if unknown.
+    """
+    start_time = time.perf_counter()
+    diff = diff_cnf(old_model, model)
+    statistics.diff_time = time.perf_counter() - start_time
+    statistics.added_clauses, statistics.removed_clauses, statistics.common_clauses = len(diff.added), len(diff.removed), diff.common
+    statistics.new_features, statistics.removed_features = len(diff.new_features), len(diff.removed_features)
+    statistics.witnesses = len(verdicts.witnesses)
+    if not verdicts.satisfiable:
+        return None
+    old_clauses = old_model.get_all_clauses().clauses
+    components = connected_components(old_clauses, max(old_model.variables.values(), default=0))
+    features = np.fromiter(old_model.variables.values(), dtype=np.int64, count=len(old_model.variables))
+    largest = np.argmax(np.bincount(components[features], minlength=len(components))) if len(features) else -1
+    new_names = {var: name for name, var in model.variables.items()}
+    changed = set(diff.touched)
+    changed.update(old_model.variables[new_names[abs(lit)]] for clause in diff.added for lit in clause
+                   if new_names.get(abs(lit)) in old_model.variables)
+    if any(components[var] == largest for var in changed):
+        statistics.fallback = True
+        return None
+    satisfiable = None
+    witnesses = valid_witnesses(verdicts, model, diff.added)
+    statistics.valid_witnesses = len(witnesses)
+    for values in witnesses:
+        pruning.prune(np.where(values[1:], 1, -1).tolist())
+    satisfiable = True if len(witnesses) else None
+    carried = [(name, model.variables[name], True) for name in verdicts.core if name in model.variables]
+    carried += [(name, model.variables[name], False) for name in verdicts.dead if name in model.variables]
+    carried = [(name, var, core) for name, var, core in carried if pruning.is_undecided(var)]
+    if not carried:
+        return satisfiable
+    # The verdicts outside the components touched by the removed clauses hold
+    affected = {int(components[var]) for var in diff.touched}
+    unaffected = [(var, core) for name, var, core in carried if int(components[old_model.variables[name]]) not in affected]
+    _carry_verdicts(unaffected, pruning, statistics)
+    carried = [(var, core) for name, var, core in carried if pruning.is_undecided(var)]
+    if not carried or len(diff.removed) > len(carried) or None in diff.removed:
+        return satisfiable
+    # The new version implies a removed clause if it is unsatisfiable with the negation of the clause
+    start_time = time.perf_counter()
+    for clause in diff.removed:
+        statistics.coredead.solver_calls += 1
+        if solver.solve(assumptions=[-lit for lit in clause]):
+            satisfiable = True
+            prune_with_model(solver, pruning)
+            break
+        statistics.implied_clauses += 1
+    statistics.coredead.solving_time += time.perf_counter() - start_time
+    if statistics.implied_clauses == len(diff.removed):
+        _carry_verdicts(carried, pruning, statistics)
+    return satisfiable
+
+
+def _carry_verdicts(carried: list[tuple[int, bool]], pruning: CoreDeadPruning, statistics: IncrementalStatistics) -> None:
+    for var, core in carried:
+        if pruning.is_undecided(var):
+            if core:
+                pruning.set_core(var)
+            else:
+                pruning.set_dead(var)
+            statistics.carried_verdicts += 1
+
+
+class IncrementalCoreDeadFeatures(Operation):
+    """Core/dead features of a model version, reusing the verdicts and witnesses of the previous version if given."""
+
+    def __init__(self,
+                 solver_name: str = 'glucose3',
+                 old_model: Optional[PySATModel] = None,
+                 old_verdicts: Optional[CoreDeadVerdicts] = None) -> None:
+        self.result: tuple[list[Any], list[Any]] = ()
+        self.solver_name = solver_name
+        self.previous = (old_model, old_verdicts) if old_model is not None and old_verdicts is not None else None
+        self.statistics = IncrementalStatistics()
+        self.verdicts = CoreDeadVerdicts()
+
+    def get_result(self) -> tuple[list[Any], list[Any]]:
+        return self.result
+
+    def get_statistics(self) -> IncrementalStatistics:
+        return self.statistics
+
+    def get_verdicts(self) -> CoreDeadVerdicts:
+        return self.verdicts
+
+    def execute(self, model: PySATModel) -> 'IncrementalCoreDeadFeatures':
+        self.statistics = IncrementalStatistics()
+        self.verdicts = coredead_verdicts(model, self.solver_name, self.previous, self.statistics)
+        self.result = (self.verdicts.core, self.verdicts.dead)
+        return self
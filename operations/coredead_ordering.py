@@ -0,0 +1,142 @@
+from typing import Iterable, Optional, Sequence
+from collections import defaultdict, deque
+
+from flamapy.metamodels.fm_metamodel.models import FeatureModel
+
+from operations.cnf_simplification import SimplifiedCNF, equivalent_literals
+
+
+ORDERINGS = ('model', 'occurrences', 'graph', 'tree')
+
+
+def order_variables(clauses: Iterable[list[int]],
+                    variables: Sequence[int],
+                    ordering: str = 'model',
+                    tree_order: Optional[Sequence[int]] = None) -> list[int]:
+    """Order in which the core/dead analysis queries the variables.
+
+    - model: the order of the model (model.variables).
+    - occurrences: most-constrained first, by number of clauses of each variable.
+    - graph: breadth-first traversal of the clause occurrence graph (variables
+      sharing a clause are neighbors) from the most-constrained variable, so
+      consecutive queries involve related variables.
+    - tree: top-down in the feature tree, given as tree_order (e.g., from
+      feature_tree_order) or else recovered from the parent-child implications
+      (binary clauses -child or parent) of the CNF.
+    Ties keep the order of the model.
+    """
+    if ordering not in ORDERINGS:
+        raise ValueError(f'Unknown ordering: {ordering} (choose from {", ".join(ORDERINGS)}).')
+    variables = list(variables)
+    if ordering == 'model':
+        return variables
+    if ordering == 'tree' and tree_order is not None:
+        return _complete_order(tree_order, variables)
+    if ordering == 'tree':
+        return _complete_order(implication_tree_order(clauses, variables), variables)
+    occurrences = count_occurrences(clauses)
+    by_occurrences = sorted(variables, key=lambda var: -occurrences.get(var, 0))
+    if ordering == 'occurrences':
+        return by_occurrences
+    return _complete_order(occurrence_graph_order(clauses, by_occurrences), variables)
+
+
+def count_occurrences(clauses: Iterable[list[int]]) -> dict[int, int]:
+    occurrences: dict[int, int] = defaultdict(int)
+    for clause in clauses:
+        for lit in clause:
+            occurrences[abs(lit)] += 1
+    return occurrences
+
+
+def occurrence_graph_order(clauses: Iterable[list[int]], variables: list[int]) -> list[int]:
+    """Breadth-first order of the variables in the clause occurrence graph, starting from each unvisited variable in turn."""
+    var_clauses: dict[int, list[list[int]]] = defaultdict(list)
+    for clause in clauses:
+        for lit in clause:
+            var_clauses[abs(lit)].append(clause)
+    wanted = set(variables)
+    visited: set[int] = set()
+    order = []
+    for start in variables:
+        if start in visited:
+            continue
+        visited.add(start)
+        queue = deque([start])
+        while queue:
+            var = queue.popleft()
+            if var in wanted:
+                order.append(var)
+            for clause in var_clauses.pop(var, ()):
+                for lit in clause:
+                    if abs(lit) not in visited:
+                        visited.add(abs(lit))
+                        queue.append(abs(lit))
+    return order
+
+
+def implication_tree_order(clauses: Iterable[list[int]], variables: Sequence[int]) -> list[int]:
+    """Top-down order of the tree recovered from the binary clauses -child or parent.
+
+    The roots are the variables without parents, and cycles (e.g., mandatory
+    features) are broken by visiting each variable once.
+    """
+    children: dict[int, list[int]] = defaultdict(list)
+    has_parent: set[int] = set()
+    for clause in clauses:
+        if len(clause) == 2:
+            a, b = clause
+            if a < 0 < b:
+                children[b].append(-a)
+                has_parent.add(-a)
+            elif b < 0 < a:
+                children[a].append(-b)
+                has_parent.add(-b)
+    visited: set[int] = set()
+    order = []
+    for root in [var for var in variables if var not in has_parent] + list(variables):
+        if root in visited:
+            continue
+        visited.add(root)
+        queue = deque([root])
+        while queue:
+            var = queue.popleft()
+            order.append(var)
+            for child in children.get(var, ()):
+                if child not in visited:
+                    visited.add(child)
+                    queue.append(child)
+    return order
+
+
+def feature_tree_order(feature_model: FeatureModel) -> list[str]:
+    """Names of the features in breadth-first order of the feature tree."""
+    order = []
+    queue = deque([feature_model.root])
+    while queue:
+        feature = queue.popleft()
+        order.append(feature.name)
+        queue.extend(feature.get_children())
+    return order
+
+
+def atomic_sets(clauses: Iterable[list[int]], variables: Sequence[int]) -> Optional[SimplifiedCNF]:
+    """Atomic sets: classes of variables that are equivalent (or complementary) in every configuration.
+
+    They are found as the strongly connected components of the binary implication
+    graph, and each one is decided as a unit through its representative (its
+    first variable in the given order). The clauses are not changed. Return None
+    if a literal is equivalent to its negation (the formula is unsatisfiable).
+    """
+    substitution = equivalent_literals([clause for clause in clauses if len(clause) == 2], list(variables))
+    if substitution is None:
+        return None
+    return SimplifiedCNF(clauses=clauses, substitution=substitution)
+
+
+def _complete_order(order: Iterable[int], variables: Sequence[int]) -> list[int]:
+    """The variables of the order (once, if they are in variables), followed by the remaining variables."""
+    wanted = set(variables)
+    ordered = [var for var in dict.fromkeys(order) if var in wanted]
+    placed = set(ordered)
+    return ordered + [var for var in variables if var not in placed]
@@ -1,16 +1,349 @@
-from typing import Any
+import os
+import json
+import time
+import multiprocessing
+from typing import Any, Callable, Iterable, Optional, Sequence
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
 
 from pysat.solvers import Solver
 
 from flamapy.core.operations import Operation
 from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
 
+from operations.cnf_simplification import SimplifiedCNF, simplify_cnf
+from operations.coredead_ordering import atomic_sets, order_variables
+from transformations.clause_store import ClauseStore, append_formula
+
+
+SHARDS_PER_JOB = 4  # more shards than processes balance the load among workers
+
+
+@dataclass
+class CoreDeadStatistics:
+    """Counters of the solver calls made by a core/dead analysis."""
+
+    variables: int = 0
+    solver_calls: int = 0
+    propagated: int = 0
+    failed_literals: int = 0
+    solver_decided: int = 0
+    propagation_time: float = 0.0
+    failed_literal_time: float = 0.0
+    solving_time: float = 0.0
+    equivalent_variables: int = 0
+    eliminated_variables: int = 0
+    removed_clauses: int = 0
+    simplification_time: float = 0.0
+    undecided: int = 0
+    exhausted_calls: int = 0
+    ordering: str = 'model'
+    atomic_set_variables: int = 0
+    ordering_time: float = 0.0
+    phases: bool = False
+
+    def add(self, other: 'CoreDeadStatistics') -> None:
+        """Accumulate the counters of a partial analysis (e.g., a shard)."""
+        self.solver_calls += other.solver_calls
+        self.propagated += other.propagated
+        self.failed_literals += other.failed_literals
+        self.solver_decided += other.solver_decided
+        self.propagation_time += other.propagation_time
+        self.failed_literal_time += other.failed_literal_time
+        self.solving_time += other.solving_time
+        self.exhausted_calls += other.exhausted_calls
+
+    @property
+    def naive_solver_calls(self) -> int:
+        """Calls made by the naive analysis: one initial solve plus two per variable."""
+        return 1 + 2 * self.variables
+
+    @property
+    def saved_solver_calls(self) -> int:
+        return self.naive_solver_calls - self.solver_calls
+
+    def __str__(self) -> str:
+        lines = [f'Solver calls: {self.solver_calls} (saved {self.saved_solver_calls} of {self.naive_solver_calls})',
+                 f'Propagated: {self.propagated} ({self.propagation_time:.4f} s), '
+                 f'failed literals: {self.failed_literals} ({self.failed_literal_time:.4f} s), '
+                 f'solver decided: {self.solver_decided} ({self.solving_time:.4f} s)']
+        if self.simplification_time:
+            lines.append(f'Simplified: {self.equivalent_variables} equivalent variables, '
+                         f'{self.eliminated_variables} eliminated variables, '
+                         f'{self.removed_clauses} removed clauses ({self.simplification_time:.4f} s)')
+        if self.ordering != 'model' or self.atomic_set_variables or self.phases:
+            lines.append(f'Ordering: {self.ordering}{" with refuting phases" if self.phases else ""}, '
+                         f'{self.atomic_set_variables} variables decided with their atomic set ({self.ordering_time:.4f} s)')
+        if self.undecided:
+            lines.append(f'Undecided: {self.undecided} (solver calls out of budget: {self.exhausted_calls})')
+        return os.linesep.join(lines)
+
+
+@dataclass
+class CoreDeadProgress:
+    """Progress event of a core/dead analysis, sent to the callback of its budget."""
+
+    decided: int
+    undecided: int
+    solver_calls: int
+    elapsed: float
+
+    @property
+    def calls_per_second(self) -> float:
+        return self.solver_calls / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f'Decided: {self.decided}, undecided: {self.undecided}, solver calls: {self.solver_calls} '
+                f'({self.calls_per_second:.2f} calls/s, {self.elapsed:.2f} s)')
+
+
+@dataclass
+class CoreDeadBudget:
+    """Limits of a core/dead analysis, with an optional callback receiving its progress.
+
+    The deadline (seconds) is checked between solver calls. The conflicts and
+    propagations bound each solver call deciding a variable, and a call out of
+    budget leaves its variable undecided. Backends without limited solving
+    (e.g., lingeling) ignore the per-call budget.
+    """
+
+    seconds: Optional[float] = None
+    conflicts: Optional[int] = None
+    propagations: Optional[int] = None
+    progress: Optional[Callable[[CoreDeadProgress], None]] = None
+    progress_interval: float = 1.0
+    start_time: float = field(default=0.0, init=False)
+    total: int = field(default=0, init=False)
+    last_progress: float = field(default=0.0, init=False)
+
+    def start(self, total: int) -> None:
+        self.start_time = self.last_progress = time.perf_counter()
+        self.total = total
+
+    def expired(self) -> bool:
+        return self.seconds is not None and time.perf_counter() - self.start_time >= self.seconds
+
+    def solve(self, solver: Solver, assumptions: Sequence[int]) -> Optional[bool]:
+        """Solve within the per-call budget, returning None if it is exhausted."""
+        if self.conflicts is None and self.propagations is None:
+            return solver.solve(assumptions=assumptions)
+        try:
+            # The budgets are relative to the current counters of the solver, so they are set before each call
+            if self.conflicts is not None:
+                solver.conf_budget(self.conflicts)
+            if self.propagations is not None:
+                solver.prop_budget(self.propagations)
+            return solver.solve_limited(assumptions=assumptions)
+        except NotImplementedError:
+            return solver.solve(assumptions=assumptions)
+
+    def report(self, pruning: 'CoreDeadPruning', statistics: CoreDeadStatistics, force: bool = False) -> None:
+        """Send a progress event, at most once per progress interval unless forced."""
+        if self.progress is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self.last_progress < self.progress_interval:
+            return
+        self.last_progress = now
+        undecided = pruning.count_undecided()
+        self.progress(CoreDeadProgress(decided=self.total - undecided,
+                                       undecided=undecided,
+                                       solver_calls=statistics.solver_calls,
+                                       elapsed=now - self.start_time))
+
+
+class CoreDeadPruning:
+    """Candidate sets of the core/dead analysis, pruned with satisfying assignments.
+
+    A variable seen true in any model cannot be dead, and a variable seen false
+    in any model cannot be core.
+    """
+
+    def __init__(self, variables: Iterable[int]) -> None:
+        self.core_candidates: set[int] = set(variables)
+        self.dead_candidates: set[int] = set(self.core_candidates)
+        self.core: set[int] = set()
+        self.dead: set[int] = set()
+
+    def prune(self, assignment: list[int]) -> tuple[list[int], list[int]]:
+        """Remove the candidates refuted by the given model (list of literals).
+
+        Return the variables that stopped being core and dead candidates.
+        """
+        n_vars = len(assignment)
+        not_core = [v for v in self.core_candidates if v <= n_vars and assignment[v - 1] < 0]
+        not_dead = [v for v in self.dead_candidates if v <= n_vars and assignment[v - 1] > 0]
+        self.core_candidates.difference_update(not_core)
+        self.dead_candidates.difference_update(not_dead)
+        return (not_core, not_dead)
+
+    def is_core_candidate(self, var: int) -> bool:
+        return var in self.core_candidates
+
+    def is_dead_candidate(self, var: int) -> bool:
+        return var in self.dead_candidates
+
+    def set_core(self, var: int) -> None:
+        self.core_candidates.discard(var)
+        self.dead_candidates.discard(var)
+        self.core.add(var)
+
+    def set_dead(self, var: int) -> None:
+        self.core_candidates.discard(var)
+        self.dead_candidates.discard(var)
+        self.dead.add(var)
+
+    def is_undecided(self, var: int) -> bool:
+        return self.is_core_candidate(var) or self.is_dead_candidate(var)
+
+    def count_undecided(self) -> int:
+        return len(self.core_candidates | self.dead_candidates)
+
+
+class SharedCoreDeadPruning(CoreDeadPruning):
+    """Candidate sets whose refutations are shared with other processes.
+
+    The shared arrays are indexed by variable and flag whether the variable has
+    been seen true (so it is not dead) or false (so it is not core) in a model
+    found by any process.
+    """
+
+    def __init__(self, variables: Iterable[int], seen_true: Any, seen_false: Any) -> None:
+        super().__init__(variables)
+        self.seen_true = seen_true
+        self.seen_false = seen_false
+
+    def prune(self, assignment: list[int]) -> tuple[list[int], list[int]]:
+        not_core, not_dead = super().prune(assignment)
+        for var in not_core:
+            self.seen_false[var] = 1
+        for var in not_dead:
+            self.seen_true[var] = 1
+        return (not_core, not_dead)
+
+    def is_core_candidate(self, var: int) -> bool:
+        if var in self.core_candidates and self.seen_false[var]:
+            self.core_candidates.discard(var)
+        return var in self.core_candidates
+
+    def is_dead_candidate(self, var: int) -> bool:
+        if var in self.dead_candidates and self.seen_true[var]:
+            self.dead_candidates.discard(var)
+        return var in self.dead_candidates
+
+
+class RefutingPhases:
+    """Preferred values of the solver, steered towards refuting the remaining candidates.
+
+    A variable that is only a dead candidate prefers true, and one that is only
+    a core candidate prefers false, so the next models refute more candidates
+    and fewer solver calls are needed. The variables equivalent to a candidate
+    (its atomic set) get the same preference, so they do not force it back.
+    """
+
+    def __init__(self, simplified: Optional[SimplifiedCNF] = None) -> None:
+        self.equivalents: dict[int, list[int]] = defaultdict(list)  # variable -> literals equivalent to it
+        if simplified is not None:
+            for var, lit in simplified.substitution.items():
+                self.equivalents[abs(lit)].append(var if lit > 0 else -var)
+
+    def update(self, solver: Solver, pruning: CoreDeadPruning, not_core: list[int], not_dead: list[int]) -> None:
+        """Set the preferred values of the variables that stopped being core or dead candidates."""
+        preferred = ([var for var in not_core if pruning.is_dead_candidate(var)]
+                     + [-var for var in not_dead if pruning.is_core_candidate(var)])
+        solver.set_phases([eq if lit > 0 else -eq for lit in preferred for eq in [abs(lit), *self.equivalents.get(abs(lit), ())]])
+
+
+@dataclass
+class CoreDeadState:
+    """Result of a (possibly partial) core/dead analysis, by feature name.
+
+    The candidates are the features that no model has refuted yet as core or
+    dead, so an analysis resumed from this state only decides those.
+    """
+
+    core: list[str] = field(default_factory=list)
+    dead: list[str] = field(default_factory=list)
+    core_candidates: list[str] = field(default_factory=list)
+    dead_candidates: list[str] = field(default_factory=list)
+    complete: bool = True
+
+    @property
+    def undecided(self) -> list[str]:
+        return list(dict.fromkeys(self.core_candidates + self.dead_candidates))
+
+    @staticmethod
+    def from_pruning(model: PySATModel,
+                     pruning: 'CoreDeadPruning',
+                     simplified: Optional[SimplifiedCNF] = None,
+                     complete: bool = True) -> 'CoreDeadState':
+        core, dead = get_coredead_names(model, pruning, simplified)
+        state = CoreDeadState(core=core, dead=dead, complete=complete)
+        for name, var in model.variables.items():
+            lit = var if simplified is None else simplified.get_literal(var)
+            core_candidates, dead_candidates = ((pruning.core_candidates, pruning.dead_candidates) if lit > 0
+                                                else (pruning.dead_candidates, pruning.core_candidates))
+            if abs(lit) in core_candidates:
+                state.core_candidates.append(name)
+            if abs(lit) in dead_candidates:
+                state.dead_candidates.append(name)
+        return state
+
+    def restore(self, model: PySATModel, pruning: 'CoreDeadPruning', simplified: Optional[SimplifiedCNF] = None) -> None:
+        """Apply the decided features and refuted candidates to the pruning of a new analysis of the model."""
+        core, dead = set(self.core), set(self.dead)
+        core_candidates, dead_candidates = set(self.core_candidates), set(self.dead_candidates)
+        for name, var in model.variables.items():
+            lit = var if simplified is None else simplified.get_literal(var)
+            var = abs(lit)
+            if name in core or name in dead:
+                if (name in core) == (lit > 0):
+                    pruning.set_core(var)
+                else:
+                    pruning.set_dead(var)
+                continue
+            if name not in core_candidates:
+                (pruning.core_candidates if lit > 0 else pruning.dead_candidates).discard(var)
+            if name not in dead_candidates:
+                (pruning.dead_candidates if lit > 0 else pruning.core_candidates).discard(var)
+
+    def save(self, filepath: str) -> None:
+        with open(filepath + '.tmp', 'w', encoding='utf8') as file:
+            json.dump(asdict(self), file, indent=1)
+        os.replace(filepath + '.tmp', filepath)
+
+    @staticmethod
+    def load(filepath: str) -> 'CoreDeadState':
+        with open(filepath, 'r', encoding='utf8') as file:
+            return CoreDeadState(**json.load(file))
+
 
 class SATCoreDeadFeatures(Operation):
 
-    def __init__(self, solver_name: str = 'glucose3') -> None:
+    def __init__(self,
+                 solver_name: str = 'glucose3',
+                 preprocess: bool = True,
+                 jobs: int = 1,
+                 simplify: bool = False,
+                 budget: Optional[CoreDeadBudget] = None,
+                 resume: Optional[CoreDeadState] = None,
+                 ordering: str = 'model',
+                 atomic: bool = False,
+                 feature_order: Optional[list[str]] = None,
+                 phases: bool = False) -> None:
         self.result: tuple[list[Any], list[Any]] = ()
         self.solver_name = solver_name
+        self.preprocess = preprocess
+        self.jobs = jobs
+        self.simplify = simplify
+        self.budget = budget
+        self.resume = resume
+        self.ordering = ordering
+        self.atomic = atomic
+        self.feature_order = feature_order
+        self.phases = phases
+        self.statistics = CoreDeadStatistics()
+        self.state = CoreDeadState()
 
     def get_coredead_features(self) -> tuple[list[Any], list[Any]]:
         return self.result
@@ -18,23 +351,384 @@ class SATCoreDeadFeatures(Operation):
     def get_result(self) -> tuple[list[Any], list[Any]]:
         return self.result
 
+    def get_statistics(self) -> CoreDeadStatistics:
+        return self.statistics
+
+    def get_state(self) -> CoreDeadState:
+        return self.state
+
+    def get_undecided_features(self) -> list[str]:
+        return self.state.undecided
+
     def execute(self, model: PySATModel) -> 'SATCoreDeadFeatures':
+        self.statistics = CoreDeadStatistics()
+        if self.jobs > 1:
+            if self.budget is not None or self.resume is not None:
+                raise ValueError('Budgets and resumed analyses are only supported by the sequential analysis (jobs = 1).')
+            self.result = parallel_coredead_features(model, self.solver_name, self.jobs, self.statistics, self.preprocess, self.simplify,
+                                                     self.ordering, self.atomic, self.feature_order, self.phases)
+            self.state = CoreDeadState(core=self.result[0], dead=self.result[1])
+            return self
         solver = Solver(name=self.solver_name)
-        self.result = coredead_features(model, solver)
+        self.state = coredead_state(model, solver, self.statistics, self.preprocess, self.simplify, self.budget, self.resume,
+                                    self.ordering, self.atomic, self.feature_order, self.phases)
+        self.result = (self.state.core, self.state.dead)
         if solver is not None:
             solver.delete()
         return self
-        
 
-def coredead_features(model: PySATModel, solver: Solver) -> tuple[list[Any], list[Any]]:
-    for clause in model.get_all_clauses():
-        solver.add_clause(clause) 
+
+def coredead_features(model: PySATModel,
+                      solver: Solver,
+                      statistics: Optional[CoreDeadStatistics] = None,
+                      preprocess: bool = True,
+                      simplify: bool = False) -> tuple[list[Any], list[Any]]:
+    """Core and dead features of the model, in the order of model.variables.
+
+    With simplify, equivalent variables are analyzed once through their
+    representative (see simplify_model), with the same result.
+    """
+    state = coredead_state(model, solver, statistics, preprocess, simplify)
+    return (state.core, state.dead)
+
+
+def coredead_state(model: PySATModel,
+                   solver: Solver,
+                   statistics: Optional[CoreDeadStatistics] = None,
+                   preprocess: bool = True,
+                   simplify: bool = False,
+                   budget: Optional[CoreDeadBudget] = None,
+                   resume: Optional[CoreDeadState] = None,
+                   ordering: str = 'model',
+                   atomic: bool = False,
+                   feature_order: Optional[list[str]] = None,
+                   phases: bool = False) -> CoreDeadState:
+    """Core/dead analysis within a budget, optionally resumed from a partial result.
+
+    If the budget runs out, the state has the features decided so far and the
+    undecided ones (it is not complete). The initial satisfiability check is
+    not bounded by the per-call budget. See prepare_model for the ordering and
+    atomic sets, and RefutingPhases for the phases.
+    """
+    if statistics is None:
+        statistics = CoreDeadStatistics()
+    prepared = prepare_model(model, statistics, simplify, ordering, atomic, feature_order)
+    statistics.phases = phases
+    if prepared is None:
+        return CoreDeadState()
+    clauses, variables, simplified = prepared
+    append_formula(solver, clauses)
+    pruning = CoreDeadPruning(variables)
+    if resume is not None:
+        resume.restore(model, pruning, simplified)
+    if budget is not None:
+        budget.start(len(variables))
+    if preprocess:
+        propagate_root(clauses, pruning, statistics)
+        probe_failed_literals(variables, solver, pruning, statistics, budget=budget)
+
+    start_time = time.perf_counter()
+    statistics.solver_calls += 1
+    satisfiable = solver.solve()
+    if satisfiable:
+        refuting_phases = RefutingPhases(simplified) if phases else None
+        prune_with_model(solver, pruning, refuting_phases)
+        decide_candidates(variables, solver, pruning, statistics, budget=budget, phases=refuting_phases)
+    statistics.solving_time += time.perf_counter() - start_time
+    if not satisfiable:
+        return CoreDeadState()
+    statistics.undecided = pruning.count_undecided()
+    if budget is not None:
+        budget.report(pruning, statistics, force=True)
+    return CoreDeadState.from_pruning(model, pruning, simplified, complete=statistics.undecided == 0)
+
+
+def prepare_model(model: PySATModel,
+                  statistics: CoreDeadStatistics,
+                  simplify: bool = False,
+                  ordering: str = 'model',
+                  atomic: bool = False,
+                  feature_order: Optional[list[str]] = None) -> Optional[tuple[Any, list[int], Optional[SimplifiedCNF]]]:
+    """Clauses of the model, variables to analyze (in the order of the query-ordering heuristic) and their substitution.
+
+    With simplify or atomic, one variable per atomic set (class of equivalent
+    features) is analyzed. The feature order (names, e.g., the feature tree of
+    a UVL model) is used by the tree ordering. Return None if the model is
+    found unsatisfiable.
+    """
+    statistics.variables = len(model.variables)
+    if simplify:
+        clauses, variables, simplified = simplify_model(model, statistics)
+        if not simplified.satisfiable:
+            return None
+    else:
+        clauses, variables, simplified = model.get_all_clauses().clauses, list(model.variables.values()), None
+    start_time = time.perf_counter()
+    if atomic and not simplify:
+        simplified = atomic_sets(clauses, variables)
+        if simplified is None:
+            return None
+        variables = list(dict.fromkeys(abs(simplified.get_literal(var)) for var in variables))
+        statistics.atomic_set_variables = len(model.variables) - len(variables)
+    tree_order = None
+    if feature_order is not None:
+        tree_order = [model.variables[name] for name in feature_order if name in model.variables]
+        if simplified is not None:
+            tree_order = [abs(simplified.get_literal(var)) for var in tree_order]
+    variables = order_variables(clauses, variables, ordering, tree_order)
+    statistics.ordering = ordering
+    statistics.ordering_time = time.perf_counter() - start_time
+    return (clauses, variables, simplified)
+
+
+def simplify_model(model: PySATModel, statistics: CoreDeadStatistics) -> tuple[list[list[int]], list[int], SimplifiedCNF]:
+    """Simplify the clauses of the model for its core/dead analysis.
+
+    Return the simplified clauses and the variables to analyze: one representative
+    per class of equivalent features, in the order of model.variables.
+    """
+    simplified = simplify_cnf(model.get_all_clauses().clauses, model.variables.values())
+    variables = list(dict.fromkeys(abs(simplified.get_literal(var)) for var in model.variables.values()))
+    statistics.equivalent_variables = len(model.variables) - len(variables)
+    statistics.eliminated_variables = len(simplified.eliminated)
+    statistics.removed_clauses = simplified.original_clauses - len(simplified.clauses)
+    statistics.simplification_time = simplified.simplification_time
+    return (simplified.clauses, variables, simplified)
+
+
+def get_coredead_names(model: PySATModel,
+                       pruning: CoreDeadPruning,
+                       simplified: Optional[SimplifiedCNF] = None) -> tuple[list[Any], list[Any]]:
+    """Names of the core and dead features, mapping each feature to the literal of its representative."""
     core_features = []
     dead_features = []
-    if solver.solve():
-        for variable in model.variables.items():
-            if not solver.solve(assumptions=[-variable[1]]):
-                core_features.append(variable[0])
-            if not solver.solve(assumptions=[variable[1]]):
-                dead_features.append(variable[0])
-    return (core_features, dead_features)
\ No newline at end of file
+    for name, var in model.variables.items():
+        lit = var if simplified is None else simplified.get_literal(var)
+        core, dead = (pruning.core, pruning.dead) if lit > 0 else (pruning.dead, pruning.core)
+        if abs(lit) in core:
+            core_features.append(name)
+        elif abs(lit) in dead:
+            dead_features.append(name)
+    return (core_features, dead_features)
+
+
+def decide_candidates(variables: Iterable[int],
+                      solver: Solver,
+                      pruning: CoreDeadPruning,
+                      statistics: CoreDeadStatistics,
+                      assumptions: Sequence[int] = (),
+                      budget: Optional[CoreDeadBudget] = None,
+                      phases: Optional[RefutingPhases] = None) -> None:
+    """Query the solver only for the candidates that no model has refuted yet.
+
+    The variables are decided under the given assumptions (e.g., a partial configuration).
+    With a budget, the variables left when it runs out stay undecided.
+    """
+    for var in variables:
+        if budget is not None:
+            if budget.expired():
+                break
+            budget.report(pruning, statistics)
+        if pruning.is_core_candidate(var):
+            satisfiable = solve_candidate(solver, [*assumptions, -var], statistics, budget)
+            if satisfiable:
+                pruning.core_candidates.discard(var)
+                prune_with_model(solver, pruning, phases)
+            elif satisfiable is not None:
+                pruning.set_core(var)
+                statistics.solver_decided += 1
+        if pruning.is_dead_candidate(var):
+            satisfiable = solve_candidate(solver, [*assumptions, var], statistics, budget)
+            if satisfiable:
+                pruning.dead_candidates.discard(var)
+                prune_with_model(solver, pruning, phases)
+            elif satisfiable is not None:
+                pruning.set_dead(var)
+                statistics.solver_decided += 1
+
+
+def prune_with_model(solver: Solver, pruning: CoreDeadPruning, phases: Optional[RefutingPhases] = None) -> None:
+    """Prune the candidates with the model found by the solver, updating the refuting phases if given."""
+    not_core, not_dead = pruning.prune(solver.get_model())
+    if phases is not None:
+        phases.update(solver, pruning, not_core, not_dead)
+
+
+def solve_candidate(solver: Solver,
+                    assumptions: Sequence[int],
+                    statistics: CoreDeadStatistics,
+                    budget: Optional[CoreDeadBudget] = None) -> Optional[bool]:
+    """Solve under the assumptions, returning None if the call runs out of budget."""
+    statistics.solver_calls += 1
+    if budget is None:
+        return solver.solve(assumptions=assumptions)
+    satisfiable = budget.solve(solver, assumptions)
+    if satisfiable is None:
+        statistics.exhausted_calls += 1
+    return satisfiable
+
+
+def propagate_root(clauses: Iterable[list[int]], pruning: CoreDeadPruning, statistics: CoreDeadStatistics) -> None:
+    """Decide the variables fixed by the root unit clauses and their implications.
+
+    The propagation is done in Python, so it does not depend on the backend.
+    """
+    start_time = time.perf_counter()
+    root_literals = unit_propagate(clauses)
+    if root_literals is not None:
+        for lit in root_literals:
+            var = abs(lit)
+            if pruning.is_undecided(var):
+                if lit > 0:
+                    pruning.set_core(var)
+                else:
+                    pruning.set_dead(var)
+                statistics.propagated += 1
+    statistics.propagation_time += time.perf_counter() - start_time
+
+
+def probe_failed_literals(variables: Iterable[int],
+                          solver: Solver,
+                          pruning: CoreDeadPruning,
+                          statistics: CoreDeadStatistics,
+                          assumptions: Sequence[int] = (),
+                          budget: Optional[CoreDeadBudget] = None) -> None:
+    """Decide the variables whose negation (core) or assignment (dead) fails by propagation.
+
+    Backends that do not implement solver.propagate() (e.g., lingeling) skip this stage.
+    """
+    start_time = time.perf_counter()
+    try:
+        for var in variables:
+            if budget is not None and budget.expired():
+                break
+            if pruning.is_core_candidate(var) and not solver.propagate(assumptions=[*assumptions, -var])[0]:
+                pruning.set_core(var)
+                statistics.failed_literals += 1
+            if pruning.is_dead_candidate(var) and not solver.propagate(assumptions=[*assumptions, var])[0]:
+                pruning.set_dead(var)
+                statistics.failed_literals += 1
+    except NotImplementedError:
+        pass
+    statistics.failed_literal_time += time.perf_counter() - start_time
+
+
+def parallel_coredead_features(model: PySATModel,
+                               solver_name: str,
+                               jobs: int,
+                               statistics: Optional[CoreDeadStatistics] = None,
+                               preprocess: bool = True,
+                               simplify: bool = False,
+                               ordering: str = 'model',
+                               atomic: bool = False,
+                               feature_order: Optional[list[str]] = None,
+                               phases: bool = False) -> tuple[list[Any], list[Any]]:
+    """Core/dead analysis with the variables partitioned across a pool of processes.
+
+    Each worker loads the clauses once into its own solver. The models found by
+    any worker are shared through two flag arrays, so the candidates they refute
+    are not queried again in other shards. The result is the same as (and in the
+    same order of) coredead_features.
+    """
+    if statistics is None:
+        statistics = CoreDeadStatistics()
+    prepared = prepare_model(model, statistics, simplify, ordering, atomic, feature_order)
+    statistics.phases = phases
+    if prepared is None:
+        return ([], [])
+    clauses, variables, simplified = prepared
+    pruning = CoreDeadPruning(variables)
+    if preprocess:
+        propagate_root(clauses, pruning, statistics)
+    variables = [var for var in variables if pruning.is_undecided(var)]
+    n_shards = min(len(variables), jobs * SHARDS_PER_JOB)
+    shard_size = -(-len(variables) // n_shards) if n_shards else 0
+    shards = [variables[i:i + shard_size] for i in range(0, len(variables), shard_size)] if shard_size else [[]]
+
+    max_var = max(model.variables.values(), default=0)
+    seen_true = multiprocessing.RawArray('b', max_var + 1)
+    seen_false = multiprocessing.RawArray('b', max_var + 1)
+    satisfiable = True
+    with multiprocessing.Pool(processes=min(jobs, len(shards)),
+                              initializer=_init_coredead_worker,
+                              initargs=(clauses, solver_name, max_var, seen_true, seen_false,
+                                        RefutingPhases(simplified) if phases else None)) as pool:
+        for shard_satisfiable, core, dead, shard_statistics in pool.imap(_coredead_shard, [(shard, preprocess) for shard in shards]):
+            satisfiable = satisfiable and shard_satisfiable
+            pruning.core.update(core)
+            pruning.dead.update(dead)
+            statistics.add(shard_statistics)
+    if not satisfiable:
+        return ([], [])
+    return get_coredead_names(model, pruning, simplified)
+
+
+_worker: dict[str, Any] = {}
+
+
+def _init_coredead_worker(clauses: list[list[int]],
+                          solver_name: str,
+                          max_var: int,
+                          seen_true: Any,
+                          seen_false: Any,
+                          phases: Optional[RefutingPhases]) -> None:
+    solver = Solver(name=solver_name, bootstrap_with=clauses)
+    _worker['solver'] = solver
+    _worker['pruning'] = SharedCoreDeadPruning(range(1, max_var + 1), seen_true, seen_false)
+    _worker['statistics'] = CoreDeadStatistics(solver_calls=1)
+    _worker['phases'] = phases
+    _worker['satisfiable'] = solver.solve()
+    if _worker['satisfiable']:
+        prune_with_model(solver, _worker['pruning'], phases)
+
+
+def _coredead_shard(task: tuple[list[int], bool]) -> tuple[bool, list[int], list[int], CoreDeadStatistics]:
+    shard, preprocess = task
+    solver = _worker['solver']
+    pruning = _worker['pruning']
+    # The initial solve is accounted to the first shard processed by each worker
+    statistics, _worker['statistics'] = _worker['statistics'], CoreDeadStatistics()
+    if not _worker['satisfiable']:
+        return (False, [], [], statistics)
+    if preprocess:
+        probe_failed_literals(shard, solver, pruning, statistics)
+    start_time = time.perf_counter()
+    decide_candidates(shard, solver, pruning, statistics, phases=_worker['phases'])
+    statistics.solving_time += time.perf_counter() - start_time
+    return (True, [var for var in shard if var in pruning.core], [var for var in shard if var in pruning.dead], statistics)
+
+
+def unit_propagate(clauses: Iterable[list[int]]) -> Optional[list[int]]:
+    """Return the literals implied at the root level by unit propagation, or None on conflict."""
+    if not isinstance(clauses, ClauseStore):
+        clauses = list(clauses)
+    queue = [clause[0] for clause in clauses if len(clause) == 1]
+    if not queue:
+        return []
+    occurrences: dict[int, list[int]] = defaultdict(list)  # literal -> clauses falsified by it
+    for i, clause in enumerate(clauses):
+        for lit in clause:
+            occurrences[-lit].append(i)
+    assigned: set[int] = set()
+    trail = []
+    while queue:
+        lit = queue.pop()
+        if lit in assigned:
+            continue
+        if -lit in assigned:
+            return None
+        assigned.add(lit)
+        trail.append(lit)
+        for i in occurrences.get(lit, ()):
+            unassigned = []
+            for other in clauses[i]:
+                if other in assigned:
+                    break
+                if -other not in assigned:
+                    unassigned.append(other)
+            else:
+                if not unassigned:
+                    return None
+                if len(unassigned) == 1:
+                    queue.append(unassigned[0])
+    return trail
@@ -0,0 +1,123 @@
+import queue
+import statistics
+import multiprocessing
+from typing import Any, Iterable, Optional
+
+from pysat.solvers import Solver
+
+from flamapy.core.operations import Operation
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+
+from operations.pysat_coredead_features import CoreDeadStatistics, coredead_features
+from utils.results import read_results
+
+
+PORTFOLIO_SOLVERS = ['cadical153', 'minisat22', 'glucose4']
+RACER_POLL_SECONDS = 1.0  # interval to check that the racers without result are still alive
+
+
+class SATCoreDeadPortfolio(Operation):
+    """Core/dead analysis racing several solvers in parallel processes.
+
+    The result of the first solver that completes the analysis is kept, and the
+    other processes are cancelled. A racer that dies without reporting (e.g.,
+    a crash or an OOM kill of the native solver) counts as an error.
+    """
+
+    def __init__(self, solver_names: Optional[list[str]] = None, preprocess: bool = True) -> None:
+        self.result: tuple[list[Any], list[Any]] = ()
+        self.solver_names = solver_names if solver_names else PORTFOLIO_SOLVERS
+        self.preprocess = preprocess
+        self.winner: Optional[str] = None
+        self.statistics = CoreDeadStatistics()
+
+    def get_coredead_features(self) -> tuple[list[Any], list[Any]]:
+        return self.result
+
+    def get_result(self) -> tuple[list[Any], list[Any]]:
+        return self.result
+
+    def get_winner(self) -> Optional[str]:
+        return self.winner
+
+    def get_statistics(self) -> CoreDeadStatistics:
+        return self.statistics
+
+    def execute(self, model: PySATModel) -> 'SATCoreDeadPortfolio':
+        results: multiprocessing.Queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_race_solver, args=(model, solver_name, self.preprocess, results), daemon=True)
+                     for solver_name in self.solver_names]
+        for process in processes:
+            process.start()
+        errors = []
+        reported: set[str] = set()
+        try:
+            while len(reported) < len(processes):
+                try:
+                    solver_name, result, statistics_or_error = results.get(timeout=RACER_POLL_SECONDS)
+                except queue.Empty:
+                    # A racer that exited normally has put its result; one killed by a signal never will
+                    for solver_name, process in zip(self.solver_names, processes):
+                        if solver_name not in reported and process.exitcode not in (None, 0):
+                            reported.add(solver_name)
+                            errors.append(f'{solver_name}: died with exit code {process.exitcode}')
+                    continue
+                reported.add(solver_name)
+                if result is not None:
+                    self.winner = solver_name
+                    self.result = result
+                    self.statistics = statistics_or_error
+                    break
+                errors.append(f'{solver_name}: {statistics_or_error}')
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in processes:
+                process.join()
+        if self.winner is None:
+            raise RuntimeError(f'No solver of the portfolio completed the analysis ({"; ".join(errors)}).')
+        return self
+
+
+def _race_solver(model: PySATModel, solver_name: str, preprocess: bool, results: multiprocessing.Queue) -> None:
+    try:
+        solver = Solver(name=solver_name)
+        statistics = CoreDeadStatistics()
+        result = coredead_features(model, solver, statistics, preprocess)
+        solver.delete()
+        results.put((solver_name, result, statistics))
+    except Exception as e:
+        results.put((solver_name, None, f'{type(e).__name__}: {e}'))
+
+
+class SolverChoice:
+    """Per-model solver choice learned from historical results files.
+
+    The chosen solver of a model is the one with the lowest median time among its
+    runs (a solver with a timeout median is never chosen).
+    """
+
+    def __init__(self, best_solvers: dict[str, str]) -> None:
+        self.best_solvers = best_solvers
+
+    @staticmethod
+    def from_results(filepaths: Iterable[str], solver_names: Optional[Iterable[str]] = None, tool: str = 'Flama') -> 'SolverChoice':
+        allowed_solvers = set(solver_names) if solver_names is not None else None
+        times: dict[str, dict[str, list[float]]] = {}
+        for filepath in filepaths:
+            for row in read_results(filepath):
+                if row.tool != tool or (allowed_solvers is not None and row.solver not in allowed_solvers):
+                    continue
+                seconds = float('inf') if row.timeout else row.seconds
+                times.setdefault(row.model, {}).setdefault(row.solver, []).append(seconds)
+        best_solvers = {}
+        for model_name, solver_times in times.items():
+            medians = {solver: statistics.median(seconds) for solver, seconds in solver_times.items()}
+            solver, median = min(medians.items(), key=lambda item: item[1])
+            if median != float('inf'):
+                best_solvers[model_name] = solver
+        return SolverChoice(best_solvers)
+
+    def choose(self, model_name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.best_solvers.get(model_name, default)
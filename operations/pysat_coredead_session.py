@@ -0,0 +1,124 @@
+import time
+from typing import Any, Iterable, Optional
+
+from pysat.solvers import Solver
+
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+
+from operations.pysat_coredead_features import (
+    CoreDeadPruning,
+    CoreDeadStatistics,
+    decide_candidates,
+    probe_failed_literals,
+    propagate_root,
+)
+
+
+class CoreDeadSession:
+    """A model loaded once into a solver that answers many core/dead queries.
+
+    Partial configurations (selected and deselected features) are passed to the
+    solver as assumptions, so the clauses learned by a query are reused by the
+    next ones. Use it as a context manager, or call close() to free the solver.
+    """
+
+    def __init__(self, model: PySATModel, solver_name: str = 'glucose3') -> None:
+        self.model = model
+        self.solver_name = solver_name
+        self.solver = Solver(name=solver_name, bootstrap_with=model.get_all_clauses())
+        self.statistics = CoreDeadStatistics(variables=len(model.variables))
+        self._root_pruning: Optional[CoreDeadPruning] = None
+        self._coredead: Optional[tuple[list[Any], list[Any]]] = None
+        self._satisfiable: dict[frozenset[int], bool] = {}
+
+    def get_assumptions(self, selected: Iterable[str] = (), deselected: Iterable[str] = ()) -> list[int]:
+        """Translate a partial configuration into solver assumptions."""
+        return ([self.model.get_variable(feature) for feature in selected]
+                + [-self.model.get_variable(feature) for feature in deselected])
+
+    def is_satisfiable(self, selected: Iterable[str] = (), deselected: Iterable[str] = ()) -> bool:
+        assumptions = self.get_assumptions(selected, deselected)
+        key = frozenset(assumptions)
+        if key not in self._satisfiable:
+            self.statistics.solver_calls += 1
+            self._satisfiable[key] = self.solver.solve(assumptions=assumptions)
+        return self._satisfiable[key]
+
+    def core_dead(self, selected: Iterable[str] = (), deselected: Iterable[str] = ()) -> tuple[list[Any], list[Any]]:
+        """Core and dead features of the model under the given partial configuration.
+
+        Return ([], []) if the configuration is not valid, as coredead_features
+        does for an unsatisfiable model.
+        """
+        selected, deselected = list(selected), list(deselected)
+        if not selected and not deselected and self._coredead is not None:
+            return self._coredead
+        assumptions = self.get_assumptions(selected, deselected)
+        pruning = CoreDeadPruning(self.model.variables.values())
+        if not assumptions:
+            propagate_root(self.model.get_all_clauses().clauses, pruning, self.statistics)
+        else:
+            # Decided variables of the model without configuration stay decided under any configuration
+            root_pruning = self._get_root_pruning()
+            for var in root_pruning.core:
+                pruning.set_core(var)
+            for var in root_pruning.dead:
+                pruning.set_dead(var)
+        probe_failed_literals(self.model.variables.values(), self.solver, pruning, self.statistics, assumptions)
+
+        start_time = time.perf_counter()
+        self.statistics.solver_calls += 1
+        satisfiable = self.solver.solve(assumptions=assumptions)
+        self._satisfiable[frozenset(assumptions)] = satisfiable
+        if satisfiable:
+            pruning.prune(self.solver.get_model())
+            decide_candidates(self.model.variables.values(), self.solver, pruning, self.statistics, assumptions)
+        self.statistics.solving_time += time.perf_counter() - start_time
+        if not satisfiable:
+            return ([], [])
+        core_features = [name for name, var in self.model.variables.items() if var in pruning.core]
+        dead_features = [name for name, var in self.model.variables.items() if var in pruning.dead]
+        if not assumptions:
+            self._root_pruning = pruning
+            self._coredead = (core_features, dead_features)
+        return (core_features, dead_features)
+
+    def is_core(self, feature: str, selected: Iterable[str] = (), deselected: Iterable[str] = ()) -> bool:
+        """Whether the feature is core under the given partial configuration (False if it is not valid)."""
+        if not self.is_satisfiable(selected, deselected):
+            return False
+        self.statistics.solver_calls += 1
+        assumptions = self.get_assumptions(selected, deselected)
+        return not self.solver.solve(assumptions=assumptions + [-self.model.get_variable(feature)])
+
+    def is_dead(self, feature: str, selected: Iterable[str] = (), deselected: Iterable[str] = ()) -> bool:
+        """Whether the feature is dead under the given partial configuration (False if it is not valid)."""
+        if not self.is_satisfiable(selected, deselected):
+            return False
+        self.statistics.solver_calls += 1
+        assumptions = self.get_assumptions(selected, deselected)
+        return not self.solver.solve(assumptions=assumptions + [self.model.get_variable(feature)])
+
+    def dead_after(self, selected: Iterable[str]) -> list[Any]:
+        """Features that become dead after selecting the given features (dead ones in the model excluded)."""
+        _, dead_features = self.core_dead()
+        dead = set(dead_features)
+        return [feature for feature in self.core_dead(selected=selected)[1] if feature not in dead]
+
+    def _get_root_pruning(self) -> CoreDeadPruning:
+        if self._root_pruning is None:
+            self.core_dead()
+        if self._root_pruning is None:  # the model is unsatisfiable
+            return CoreDeadPruning(())
+        return self._root_pruning
+
+    def close(self) -> None:
+        if self.solver is not None:
+            self.solver.delete()
+            self.solver = None
+
+    def __enter__(self) -> 'CoreDeadSession':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,128 @@
+import itertools
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+
+from pysat.solvers import Solver
+
+
+ITERATION_CHUNK = 1 << 16  # clauses converted to Python lists at a time when iterating
+
+
+class ClauseStore:
+    """Compact clauses: a flat int32 buffer with the literals of all clauses plus an offsets array.
+
+    Clause i has the literals literals[offsets[i]:offsets[i + 1]]. Python lists
+    are only built for the clauses being iterated, and slices share the literal
+    buffer (e.g., to shard the clauses among processes without copying them).
+    It can be used wherever a list of clauses is read (e.g., as the clauses of
+    the CNF of a PySATModel, or to bootstrap a solver). Clauses can also be
+    appended (e.g., by PySATModel.add_clause): they are kept in a Python list
+    and moved to the buffers the next time these are read.
+    """
+
+    __slots__ = ('_literals', '_offsets', '_appended')
+
+    def __init__(self, literals: np.ndarray, offsets: np.ndarray) -> None:
+        self._literals = literals
+        self._offsets = offsets
+        self._appended: list[list[int]] = []
+
+    @property
+    def literals(self) -> np.ndarray:
+        self._merge_appended()
+        return self._literals
+
+    @property
+    def offsets(self) -> np.ndarray:
+        self._merge_appended()
+        return self._offsets
+
+    def append(self, clause: Iterable[int]) -> None:
+        self._appended.append(list(clause))
+
+    def extend(self, clauses: Iterable[Iterable[int]]) -> None:
+        for clause in clauses:
+            self.append(clause)
+
+    def _merge_appended(self) -> None:
+        """Move the appended clauses to the buffers (the clauses of a slice are copied, so other slices do not change)."""
+        if not self._appended:
+            return
+        start, end = int(self._offsets[0]), int(self._offsets[-1])
+        lengths = np.fromiter((len(clause) for clause in self._appended), dtype=np.int64, count=len(self._appended))
+        appended = np.fromiter(itertools.chain.from_iterable(self._appended), dtype=np.int32, count=int(lengths.sum()))
+        self._literals = np.concatenate([self._literals[start:end], appended])
+        self._offsets = np.concatenate([self._offsets - start, end - start + np.cumsum(lengths)])
+        self._appended = []
+
+    @staticmethod
+    def from_zero_terminated(literals: np.ndarray) -> 'ClauseStore':
+        """Store of a DIMACS-like buffer, where each clause is terminated by 0."""
+        ends = np.flatnonzero(literals == 0)
+        offsets = np.empty(len(ends) + 1, dtype=np.int64)
+        offsets[0] = 0
+        offsets[1:] = ends - np.arange(len(ends))
+        return ClauseStore(np.ascontiguousarray(literals[literals != 0], dtype=np.int32), offsets)
+
+    @staticmethod
+    def from_clauses(clauses: Iterable[list[int]]) -> 'ClauseStore':
+        clauses = clauses if isinstance(clauses, list) else list(clauses)
+        offsets = np.zeros(len(clauses) + 1, dtype=np.int64)
+        np.cumsum([len(clause) for clause in clauses], out=offsets[1:])
+        literals = np.fromiter(itertools.chain.from_iterable(clauses), dtype=np.int32, count=int(offsets[-1]))
+        return ClauseStore(literals, offsets)
+
+    def to_zero_terminated(self) -> np.ndarray:
+        """Literals with each clause terminated by 0 (the layout of the cached models)."""
+        start, end = int(self.offsets[0]), int(self.offsets[-1])
+        buffer = np.zeros(end - start + len(self), dtype=np.int32)
+        positions = np.arange(start, end) - start + np.repeat(np.arange(len(self)), self.lengths())
+        buffer[positions] = self.literals[start:end]
+        return buffer
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def max_var(self) -> int:
+        used = self.literals[self.offsets[0]:self.offsets[-1]]
+        return int(np.abs(used).max(initial=0))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[list[int], 'ClauseStore']:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('Slices of a ClauseStore must be contiguous.')
+            return ClauseStore(self.literals, self.offsets[start:max(start, stop) + 1])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('clause index out of range')
+        return self.literals[self.offsets[index]:self.offsets[index + 1]].tolist()
+
+    def __iter__(self) -> Iterator[list[int]]:
+        for first in range(0, len(self), ITERATION_CHUNK):
+            chunk_offsets = self.offsets[first:first + ITERATION_CHUNK + 1].tolist()
+            base = chunk_offsets[0]
+            literals = self.literals[base:chunk_offsets[-1]].tolist()
+            for start, end in zip(chunk_offsets, chunk_offsets[1:]):
+                yield literals[start - base:end - base]
+
+    def append_formula(self, solver: Solver) -> None:
+        """Add the clauses to the solver in bulk, without materializing them as a list."""
+        solver.append_formula(iter(self))
+
+    def __repr__(self) -> str:
+        return f'ClauseStore({len(self)} clauses, {int(self.offsets[-1] - self.offsets[0])} literals)'
+
+
+def append_formula(solver: Solver, clauses: Iterable[list[int]]) -> None:
+    """Add clauses (a list or a ClauseStore) to the solver."""
+    if isinstance(clauses, ClauseStore):
+        clauses.append_formula(solver)
+    else:
+        solver.append_formula(clauses)
@@ -0,0 +1,214 @@
+import os
+from typing import Iterable, Optional, Union
+from dataclasses import dataclass, field
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.core.models.ast import ASTOperation, Node
+from flamapy.metamodels.fm_metamodel.models import FeatureModel
+from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat
+
+from transformations.clause_store import ClauseStore
+
+
+TSEITIN_THRESHOLD = 16  # constraints whose distributive CNF has more clauses are Tseitin-encoded
+WRITE_BUFFER_SIZE = 1 << 20
+
+BOOLEAN_OPERATIONS = (ASTOperation.AND, ASTOperation.OR, ASTOperation.NOT, ASTOperation.IMPLIES,
+                      ASTOperation.REQUIRES, ASTOperation.EXCLUDES, ASTOperation.EQUIVALENCE, ASTOperation.XOR)
+
+
+def cnf_size(node: Node, positive: bool = True) -> Optional[int]:
+    """Number of clauses of the distributive CNF of the formula (or of its negation), without building it.
+
+    Return None if the formula is not a propositional formula over features.
+    """
+    if not node.is_op():
+        return 1 if isinstance(node.data, str) else None
+    if node.data not in BOOLEAN_OPERATIONS:
+        return None
+    if node.data == ASTOperation.NOT:
+        return cnf_size(node.left, not positive)
+    left_positive, left_negative = cnf_size(node.left, True), cnf_size(node.left, False)
+    right_positive, right_negative = cnf_size(node.right, True), cnf_size(node.right, False)
+    if None in (left_positive, left_negative, right_positive, right_negative):
+        return None
+    if node.data == ASTOperation.AND:
+        return left_positive + right_positive if positive else left_negative * right_negative
+    if node.data == ASTOperation.OR:
+        return left_positive * right_positive if positive else left_negative + right_negative
+    if node.data in (ASTOperation.IMPLIES, ASTOperation.REQUIRES):
+        return left_negative * right_positive if positive else left_positive + right_negative
+    if node.data == ASTOperation.EXCLUDES:
+        return left_negative * right_negative if positive else left_positive + right_positive
+    equivalence = (left_negative * right_positive + left_positive * right_negative,
+                   (left_positive + right_negative) * (left_negative + right_positive))
+    positive_equivalence = positive if node.data == ASTOperation.EQUIVALENCE else not positive
+    return equivalence[0] if positive_equivalence else equivalence[1]
+
+
+class TseitinEncoder:
+    """Tseitin encoding of propositional constraints, with an auxiliary variable per subformula.
+
+    The auxiliary variables are defined in both directions, so they are determined
+    by the features and the number of configurations is preserved. Repeated
+    subformulas share their auxiliary variable.
+    """
+
+    def __init__(self, variables: dict[str, int], next_variable: int) -> None:
+        self.variables = variables
+        self.next_variable = next_variable
+        self.auxiliary_variables: list[int] = []
+        self.clauses: list[list[int]] = []
+        self._gates: dict[str, int] = {}
+
+    def encode(self, node: Node) -> list[list[int]]:
+        """Add the clauses asserting the formula, and return them."""
+        start = len(self.clauses)
+        self._assert(node)
+        return self.clauses[start:]
+
+    def _assert(self, node: Node) -> None:
+        if node.is_op() and node.data == ASTOperation.AND:
+            self._assert(node.left)
+            self._assert(node.right)
+        else:
+            self.clauses.append([self._literal(disjunct) for disjunct in self._disjuncts(node)])
+
+    def _disjuncts(self, node: Node) -> list[Node]:
+        """Subformulas whose disjunction is the formula (the top-level ORs flattened)."""
+        if node.is_op() and node.data == ASTOperation.OR:
+            return self._disjuncts(node.left) + self._disjuncts(node.right)
+        if node.is_op() and node.data in (ASTOperation.IMPLIES, ASTOperation.REQUIRES):
+            return [Node(ASTOperation.NOT, node.left)] + self._disjuncts(node.right)
+        return [node]
+
+    def _literal(self, node: Node) -> int:
+        if not node.is_op():
+            if node.data not in self.variables:
+                raise FlamaException(f'Feature {node.data} is not in the model')
+            return self.variables[node.data]
+        if node.data == ASTOperation.NOT:
+            return -self._literal(node.left)
+        if node.data == ASTOperation.XOR:
+            return -self._gate(Node(ASTOperation.EQUIVALENCE, node.left, node.right))
+        return self._gate(node)
+
+    def _gate(self, node: Node) -> int:
+        key = str(node)
+        if key in self._gates:
+            return self._gates[key]
+        left, right = self._literal(node.left), self._literal(node.right)
+        if node.data in (ASTOperation.IMPLIES, ASTOperation.REQUIRES):
+            left = -left
+        elif node.data == ASTOperation.EXCLUDES:
+            left, right = -left, -right
+        gate = self.next_variable
+        self.next_variable += 1
+        self.auxiliary_variables.append(gate)
+        if node.data == ASTOperation.AND:
+            self.clauses.extend([[-gate, left], [-gate, right], [gate, -left, -right]])
+        elif node.data == ASTOperation.EQUIVALENCE:
+            self.clauses.extend([[-gate, -left, right], [-gate, left, -right], [gate, left, right], [gate, -left, -right]])
+        else:  # a disjunction: OR, IMPLIES, REQUIRES or EXCLUDES
+            self.clauses.extend([[-gate, left, right], [gate, -left], [gate, -right]])
+        self._gates[key] = gate
+        return gate
+
+
+def simplify_clauses(clauses: Iterable[list[int]], subsumption: bool = False) -> list[list[int]]:
+    """Remove repeated literals, tautologies and duplicated clauses (and subsumed clauses, if enabled).
+
+    The models of the formula do not change, and the kept clauses keep their order.
+    """
+    kept: list[list[int]] = []
+    seen: set[frozenset[int]] = set()
+    for clause in clauses:
+        clause = list(dict.fromkeys(clause))
+        literals = frozenset(clause)
+        if literals in seen or any(-literal in literals for literal in clause):
+            continue
+        seen.add(literals)
+        kept.append(clause)
+    if not subsumption:
+        return kept
+
+    # Forward subsumption: each clause is watched by one of its literals, so a clause
+    # can only be subsumed by the shorter clauses watched by one of its own literals
+    order = sorted(range(len(kept)), key=lambda i: len(kept[i]))
+    watches: dict[int, list[frozenset[int]]] = {}
+    subsumed: set[int] = set()
+    for i in order:
+        literals = frozenset(kept[i])
+        if any(other <= literals for literal in literals for other in watches.get(literal, ())):
+            subsumed.add(i)
+            continue
+        watch = min(literals, key=lambda literal: len(watches.get(literal, ())))
+        watches.setdefault(watch, []).append(literals)
+    return [clause for i, clause in enumerate(kept) if i not in subsumed]
+
+
+@dataclass
+class EncodedCNF:
+    """Clauses of a feature model, with the sizes of its plain FmToPysat encoding to compare with."""
+
+    features: dict[int, str]
+    clauses: Union[list[list[int]], ClauseStore]
+    n_vars: int
+    original_vars: int
+    original_clauses: int
+    tseitin_constraints: int = 0
+    auxiliary_variables: list[int] = field(default_factory=list)
+
+
+def encode_feature_model(feature_model: FeatureModel,
+                         tseitin_threshold: Optional[int] = None,
+                         simplify: bool = False,
+                         subsumption: bool = False) -> EncodedCNF:
+    """Encode a feature model in CNF, with optional size-reducing encodings.
+
+    With a Tseitin threshold, the constraints whose distributive CNF would have more
+    clauses are Tseitin-encoded (the rest of the model is encoded by FmToPysat). The
+    sizes of the plain encoding are computed from cnf_size, without expanding them.
+    """
+    large_constraints = []
+    if tseitin_threshold is not None:
+        for ctc in feature_model.get_constraints():
+            size = cnf_size(ctc.ast.root)
+            if size is not None and size > tseitin_threshold:
+                large_constraints.append((ctc, size))
+    constraints = feature_model.ctcs
+    feature_model.ctcs = [ctc for ctc in constraints if all(ctc is not large for large, _ in large_constraints)]
+    try:
+        sat_model = FmToPysat(feature_model).transform()
+    finally:
+        feature_model.ctcs = constraints
+    clauses = sat_model.get_all_clauses().clauses
+    n_vars = max(sat_model.features, default=0)
+    original_clauses = len(clauses) + sum(size for _, size in large_constraints)
+
+    encoder = TseitinEncoder(sat_model.variables, n_vars + 1)
+    for ctc, _ in large_constraints:
+        encoder.encode(ctc.ast.root)
+    clauses = clauses + encoder.clauses
+    if simplify or subsumption:
+        clauses = simplify_clauses(clauses, subsumption)
+    return EncodedCNF(features=dict(sat_model.features),
+                      clauses=clauses,
+                      n_vars=encoder.next_variable - 1,
+                      original_vars=n_vars,
+                      original_clauses=original_clauses,
+                      tseitin_constraints=len(large_constraints),
+                      auxiliary_variables=encoder.auxiliary_variables)
+
+
+def write_dimacs(filepath: str, cnf: EncodedCNF, buffer_size: int = WRITE_BUFFER_SIZE) -> None:
+    """Stream the CNF (its clauses as a list or a ClauseStore) to a DIMACS file through a buffer, in the format of DimacsWriter.
+
+    It is written to a temporary file and renamed, so readers never see a partial file.
+    """
+    tmp_filepath = f'{filepath}.{os.getpid()}.tmp'
+    with open(tmp_filepath, 'w', encoding='utf8', buffering=buffer_size) as file:
+        file.write(f'p cnf {cnf.n_vars} {len(cnf.clauses)}\n')
+        file.writelines(f'c {var} {name}\n' for var, name in cnf.features.items())
+        file.writelines(' '.join(map(str, clause)) + ' 0\n' for clause in cnf.clauses)
+    os.replace(tmp_filepath, filepath)
@@ -0,0 +1,88 @@
+import re
+from typing import Iterator
+
+import numpy as np
+
+from pysat.solvers import Solver
+
+from flamapy.core.exceptions import FlamaException
+from flamapy.core.transformations import TextToModel
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+
+from transformations.clause_store import ClauseStore
+
+
+PROBLEM_LINE = re.compile(rb'^p[^\n]*', re.MULTILINE)
+COMMENT_OR_PROBLEM_LINE = re.compile(rb'^[cp][^\n]*', re.MULTILINE)
+VARIABLE_COMMENT = re.compile(rb'^c[^\S\n]+(\S+)[^\S\n]+(\S+)', re.MULTILINE)
+
+
+class FastDimacsReader(TextToModel):
+    """Bulk DIMACS reader, a drop-in replacement of DimacsReader for large models.
+
+    The whole file is read at once and the clause literals are tokenized into a
+    flat int32 array, kept in a ClauseStore, so no Python object is built per
+    literal until the clauses are requested.
+    """
+
+    @staticmethod
+    def get_source_extension() -> str:
+        return 'dimacs'
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.store = ClauseStore(np.empty(0, dtype=np.int32), np.zeros(1, dtype=np.int64))
+        self.features: dict[int, str] = {}
+        self.variables: dict[str, int] = {}
+        self.n_vars = 0
+        self.n_clauses = 0
+
+    def read(self) -> 'FastDimacsReader':
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        problem = PROBLEM_LINE.search(data)
+        if problem is None:
+            raise FlamaException(f'Incorrect Dimacs format of {self.path}. '
+                                 f'No problem statement.')
+        problem_list = problem.group().split()
+        self.n_vars = int(problem_list[2])
+        self.n_clauses = int(problem_list[3])
+
+        for var, feature in VARIABLE_COMMENT.findall(data):
+            name = feature.decode('utf-8')
+            self.features[int(var)] = name
+            self.variables[name] = int(var)
+
+        try:
+            # Every token must be a literal: unexpected lines (e.g., '%') fail instead of truncating the clauses
+            literals = np.array(COMMENT_OR_PROBLEM_LINE.sub(b'', data).split(), dtype=np.int32)
+        except ValueError as e:
+            raise FlamaException(f'Incorrect Dimacs format of {self.path}. {e}') from e
+        self.store = ClauseStore.from_zero_terminated(literals)
+        if self.n_clauses != len(self.store):
+            raise FlamaException(f'Incorrect Dimacs format of {self.path}. '
+                                 f'Inconsistent number of clauses.')
+        return self
+
+    def clauses(self) -> Iterator[list[int]]:
+        """Iterate the clauses as lists of literals."""
+        return iter(self.store)
+
+    def append_formula(self, solver: Solver) -> None:
+        """Add the clauses straight into the solver, without building a PySATModel."""
+        if not len(self.store):
+            self.read()
+        self.store.append_formula(solver)
+
+    def transform(self) -> PySATModel:
+        return self.read().to_pysat_model()
+
+    def to_pysat_model(self) -> PySATModel:
+        """Build the PySATModel of the clauses already read."""
+        sat_model = PySATModel()
+        sat_model.features = self.features
+        sat_model.variables = self.variables
+        cnf = sat_model.get_all_clauses()
+        cnf.clauses = self.store
+        cnf.nv = self.store.max_var
+        return sat_model
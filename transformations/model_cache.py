@@ -0,0 +1,168 @@
+import os
+import json
+import hashlib
+from typing import Any, Iterator, Optional
+from importlib import metadata
+
+import numpy as np
+
+from pysat.solvers import Solver
+
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+from flamapy.metamodels.pysat_metamodel.models.pysat_model import PySATModel
+from flamapy.metamodels.pysat_metamodel.transformations import FmToPysat
+
+from transformations.clause_store import ClauseStore
+from transformations.fast_dimacs_reader import FastDimacsReader
+
+
+CACHE_DIR = os.environ.get('MODEL_CACHE_DIR', '.model_cache')
+CACHE_FORMAT_VERSION = 3
+LITERALS_EXTENSION = '.literals.npy'
+OFFSETS_EXTENSION = '.offsets.npy'
+NAMES_EXTENSION = '.names.json'
+
+
+def get_tool_version() -> str:
+    """Version of the tools that compile the models, part of the cache key."""
+    versions = [f'cache={CACHE_FORMAT_VERSION}']
+    for package in ('flamapy', 'flamapy-fm', 'flamapy-sat'):
+        try:
+            versions.append(f'{package}={metadata.version(package)}')
+        except metadata.PackageNotFoundError:
+            versions.append(f'{package}=unknown')
+    return ';'.join(versions)
+
+
+class CompiledModel:
+    """A CNF model as a compact clause store (flat int32 literals plus offsets), its name tables and its auxiliary variables."""
+
+    def __init__(self,
+                 store: ClauseStore,
+                 variables: dict[str, int],
+                 features: dict[int, str],
+                 auxiliary_variables: Optional[set[int]] = None) -> None:
+        self.store = store
+        self.variables = variables
+        self.features = features
+        self.auxiliary_variables = auxiliary_variables if auxiliary_variables is not None else set()
+
+    @property
+    def n_clauses(self) -> int:
+        return len(self.store)
+
+    def clauses(self) -> Iterator[list[int]]:
+        """Iterate the clauses as lists of literals."""
+        return iter(self.store)
+
+    def append_formula(self, solver: Solver) -> None:
+        self.store.append_formula(solver)
+
+    def to_pysat_model(self) -> PySATModel:
+        """PySATModel whose clauses are the clause store (no list of lists is built)."""
+        sat_model = PySATModel()
+        sat_model.features = self.features
+        sat_model.variables = self.variables
+        sat_model.auxiliary_variables = set(self.auxiliary_variables)
+        cnf = sat_model.get_all_clauses()
+        cnf.clauses = self.store
+        cnf.nv = self.store.max_var
+        return sat_model
+
+    @staticmethod
+    def from_pysat_model(sat_model: PySATModel) -> 'CompiledModel':
+        store = ClauseStore.from_clauses(sat_model.get_all_clauses().clauses)
+        return CompiledModel(store, dict(sat_model.variables), dict(sat_model.features),
+                             set(getattr(sat_model, 'auxiliary_variables', ())))
+
+
+class ModelCache:
+    """On-disk cache of compiled models, keyed by the content of the source file and the tool version.
+
+    A changed source file gets a new key, so stale entries are never loaded
+    (they are removed with prune()).
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+        self.tool_version = get_tool_version()
+
+    def get_key(self, fm_filepath: str) -> str:
+        digest = hashlib.sha256(self.tool_version.encode('utf-8'))
+        digest.update(os.path.splitext(fm_filepath)[1].lower().encode('utf-8'))
+        with open(fm_filepath, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_entry_filepaths(self, key: str) -> tuple[str, str, str]:
+        return (os.path.join(self.cache_dir, key + LITERALS_EXTENSION),
+                os.path.join(self.cache_dir, key + OFFSETS_EXTENSION),
+                os.path.join(self.cache_dir, key + NAMES_EXTENSION))
+
+    def load(self, fm_filepath: str) -> CompiledModel:
+        """Load the compiled model, compiling and storing it on a cache miss."""
+        key = self.get_key(fm_filepath)
+        compiled_model = self._read_entry(key)
+        if compiled_model is None:
+            compiled_model = compile_model(fm_filepath)
+            self._write_entry(key, compiled_model)
+        return compiled_model
+
+    def keys(self) -> set[str]:
+        if not os.path.isdir(self.cache_dir):
+            return set()
+        return {filename[:-len(NAMES_EXTENSION)] for filename in os.listdir(self.cache_dir)
+                if filename.endswith(NAMES_EXTENSION)}
+
+    def remove(self, key: str) -> None:
+        for filepath in self.get_entry_filepaths(key):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+    def _read_entry(self, key: str) -> Optional[CompiledModel]:
+        filepaths = self.get_entry_filepaths(key)
+        if not all(os.path.exists(filepath) for filepath in filepaths):
+            return None
+        literals_filepath, offsets_filepath, names_filepath = filepaths
+        with open(names_filepath, 'r', encoding='utf-8') as file:
+            names = json.load(file)
+        store = ClauseStore(np.load(literals_filepath, mmap_mode='r'), np.load(offsets_filepath, mmap_mode='r'))
+        variables = {name: var for name, var in names['variables']}
+        features = {var: name for var, name in names['features']}
+        return CompiledModel(store, variables, features, set(names['auxiliary_variables']))
+
+    def _write_entry(self, key: str, compiled_model: CompiledModel) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        literals_filepath, offsets_filepath, names_filepath = self.get_entry_filepaths(key)
+        names: dict[str, Any] = {'variables': list(compiled_model.variables.items()),
+                                 'features': list(compiled_model.features.items()),
+                                 'auxiliary_variables': sorted(compiled_model.auxiliary_variables)}
+        # Write to temporary files and rename, so concurrent runs never see partial entries
+        tmp_extension = f'.{os.getpid()}.tmp'
+        store = compiled_model.store
+        start, end = int(store.offsets[0]), int(store.offsets[-1])
+        with open(literals_filepath + tmp_extension, 'wb') as file:
+            np.save(file, np.asarray(store.literals[start:end], dtype=np.int32))
+        with open(offsets_filepath + tmp_extension, 'wb') as file:
+            np.save(file, np.asarray(store.offsets, dtype=np.int64) - start)
+        with open(names_filepath + tmp_extension, 'w', encoding='utf-8') as file:
+            json.dump(names, file)
+        # The names file is written last, as it marks the entry as complete
+        os.replace(literals_filepath + tmp_extension, literals_filepath)
+        os.replace(offsets_filepath + tmp_extension, offsets_filepath)
+        os.replace(names_filepath + tmp_extension, names_filepath)
+
+
+def compile_model(fm_filepath: str) -> CompiledModel:
+    """Compile a UVL (through FmToPysat) or DIMACS model."""
+    if fm_filepath.endswith('.uvl'):
+        feature_model = UVLReader(fm_filepath).transform()
+        return CompiledModel.from_pysat_model(FmToPysat(feature_model).transform())
+    dimacs = FastDimacsReader(fm_filepath).read()
+    return CompiledModel(dimacs.store, dimacs.variables, dimacs.features)
+
+
+def read_model(fm_filepath: str, cache_dir: str = CACHE_DIR) -> PySATModel:
+    """Load a UVL or DIMACS model as a PySATModel through the compiled-model cache."""
+    return ModelCache(cache_dir).load(fm_filepath).to_pysat_model()
@@ -0,0 +1,188 @@
+import os
+import csv
+import time
+import random
+import resource
+import statistics
+import subprocess
+from typing import Any, Callable, Iterator, Optional
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, asdict
+
+from utils.memory_profiler import SamplingMemoryProfiler
+
+
+METRICS = ['wall', 'cpu', 'children_cpu', 'peak_rss_kb', 'sampled_peak_rss_kb', 'sampled_peak_uss_kb']
+BOOTSTRAP_RESAMPLES = 1000
+CONFIDENCE = 0.95
+
+
+@dataclass
+class Measurement:
+    """Resources used by a phase of a run: wall and CPU seconds, and peak RSS in KB.
+
+    The sampled peaks are filled when a SamplingMemoryProfiler runs along the phase.
+    peak_rss_per_phase is False if the peak RSS could not be reset before the
+    phase, so peak_rss_kb is the peak of the whole process up to its end.
+    """
+
+    phase: str
+    wall: float = 0.0
+    cpu: float = 0.0
+    children_cpu: float = 0.0
+    peak_rss_kb: int = 0
+    sampled_peak_rss_kb: int = 0
+    sampled_peak_uss_kb: int = 0
+    peak_rss_per_phase: bool = True
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak RSS of the process (Linux >= 4.0), so it can be measured per phase."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss_kb() -> int:
+    """Peak RSS of the process in KB (since the last reset_peak_rss, if supported)."""
+    try:
+        with open('/proc/self/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def measure(phase: str, profiler: Optional[SamplingMemoryProfiler] = None) -> Iterator[Measurement]:
+    """Measure the wall time, process CPU time (all threads), children CPU time and peak RSS of a block.
+
+    If a running sampling memory profiler is given, the block is also profiled as a phase.
+    """
+    measurement = Measurement(phase)
+    with profiler.phase(phase) if profiler is not None else nullcontext():
+        measurement.peak_rss_per_phase = reset_peak_rss()
+        start_wall, start_cpu, start_children_cpu = time.perf_counter(), time.process_time(), _children_cpu()
+        try:
+            yield measurement
+        finally:
+            measurement.wall = time.perf_counter() - start_wall
+            measurement.cpu = time.process_time() - start_cpu
+            measurement.children_cpu = _children_cpu() - start_children_cpu
+            measurement.peak_rss_kb = read_peak_rss_kb()
+    if profiler is not None:
+        measurement.sampled_peak_rss_kb = profiler.phase_peaks[phase]['peak_rss_kb']
+        measurement.sampled_peak_uss_kb = profiler.phase_peaks[phase]['peak_uss_kb']
+
+
+def measure_command(command: list[str], timeout: Optional[float] = None) -> Measurement:
+    """Measure an external command (e.g., the sat4j jar) with the resources used by its own process."""
+    start_wall = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    status, usage = _wait4(process, timeout)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f'Command {command} failed with exit code {process.returncode}.')
+    return Measurement('process',
+                       wall=time.perf_counter() - start_wall,
+                       children_cpu=usage.ru_utime + usage.ru_stime,
+                       peak_rss_kb=usage.ru_maxrss)
+
+
+def _wait4(process: subprocess.Popen, timeout: Optional[float]) -> tuple[int, Any]:
+    """Wait for the process, returning its status and its own resource usage."""
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    while True:
+        pid, status, usage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+        if pid != 0:
+            return (status, usage)
+        if time.perf_counter() > deadline:
+            process.kill()
+            _, status, _ = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(0.01)
+
+
+@dataclass
+class Benchmark:
+    """Run a benchmark with warmup and repetitions, recording the measurements of each phase.
+
+    The function benchmarked receives the run number and returns the list of
+    measurements of its phases. Warmup runs are executed but not recorded.
+    """
+
+    name: str
+    warmup: int = 1
+    repetitions: int = 10
+    rows: list[dict[str, Any]] = field(default_factory=list)
+
+    def run(self, function: Callable[[int], list[Measurement]], logger: Optional[Callable[[str], None]] = print) -> 'Benchmark':
+        for i in range(1, self.warmup + 1):
+            function(-i)
+        for i in range(1, self.repetitions + 1):
+            measurements = function(i)
+            for measurement in measurements:
+                self.rows.append({'benchmark': self.name, 'run': i, **asdict(measurement)})
+            if logger:
+                logger(f'{self.name} run {i}/{self.repetitions}: '
+                       + ', '.join(f'{m.phase} {m.wall:.4f} s' for m in measurements))
+        return self
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Median, interquartile range and bootstrap confidence interval of the median per phase and metric."""
+        summary = []
+        phases = list(dict.fromkeys(row['phase'] for row in self.rows))
+        for phase in phases:
+            rows = [row for row in self.rows if row['phase'] == phase]
+            for metric in METRICS:
+                values = [row[metric] for row in rows]
+                summary.append({'benchmark': self.name, 'phase': phase, 'metric': metric, **summarize(values)})
+                if metric == 'peak_rss_kb':
+                    summary[-1]['peak_rss_per_phase'] = all(row.get('peak_rss_per_phase', True) for row in rows)
+        return summary
+
+    def write_rows(self, filepath: str) -> None:
+        write_csv(filepath, self.rows)
+
+    def write_summary(self, filepath: str) -> None:
+        write_csv(filepath, self.summary())
+
+
+def summarize(values: list[float]) -> dict[str, Any]:
+    n = len(values)
+    if n == 0:
+        return {'n': 0}
+    ordered = sorted(values)
+    q1, median, q3 = statistics.quantiles(ordered, n=4, method='inclusive') if n > 1 else (ordered[0],) * 3
+    ci_low, ci_high = bootstrap_median_ci(ordered)
+    return {'n': n, 'median': median, 'q1': q1, 'q3': q3, 'iqr': q3 - q1,
+            'min': ordered[0], 'max': ordered[-1], 'ci_low': ci_low, 'ci_high': ci_high}
+
+
+def bootstrap_median_ci(values: list[float], confidence: float = CONFIDENCE, resamples: int = BOOTSTRAP_RESAMPLES) -> tuple[float, float]:
+    """Percentile bootstrap confidence interval of the median (seeded, so reproducible)."""
+    if len(values) < 2:
+        return (values[0], values[0])
+    rng = random.Random(0)
+    medians = sorted(statistics.median(rng.choices(values, k=len(values))) for _ in range(resamples))
+    alpha = (1 - confidence) / 2
+    return (medians[int(alpha * (resamples - 1))], medians[int((1 - alpha) * (resamples - 1))])
+
+
+def write_csv(filepath: str, rows: list[dict[str, Any]]) -> None:
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with open(filepath, 'w', encoding='utf8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,97 @@
+import os
+import json
+import statistics
+import threading
+from typing import Any, Iterable, Optional
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Task:
+    """A timed run of an analysis: a model analyzed with a solver."""
+
+    filepath: str
+    solver: str
+    run: int
+
+    @property
+    def model(self) -> str:
+        _, filename = os.path.split(self.filepath)
+        return '.'.join(filename.split('.')[:-1])
+
+    @property
+    def key(self) -> tuple[str, str, int]:
+        return (self.model, self.solver, self.run)
+
+
+class ResultsStore:
+    """Crash-safe, append-only JSON Lines store of the completed tasks of a campaign.
+
+    Every record is flushed and fsync'ed when appended, so a crash loses at most
+    the record being written (a truncated last line is ignored when loading).
+    """
+
+    def __init__(self, filepath: str) -> None:
+        self.filepath = filepath
+        self.records: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if os.path.exists(filepath):
+            with open(filepath, 'r', encoding='utf8') as file:
+                for line in file:
+                    try:
+                        self.records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+
+    def append(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            with open(self.filepath, 'a', encoding='utf8') as file:
+                file.write(json.dumps(record) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            self.records.append(record)
+
+    def completed_keys(self) -> set[tuple[str, str, int]]:
+        return {(record['model'], record['solver'], record['run']) for record in self.records}
+
+    def timed_out(self) -> set[tuple[str, str]]:
+        """(model, solver) pairs with a timeout, whose remaining runs are skipped."""
+        return {(record['model'], record['solver']) for record in self.records if record['status'] == 'timeout'}
+
+    def run_seconds(self, model: str, solver: str) -> list[float]:
+        """Seconds of the completed runs of the model with the solver (not resumed)."""
+        return [record['seconds'] for record in self.records
+                if record['model'] == model and record['solver'] == solver and record['status'] == 'ok' and not record.get('resumed')]
+
+    def median_seconds(self) -> dict[tuple[str, str], float]:
+        times: dict[tuple[str, str], list[float]] = {}
+        for record in self.records:
+            if record['status'] == 'ok' and not record.get('resumed'):  # resumed runs only time their last part
+                times.setdefault((record['model'], record['solver']), []).append(record['seconds'])
+        return {key: statistics.median(seconds) for key, seconds in times.items()}
+
+
+def pending_tasks(tasks: Iterable[Task], store: ResultsStore) -> list[Task]:
+    """Tasks not completed yet, skipping the runs of (model, solver) pairs that timed out."""
+    completed = store.completed_keys()
+    timed_out = store.timed_out()
+    return [task for task in tasks if task.key not in completed and (task.model, task.solver) not in timed_out]
+
+
+def order_longest_first(tasks: list[Task], expected_seconds: dict[tuple[str, str], float]) -> list[Task]:
+    """Order the tasks by decreasing expected time, to minimize the makespan of parallel runs.
+
+    Tasks without past timings are estimated from the size of the model file,
+    scaled by the seconds per byte of the models with known timings.
+    """
+    sizes = {task.filepath: os.path.getsize(task.filepath) for task in tasks}
+    known = [(expected_seconds[(task.model, task.solver)], sizes[task.filepath]) for task in tasks
+             if (task.model, task.solver) in expected_seconds]
+    known_size = sum(size for _, size in known)
+    seconds_per_byte = sum(seconds for seconds, _ in known) / known_size if known_size else 1.0
+
+    def expected(task: Task) -> float:
+        seconds: Optional[float] = expected_seconds.get((task.model, task.solver))
+        return seconds if seconds is not None else sizes[task.filepath] * seconds_per_byte
+
+    return sorted(tasks, key=lambda task: (-expected(task), task.model, task.solver, task.run))
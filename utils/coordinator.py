@@ -0,0 +1,238 @@
+import os
+import hmac
+import json
+import time
+import uuid
+import socket
+import threading
+import socketserver
+from typing import Any, Callable, Optional
+from collections import deque
+from dataclasses import dataclass, asdict
+
+from utils.campaign import Task
+
+
+LEASE_SECONDS = 60.0  # a lease not renewed in this time is expired, and its task handed out again
+RETRY_SECONDS = 2.0  # wait of a worker when all pending tasks are leased
+CONNECT_RETRIES = 5  # failed requests before a worker gives up on the coordinator
+DONE_GRACE_SECONDS = 5.0  # the coordinator keeps answering "done" for this time after the campaign finishes
+DEFAULT_HOST = '127.0.0.1'  # only local workers, unless the coordinator is bound to another interface
+COORDINATOR_TOKEN = os.environ.get('COORDINATOR_TOKEN')  # shared secret of the coordinator and its workers
+
+
+@dataclass
+class Lease:
+    task: Task
+    worker: str
+    expires: float
+
+
+class Coordinator:
+    """Hand out the tasks of a campaign to worker nodes over TCP, tracking a lease per task.
+
+    The protocol is one JSON line request and one JSON line reply per connection:
+        {"op": "lease", "worker": NAME} -> {"lease": ID, "task": TASK} or {"task": null, "retry": SECONDS} or {"task": null, "done": true}
+        {"op": "renew", "lease": ID}    -> {"ok": true} or {"ok": false} if the lease expired
+        {"op": "complete", "lease": ID, "record": RECORD} -> {"ok": true} or {"ok": false} if the task was already completed
+    Every request carries the shared token ("token": TOKEN); the requests with
+    another token are answered with {"error": "Invalid token"}.
+    Workers renew their leases while running the tasks. When a worker dies, its
+    leases expire and the tasks are handed out again to other workers. Each task
+    is reported once to on_record, with None if it is skipped because a previous
+    run of the same model and solver did not succeed (as in the local campaign).
+    """
+
+    def __init__(self,
+                 tasks: list[Task],
+                 on_record: Callable[[Task, Optional[dict[str, Any]]], None],
+                 token: str,
+                 lease_seconds: float = LEASE_SECONDS) -> None:
+        self.pending: deque[Task] = deque(tasks)
+        self.on_record = on_record
+        self.token = token
+        self.lease_seconds = lease_seconds
+        self.leases: dict[str, Lease] = {}
+        self.completed: set[tuple[str, str, int]] = set()
+        self.skipped: set[tuple[str, str]] = set()
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+    def handle(self, message: dict[str, Any]) -> dict[str, Any]:
+        if not hmac.compare_digest(str(message.get('token')).encode('utf8'), self.token.encode('utf8')):
+            return {'error': 'Invalid token'}
+        with self._lock:
+            self._expire_leases()
+            if message.get('op') == 'lease':
+                return self._lease(message.get('worker', 'unknown'))
+            if message.get('op') == 'renew':
+                lease = self.leases.get(message.get('lease'))
+                if lease is None:
+                    return {'ok': False}
+                lease.expires = time.monotonic() + self.lease_seconds
+                return {'ok': True}
+            if message.get('op') == 'complete':
+                return self._complete(message.get('lease'), message['record'])
+            return {'error': f'Unknown operation: {message.get("op")}'}
+
+    def check(self) -> None:
+        """Expire the leases of dead workers and detect the end of the campaign."""
+        with self._lock:
+            self._expire_leases()
+            self._skip_pending()
+            if not self.pending and not self.leases:
+                self.finished.set()
+
+    def _lease(self, worker: str) -> dict[str, Any]:
+        self._skip_pending()
+        if not self.pending:
+            if not self.leases:
+                self.finished.set()
+                return {'task': None, 'done': True}
+            return {'task': None, 'retry': RETRY_SECONDS}
+        task = self.pending.popleft()
+        lease_id = uuid.uuid4().hex
+        self.leases[lease_id] = Lease(task, worker, time.monotonic() + self.lease_seconds)
+        return {'lease': lease_id, 'task': asdict(task), 'lease_seconds': self.lease_seconds}
+
+    def _complete(self, lease_id: Optional[str], record: dict[str, Any]) -> dict[str, Any]:
+        lease = self.leases.pop(lease_id, None)
+        task = lease.task if lease is not None else Task(record['filepath'], record['solver'], record['run'])
+        if task.key in self.completed:
+            return {'ok': False}
+        self.completed.add(task.key)
+        # A late result of an expired lease is still valid: its task is no longer pending
+        for other_id in [other_id for other_id, other in self.leases.items() if other.task == task]:
+            del self.leases[other_id]
+        if task in self.pending:
+            self.pending.remove(task)
+        if record['status'] != 'ok':
+            self.skipped.add((task.model, task.solver))
+        self.on_record(task, record)
+        return {'ok': True}
+
+    def _expire_leases(self) -> None:
+        now = time.monotonic()
+        for lease_id, lease in list(self.leases.items()):
+            if lease.expires < now:
+                del self.leases[lease_id]
+                print(f'Lease of {lease.task.model} with {lease.task.solver}, run {lease.task.run} on {lease.worker} expired; '
+                      f'the task is handed out again.')
+                self.pending.appendleft(lease.task)
+
+    def _skip_pending(self) -> None:
+        while self.pending and (self.pending[0].model, self.pending[0].solver) in self.skipped:
+            task = self.pending.popleft()
+            self.completed.add(task.key)
+            self.on_record(task, None)
+
+    def serve(self, address: tuple[str, int]) -> None:
+        """Serve the workers until all tasks are completed or skipped."""
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self) -> None:
+                line = self.rfile.readline()
+                if line:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        message = None
+                    reply = coordinator.handle(message) if isinstance(message, dict) else {'error': 'Invalid request'}
+                    self.wfile.write((json.dumps(reply) + '\n').encode('utf8'))
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer(address, Handler) as server:
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                while not self.finished.wait(timeout=1.0):
+                    self.check()
+                time.sleep(DONE_GRACE_SECONDS)  # so that the polling workers learn that the campaign is done
+            finally:
+                server.shutdown()
+
+
+def parse_address(address: str, default_host: str = DEFAULT_HOST) -> tuple[str, int]:
+    """Address from 'HOST:PORT' or 'PORT'."""
+    host, _, port = address.rpartition(':')
+    return (host or default_host, int(port))
+
+
+def request(address: tuple[str, int], token: str, message: dict[str, Any], timeout: float = 30.0) -> dict[str, Any]:
+    """Send a request to the coordinator and return its reply.
+
+    Raise RuntimeError if the coordinator rejects the request (e.g., wrong token).
+    """
+    with socket.create_connection(address, timeout=timeout) as connection:
+        connection.sendall((json.dumps({**message, 'token': token}) + '\n').encode('utf8'))
+        with connection.makefile('r', encoding='utf8') as file:
+            line = file.readline()
+    if not line:
+        raise ConnectionError('The coordinator closed the connection without a reply.')
+    reply = json.loads(line)
+    if 'error' in reply:
+        raise RuntimeError(f'The coordinator at {address[0]}:{address[1]} rejected the request: {reply["error"]}')
+    return reply
+
+
+class LeaseRenewer(threading.Thread):
+    """Renew a lease in the background while its task runs."""
+
+    def __init__(self, address: tuple[str, int], token: str, lease_id: str, lease_seconds: float) -> None:
+        super().__init__(daemon=True)
+        self.address = address
+        self.token = token
+        self.lease_id = lease_id
+        self.interval = lease_seconds / 3
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                request(self.address, self.token, {'op': 'renew', 'lease': self.lease_id})
+            except OSError:
+                pass  # retried in the next interval; the lease expires if the coordinator stays unreachable
+
+    def __enter__(self) -> 'LeaseRenewer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stopped.set()
+
+
+def run_leased_tasks(address: tuple[str, int], token: str, worker: str, run: Callable[[Task], dict[str, Any]]) -> int:
+    """Lease tasks from the coordinator, run them and send their records, until the campaign is done.
+
+    Return the number of tasks run. The worker gives up after CONNECT_RETRIES
+    consecutive failed requests (e.g., the coordinator finished or died).
+    """
+    n_tasks = 0
+    failures = 0
+    while failures < CONNECT_RETRIES:
+        try:
+            reply = request(address, token, {'op': 'lease', 'worker': worker})
+        except OSError:
+            failures += 1
+            time.sleep(RETRY_SECONDS * failures)
+            continue
+        failures = 0
+        if reply.get('done'):
+            break
+        if reply.get('task') is None:
+            time.sleep(reply.get('retry', RETRY_SECONDS))
+            continue
+        task = Task(**reply['task'])
+        with LeaseRenewer(address, token, reply['lease'], reply['lease_seconds']):
+            record = run(task)
+        n_tasks += 1
+        for attempt in range(CONNECT_RETRIES):
+            try:
+                request(address, token, {'op': 'complete', 'lease': reply['lease'], 'record': record})
+                break
+            except OSError:
+                time.sleep(RETRY_SECONDS * (attempt + 1))
+    return n_tasks
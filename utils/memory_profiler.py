@@ -1,13 +1,32 @@
+import threading
 import tracemalloc
-from typing import Any, Callable, ClassVar, Dict, Optional
-from contextlib import ContextDecorator
-from dataclasses import dataclass
+from typing import Any, Callable, ClassVar, Dict, Iterator, Optional
+from contextlib import ContextDecorator, contextmanager
+from dataclasses import dataclass, field
 
 
 class MemoryProfilerError(Exception):
     """A custom exception used to report errors in use of MemoryProfiler class."""
 
 
+def format_memory(memory: float, message: str = "", text: str = "Memory: {:0.4f}") -> str:
+    """Format a memory size in bytes with the largest unit (B, KB, MB, GB)."""
+    msg = f'{message} {text.format(memory)} B.'
+    memory_kb = None
+    memory_mb = None
+    memory_gb = None
+    if memory > 1e3:
+        memory_kb = memory * 1e-3
+        msg = f'{message} {text.format(memory_kb)} KB.'
+        if memory_kb > 1e3:
+            memory_mb = memory_kb * 1e-3
+            msg = f'{message} {text.format(memory_mb)} MB.'
+            if memory_mb > 1e3:
+                memory_gb = memory_mb * 1e-3
+                msg = f'{message} {text.format(memory_gb)} GB.'
+    return msg
+
+
 @dataclass
 class MemoryProfiler(ContextDecorator):
     """Memory profiler for objects using a class, context manager, or decorator."""
@@ -26,27 +45,22 @@ class MemoryProfiler(ContextDecorator):
 
     def start(self) -> None:
         """Start a new memory profiler"""
-        self._start_memory = tracemalloc.start()
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
 
     def stop(self) -> float:
         """Stop the memory profiler, and report the memory consumed."""
         # Calculate memory usage
         _, memory_peak_usage = tracemalloc.get_traced_memory()
-        tracemalloc.reset_peak()
-
-        msg = f'{self.message} {self.text.format(memory_peak_usage)} B.'
-        memory_peak_usage_kb = None
-        memory_peak_usage_mb = None
-        memory_peak_usage_gb = None
-        if memory_peak_usage > 1e3:
-            memory_peak_usage_kb = memory_peak_usage * 1e-3
-            msg = f'{self.message} {self.text.format(memory_peak_usage_kb)} KB.'
-            if memory_peak_usage_kb > 1e3:
-                memory_peak_usage_mb = memory_peak_usage_kb * 1e-3
-                msg = f'{self.message} {self.text.format(memory_peak_usage_mb)} MB.'
-                if memory_peak_usage_mb > 1e3:
-                    memory_peak_usage_gb = memory_peak_usage_mb * 1e-3
-                    msg = f'{self.message} {self.text.format(memory_peak_usage_gb)} GB.'
+        if self._started_tracing:
+            tracemalloc.stop()
+        else:
+            tracemalloc.reset_peak()
+
+        msg = format_memory(memory_peak_usage, self.message, self.text)
 
         # Report elapsed time
         if self.logger:
@@ -66,3 +80,142 @@ class MemoryProfiler(ContextDecorator):
         """Stop the context manager memory profiler."""
         if self.enabled:
             self.stop()
+
+
+def read_process_memory(uss: bool = True) -> tuple[int, int]:
+    """Current RSS and USS (private memory) of the process in KB, read from /proc (0 if not available)."""
+    rss_kb = 0
+    uss_kb = 0
+    try:
+        with open('/proc/self/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    rss_kb = int(line.split()[1])
+                    break
+        if uss:
+            with open('/proc/self/smaps_rollup', 'r') as file:
+                for line in file:
+                    if line.startswith('Private_Clean:') or line.startswith('Private_Dirty:'):
+                        uss_kb += int(line.split()[1])
+    except OSError:
+        pass
+    return (rss_kb, uss_kb)
+
+
+@dataclass
+class SamplingMemoryProfiler(ContextDecorator):
+    """Memory profiler sampling the RSS/USS of the process in a background thread.
+
+    Unlike MemoryProfiler, it sees the memory allocated by native code (e.g., the
+    SAT solvers) and does not slow down the profiled code. Peaks are attributed to
+    the phase active when sampled (see phase()). tracemalloc is only started if
+    tracemalloc_snapshots is enabled, when take_snapshot() is called, and
+    stopped with the profiler.
+    """
+
+    memory_profilers: ClassVar[Dict[str, float]] = dict()
+    name: Optional[str] = None
+    message: str = ""
+    text: str = "Memory: {:0.4f}"
+    logger: Optional[Callable[[str], None]] = print
+    enabled: bool = True
+    interval: float = 0.05  # seconds between samples
+    uss: bool = True
+    tracemalloc_snapshots: bool = False
+    peak_rss_kb: int = field(default=0, init=False)
+    peak_uss_kb: int = field(default=0, init=False)
+    phase_peaks: Dict[str, Dict[str, int]] = field(default_factory=dict, init=False)
+    _phase: Optional[str] = field(default=None, init=False, repr=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+    _started_tracing: bool = field(default=False, init=False, repr=False)
+    _stop_event: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Initialization: add profiler to dict of memory profilers."""
+        if self.name:
+            self.memory_profilers.setdefault(self.name, 0)
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        if self._thread is not None:
+            raise MemoryProfilerError("Memory profiler is running. Use .stop() to stop it.")
+        self.peak_rss_kb = 0
+        self.peak_uss_kb = 0
+        self.phase_peaks = {}
+        self._stop_event.clear()
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> float:
+        """Stop sampling, and report the peak RSS in bytes."""
+        if self._thread is None:
+            raise MemoryProfilerError("Memory profiler is not running. Use .start() to start it.")
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._sample()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        memory_peak_usage = self.peak_rss_kb * 1024
+        if self.logger:
+            self.logger(format_memory(memory_peak_usage, self.message, self.text))
+        if self.name:
+            self.memory_profilers[self.name] += memory_peak_usage
+        return memory_peak_usage
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator['SamplingMemoryProfiler']:
+        """Attribute the samples taken inside the block to the named phase."""
+        previous_phase = self._phase
+        self.phase_peaks.setdefault(name, {'peak_rss_kb': 0, 'peak_uss_kb': 0})  # before the sampler thread can see the phase
+        self._phase = name
+        self._sample()
+        try:
+            yield self
+        finally:
+            self._sample()
+            self._phase = previous_phase
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        """Take a tracemalloc snapshot of the Python allocations (starting tracemalloc if needed)."""
+        if not self.tracemalloc_snapshots:
+            raise MemoryProfilerError("tracemalloc snapshots are disabled. Use tracemalloc_snapshots=True.")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return tracemalloc.take_snapshot()
+
+    def as_row(self) -> Dict[str, int]:
+        """Peaks as a flat row (e.g., to extend the rows of a benchmark CSV)."""
+        row = {'sampled_peak_rss_kb': self.peak_rss_kb, 'sampled_peak_uss_kb': self.peak_uss_kb}
+        for phase, peaks in self.phase_peaks.items():
+            row.update({f'{phase}_{metric}': value for metric, value in peaks.items()})
+        return row
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        rss_kb, uss_kb = read_process_memory(self.uss)
+        self.peak_rss_kb = max(self.peak_rss_kb, rss_kb)
+        self.peak_uss_kb = max(self.peak_uss_kb, uss_kb)
+        phase = self._phase
+        if phase is not None:
+            peaks = self.phase_peaks[phase]
+            peaks['peak_rss_kb'] = max(peaks['peak_rss_kb'], rss_kb)
+            peaks['peak_uss_kb'] = max(peaks['peak_uss_kb'], uss_kb)
+
+    def __enter__(self) -> "SamplingMemoryProfiler":
+        """Start a new memory profiler as a context manager."""
+        if self.enabled:
+            self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop the context manager memory profiler."""
+        if self.enabled:
+            self.stop()
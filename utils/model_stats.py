@@ -0,0 +1,123 @@
+import os
+import re
+import csv
+from typing import Any, Iterable, Iterator, Optional
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from transformations.fast_dimacs_reader import FastDimacsReader
+
+
+CNF_EXTENSIONS = ('.cnf', '.dimacs')
+UVL_EXTENSIONS = ('.uvl',)
+# Clause-length histogram buckets: lengths 0 (empty clause), 1, 2, 3, 4-7, 8-15, 16-31 and 32 or more
+HISTOGRAM_BOUNDS = [0, 1, 2, 3, 4, 8, 16, 32]
+HISTOGRAM_COLUMNS = ['len_0', 'len_1', 'len_2', 'len_3', 'len_4-7', 'len_8-15', 'len_16-31', 'len_32+']
+COLUMNS = (['model', 'format', 'bytes', 'variables', 'named_variables', 'used_variables', 'pure_literals',
+            'clauses', 'unit_clauses', 'binary_clauses', 'literals', 'max_clause_length', 'mean_clause_length']
+           + HISTOGRAM_COLUMNS
+           + ['features', 'constraints', 'groups', 'max_depth', 'error'])
+
+UVL_SECTIONS = ('namespace', 'features', 'constraints', 'imports', 'include')
+UVL_GROUPS = ('mandatory', 'optional', 'alternative', 'or', 'cardinality')
+UVL_CARDINALITY = re.compile(r'^\[\d+(\.\.(\d+|\*))?\]$')
+
+
+def get_model_name(filepath: str) -> str:
+    _, filename = os.path.split(filepath)
+    return '.'.join(filename.split('.')[:-1])
+
+
+def cnf_stats(filepath: str) -> dict[str, Any]:
+    """Statistics of a DIMACS file, computed on its flat array of literals (no model is built)."""
+    reader = FastDimacsReader(filepath).read()
+    literals = reader.store.literals
+    lengths = reader.store.lengths()
+    histogram = np.bincount(np.searchsorted(HISTOGRAM_BOUNDS, lengths, side='right') - 1,
+                            minlength=len(HISTOGRAM_BOUNDS))
+    positive = np.unique(literals[literals > 0])
+    negative = np.unique(-literals[literals < 0])
+    stats = {'variables': reader.n_vars,
+             'named_variables': len(reader.variables),
+             'used_variables': len(np.union1d(positive, negative)),
+             'pure_literals': len(np.setxor1d(positive, negative, assume_unique=True)),
+             'clauses': reader.n_clauses,
+             'unit_clauses': int(histogram[1]),
+             'binary_clauses': int(histogram[2]),
+             'literals': len(literals),
+             'max_clause_length': int(lengths.max()) if lengths.size else 0,
+             'mean_clause_length': round(float(lengths.mean()), 4) if lengths.size else 0.0}
+    stats.update({column: int(count) for column, count in zip(HISTOGRAM_COLUMNS, histogram)})
+    return stats
+
+
+def uvl_stats(filepath: str) -> dict[str, Any]:
+    """Counts of a UVL file from a line scan of its features and constraints sections.
+
+    Features are the lines of the tree that are not group keywords (mandatory,
+    optional, alternative, or, cardinalities), so no parse tree is built.
+    Multi-line attributes and constraints are not supported.
+    """
+    features = constraints = groups = max_depth = 0
+    section = None
+    feature_indents: list[int] = []  # indentation of the features that are ancestors of the current line
+    braces = 0
+    with open(filepath, 'r', encoding='utf8') as file:
+        for line in file:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('//'):
+                continue
+            if braces > 0:  # inside a multi-line attribute list
+                braces += stripped.count('{') - stripped.count('}')
+                continue
+            indent = len(line) - len(line.lstrip())
+            if indent == 0:
+                section = stripped.split()[0] if stripped.split()[0] in UVL_SECTIONS else section
+                continue
+            if section == 'constraints':
+                constraints += 1
+            elif section == 'features':
+                braces = stripped.count('{') - stripped.count('}')
+                keyword = stripped.split()[0]
+                if keyword in UVL_GROUPS or UVL_CARDINALITY.match(keyword):
+                    groups += 1
+                    continue
+                while feature_indents and feature_indents[-1] >= indent:
+                    feature_indents.pop()
+                feature_indents.append(indent)
+                features += 1
+                max_depth = max(max_depth, len(feature_indents))
+    return {'features': features, 'constraints': constraints, 'groups': groups, 'max_depth': max_depth}
+
+
+def model_stats(filepath: str) -> dict[str, Any]:
+    """Row of statistics of a model (CNF or UVL), with the error message if it cannot be scanned."""
+    row: dict[str, Any] = {'model': get_model_name(filepath),
+                           'format': os.path.splitext(filepath)[1][1:],
+                           'bytes': os.path.getsize(filepath)}
+    try:
+        if filepath.endswith(CNF_EXTENSIONS):
+            row.update(cnf_stats(filepath))
+        elif filepath.endswith(UVL_EXTENSIONS):
+            row.update(uvl_stats(filepath))
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def scan_models(filepaths: Iterable[str], jobs: Optional[int] = None) -> Iterator[dict[str, Any]]:
+    """Statistics of the models, in order, scanned in parallel by a pool of processes (all CPUs by default)."""
+    filepaths = list(filepaths)
+    if jobs == 1:
+        yield from map(model_stats, filepaths)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(model_stats, filepaths, chunksize=4)
+
+
+def write_stats(filepath: str, rows: Iterable[dict[str, Any]]) -> None:
+    with open(filepath, 'w', encoding='utf8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,196 @@
+import os
+import time
+import queue
+import resource
+import statistics
+import subprocess
+import tempfile
+from typing import Iterator, Optional, Union
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+SCHED_POLL_SECONDS = 0.05  # sampling interval of the counters of a pinned process
+RERUN_THRESHOLD = 0.25  # relative deviation from the median of the other runs
+MIN_RUNS = 3  # other runs needed to judge the deviation of a run
+MIN_NOISE_SECONDS = 0.05  # runs shorter than this are not checked (their relative noise is always high)
+MAX_RERUNS = 2
+
+
+def get_physical_cores() -> list[list[int]]:
+    """CPUs usable by this process, grouped by physical core (hyperthread siblings together)."""
+    allowed = os.sched_getaffinity(0)
+    cores: dict[tuple[str, str], list[int]] = {}
+    for cpu in sorted(allowed):
+        topology = f'/sys/devices/system/cpu/cpu{cpu}/topology'
+        try:
+            with open(f'{topology}/physical_package_id', 'r') as file:
+                package = file.read().strip()
+            with open(f'{topology}/core_id', 'r') as file:
+                core = file.read().strip()
+        except OSError:
+            package, core = '', str(cpu)  # unknown topology: each CPU is a core
+        cores.setdefault((package, core), []).append(cpu)
+    return list(cores.values())
+
+
+def get_core_sets(slots: int, idle_siblings: bool = False) -> list[list[int]]:
+    """A dedicated set of CPUs for each parallel slot.
+
+    Each slot gets one CPU. With idle_siblings, each slot gets one CPU of its
+    own physical core, and the hyperthread siblings of that CPU are left idle
+    (they are not given to any slot).
+    """
+    cores = get_physical_cores()
+    cpus = [core[0] for core in cores] if idle_siblings else [cpu for core in cores for cpu in core]
+    if slots > len(cpus):
+        raise ValueError(f'Not enough {"physical cores" if idle_siblings else "CPUs"} for {slots} pinned slots ({len(cpus)} available).')
+    return [[cpu] for cpu in cpus[:slots]]
+
+
+def pinned_command(command: list[str], cpus: list[int]) -> list[str]:
+    """The command run by taskset, pinned to the CPUs from its start.
+
+    Pinning before exec (instead of pinning the PID after Popen) also pins the
+    threads the program starts (e.g., the JVM), and the program sees only
+    these CPUs when it sizes its thread pools. taskset is used instead of
+    Popen's preexec_fn, which may deadlock the child when the runner has
+    other threads (the slots).
+    """
+    return ['taskset', '-c', ','.join(str(cpu) for cpu in cpus), *command]
+
+
+def pin_runner(core_sets: list[list[int]]) -> None:
+    """Keep this process (the runner) off the CPUs of the slots, if there are other CPUs (and their siblings) left."""
+    used = {cpu for cpus in core_sets for cpu in cpus}
+    reserved = {cpu for core in get_physical_cores() if used & set(core) for cpu in core}
+    others = os.sched_getaffinity(0) - reserved
+    if others:
+        os.sched_setaffinity(0, others)
+
+
+class CoreSetPool:
+    """Hand out the core sets of the slots to the processes that run at the same time."""
+
+    def __init__(self, core_sets: list[list[int]]) -> None:
+        self.free: queue.Queue = queue.Queue()
+        for cpus in core_sets:
+            self.free.put(cpus)
+
+    @contextmanager
+    def acquire(self) -> Iterator[list[int]]:
+        cpus = self.free.get()
+        try:
+            yield cpus
+        finally:
+            self.free.put(cpus)
+
+
+@dataclass
+class ProcessCounters:
+    """Context switches and CPU migrations of a process, the signs of interference with a measurement."""
+
+    voluntary_switches: int = 0
+    involuntary_switches: int = 0  # preemptions: another process wanted the CPU
+    migrations: int = 0  # moves to another CPU (0 if pinned to a single CPU)
+
+    def __sub__(self, other: 'ProcessCounters') -> 'ProcessCounters':
+        return ProcessCounters(self.voluntary_switches - other.voluntary_switches,
+                               self.involuntary_switches - other.involuntary_switches,
+                               self.migrations - other.migrations)
+
+    @staticmethod
+    def of_self() -> 'ProcessCounters':
+        """Counters of this process: context switches (getrusage) and migrations of all its threads."""
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return ProcessCounters(usage.ru_nvcsw, usage.ru_nivcsw, read_migrations('self'))
+
+    @staticmethod
+    def of_process(pid: int) -> Optional['ProcessCounters']:
+        """Context switches of the main thread and migrations of all threads of a running process (/proc/<pid>), or None if it is gone."""
+        counters = ProcessCounters()
+        try:
+            with open(f'/proc/{pid}/status', 'r') as file:
+                for line in file:
+                    if line.startswith('voluntary_ctxt_switches:'):
+                        counters.voluntary_switches = int(line.split()[1])
+                    elif line.startswith('nonvoluntary_ctxt_switches:'):
+                        counters.involuntary_switches = int(line.split()[1])
+        except OSError:
+            return None
+        counters.migrations = read_migrations(pid)
+        return counters
+
+
+def read_migrations(pid: Union[int, str]) -> int:
+    """CPU migrations of the running threads of a process (0 if the kernel does not expose them).
+
+    The main thread of some programs (e.g., the java launcher) is idle, so
+    the migrations are summed over /proc/<pid>/task/*/sched.
+    """
+    try:
+        threads = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return 0
+    migrations = 0
+    for thread in threads:
+        try:
+            with open(f'/proc/{pid}/task/{thread}/sched', 'r') as file:
+                for line in file:
+                    if line.startswith('se.nr_migrations'):
+                        migrations += int(line.split(':')[1])
+                        break
+        except (OSError, ValueError):
+            continue  # the thread exited, or the kernel does not expose it
+    return migrations
+
+
+def run_pinned(command: list[str], cpus: list[int], timeout: Optional[float] = None) -> tuple[str, ProcessCounters]:
+    """Run the command pinned to the CPUs, returning its output and counters.
+
+    The context switches come from the resource usage of the finished process
+    (wait4), and the migrations from the last sample of its threads (read_migrations)
+    taken while it runs. The output goes to a temporary file, so that the
+    process never blocks on a full pipe while it is polled.
+    """
+    with tempfile.TemporaryFile() as output:
+        process = subprocess.Popen(pinned_command(command, cpus), stdout=output)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        migrations = 0
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid != 0:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                process.kill()
+                os.wait4(process.pid, 0)
+                process.returncode = -9
+                raise subprocess.TimeoutExpired(command, timeout)
+            migrations = max(migrations, read_migrations(process.pid))
+            time.sleep(SCHED_POLL_SECONDS)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        output.seek(0)
+        return (output.read().decode('utf8', errors='replace'), ProcessCounters(usage.ru_nvcsw, usage.ru_nivcsw, migrations))
+
+
+@dataclass
+class VarianceCheck:
+    """Flag the runs whose time deviates from the median of the other runs of the same model and solver."""
+
+    threshold: float = RERUN_THRESHOLD
+    min_runs: int = MIN_RUNS
+    min_seconds: float = MIN_NOISE_SECONDS
+    max_reruns: int = MAX_RERUNS
+
+    def deviation(self, seconds: float, others: list[float]) -> Optional[float]:
+        """Relative deviation of the run from the median of the others, or None if it cannot be judged."""
+        if len(others) < self.min_runs:
+            return None
+        median = statistics.median(others)
+        if max(median, seconds) < self.min_seconds or median <= 0:
+            return None
+        return abs(seconds - median) / median
+
+    def is_noisy(self, seconds: float, others: list[float]) -> bool:
+        deviation = self.deviation(seconds, others)
+        return deviation is not None and deviation > self.threshold
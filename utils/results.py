@@ -0,0 +1,52 @@
+from typing import Iterator, Optional
+from dataclasses import dataclass
+
+
+@dataclass
+class ResultRow:
+    """A 'Model;Tool;SAT-solver;[Cores;Deads;]Seconds' row of a results file."""
+
+    model: str
+    tool: str
+    solver: str
+    seconds: Optional[float]  # None for timeouts
+    core: Optional[int] = None
+    dead: Optional[int] = None
+
+    @property
+    def timeout(self) -> bool:
+        return self.seconds is None
+
+
+def parse_result_row(line: str) -> Optional[ResultRow]:
+    """Parse a row of a results file, or return None for headers, malformed rows and rows without a measured time (e.g., 'resumed').
+
+    Timeout rows written as a Python list repr (e.g., "['eb40;Flama;minisat22;-1;-1;timeout']")
+    are also accepted.
+    """
+    line = line.strip()
+    if line.startswith("['") and line.endswith("']"):
+        line = line[2:-2]
+    values = line.split(';')
+    if len(values) not in (4, 6) or values[0] == 'Model':
+        return None
+    model, tool, solver = values[:3]
+    core = dead = None
+    try:
+        if len(values) == 6:
+            core, dead = int(values[3]), int(values[4])
+        seconds = None if values[-1] == 'timeout' else float(values[-1])
+    except ValueError:
+        return None
+    if seconds is None:
+        core = dead = None
+    return ResultRow(model, tool, solver, seconds, core, dead)
+
+
+def read_results(filepath: str) -> Iterator[ResultRow]:
+    """Iterate the valid rows of a results file."""
+    with open(filepath, 'r', encoding='utf8') as file:
+        for line in file:
+            row = parse_result_row(line)
+            if row is not None:
+                yield row
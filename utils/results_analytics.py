@@ -0,0 +1,202 @@
+import os
+import csv
+import json
+import codecs
+from typing import Any, Iterator, Optional
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from utils.results import ResultRow, parse_result_row
+
+
+BASELINE_SOLVER = 'sat4j'
+CHUNK_BYTES = 1 << 20  # bytes of a results file decoded and parsed at a time
+SNIFF_BYTES = 4096  # bytes read to detect the encoding of a file without BOM
+SUMMARY_COLUMNS = ['model', 'tool', 'solver', 'runs', 'timeouts', 'median', 'min', 'speedup']
+
+
+def detect_encoding(filepath: str) -> str:
+    """Encoding of a results file or terminal log: UTF-16 (e.g., redirected output on Windows) or UTF-8.
+
+    The BOM is used if present. Without BOM, UTF-16 is detected from the NUL
+    bytes of its ASCII characters.
+    """
+    with open(filepath, 'rb') as file:
+        head = file.read(SNIFF_BYTES)
+    if head.startswith(codecs.BOM_UTF16_LE):
+        return 'utf-16-le'
+    if head.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16-be'
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if len(head) >= 2 and head.count(0) > len(head) // 4:
+        return 'utf-16-le' if head[1::2].count(0) > head[0::2].count(0) else 'utf-16-be'
+    return 'utf-8'
+
+
+def _bom_length(encoding: str) -> int:
+    return {'utf-16-le': len(codecs.BOM_UTF16_LE), 'utf-16-be': len(codecs.BOM_UTF16_BE), 'utf-8-sig': len(codecs.BOM_UTF8)}.get(encoding, 0)
+
+
+def _last_line_end(data: bytes, newline: bytes, unit: int) -> int:
+    """Position after the last newline of the data aligned to the code unit of the encoding, or 0 if there is none."""
+    end = data.rfind(newline)
+    while end >= 0 and end % unit:
+        end = data.rfind(newline, 0, end)
+    return end + len(newline) if end >= 0 else 0
+
+
+def stream_rows(filepath: str, offset: int = 0, encoding: Optional[str] = None) -> Iterator[tuple[list[ResultRow], int]]:
+    """Valid result rows of a file from the byte offset, in chunks of lines, with the byte offset after each chunk.
+
+    The file is decoded in chunks of complete lines, so that only the rows
+    appended after the offset are parsed (the results are appended a whole line
+    at a time, so a last line without newline is taken as complete). Other
+    lines (e.g., logs, headers or malformed rows) are skipped; timeouts are
+    kept as rows without seconds.
+    """
+    encoding = encoding or detect_encoding(filepath)
+    codec = encoding.replace('-sig', '')
+    unit = 2 if encoding.startswith('utf-16') else 1
+    newline = '\n'.encode(codec)
+    offset = max(offset, _bom_length(encoding))
+    with open(filepath, 'rb') as file:
+        file.seek(offset)
+        pending = b''
+        while True:
+            chunk = file.read(CHUNK_BYTES)
+            data = pending + chunk
+            end = _last_line_end(data, newline, unit) if chunk else len(data) - len(data) % unit
+            pending = data[end:]
+            if end > 0:
+                offset += end
+                lines = data[:end].decode(codec, errors='replace').splitlines()
+                rows = [parse_result_row(line) for line in lines if ';' in line]
+                yield ([row for row in rows if row is not None], offset)
+            if not chunk:
+                break
+
+
+@dataclass
+class ResultsAggregates:
+    """Runs of several results files, kept as arrays to aggregate them per (model, tool, solver).
+
+    The offset parsed of each file is kept, so updating the aggregates only
+    parses the rows appended since the last update (files that shrank or were
+    replaced are parsed again from the start). It can be saved to and loaded
+    from a .npz file between sessions.
+    """
+
+    keys: list[tuple[str, str, str]] = field(default_factory=list)  # (model, tool, solver) of each group
+    groups: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))  # group of each run
+    seconds: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float64))  # NaN for timeouts
+    sources: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))  # file of each run
+    files: list[dict[str, Any]] = field(default_factory=list)  # path, encoding, offset and size of each file
+
+    def update(self, filepaths: list[str]) -> int:
+        """Parse the rows appended to the files since the last update, and return their number."""
+        key_index = {key: i for i, key in enumerate(self.keys)}
+        file_index = {file['path']: i for i, file in enumerate(self.files)}
+        groups, seconds, sources = [], [], []
+        for filepath in filepaths:
+            path = os.path.abspath(filepath)
+            if path not in file_index:
+                file_index[path] = len(self.files)
+                self.files.append({'path': path, 'encoding': detect_encoding(filepath), 'offset': 0, 'size': 0})
+            source = file_index[path]
+            file = self.files[source]
+            size = os.path.getsize(filepath)
+            if size < file['size']:  # truncated or replaced: forget its runs and parse it again
+                keep = self.sources != source
+                self.groups, self.seconds, self.sources = self.groups[keep], self.seconds[keep], self.sources[keep]
+                file.update({'encoding': detect_encoding(filepath), 'offset': 0})
+            for rows, offset in stream_rows(filepath, file['offset'], file['encoding']):
+                for row in rows:
+                    key = (row.model, row.tool, row.solver)
+                    if key not in key_index:
+                        key_index[key] = len(self.keys)
+                        self.keys.append(key)
+                    groups.append(key_index[key])
+                    seconds.append(np.nan if row.timeout else row.seconds)
+                    sources.append(source)
+                file['offset'] = offset
+            file['size'] = size
+        self.groups = np.concatenate([self.groups, np.asarray(groups, dtype=np.int32)])
+        self.seconds = np.concatenate([self.seconds, np.asarray(seconds, dtype=np.float64)])
+        self.sources = np.concatenate([self.sources, np.asarray(sources, dtype=np.int32)])
+        return len(groups)
+
+    def summary(self, baseline: str = BASELINE_SOLVER) -> list[dict[str, Any]]:
+        """Runs, timeouts, median and min seconds of each (model, tool, solver), and its speedup over the baseline solver.
+
+        The median and min are of the runs without timeout (None if all runs
+        timed out). The speedup is the median of the baseline solver for the
+        model divided by the median of the group.
+        """
+        n_groups = len(self.keys)
+        timeout = np.isnan(self.seconds)
+        runs = np.bincount(self.groups, minlength=n_groups)
+        timeouts = np.bincount(self.groups[timeout], minlength=n_groups)
+        # Runs with time sorted by group and seconds: the median and min of each group are at fixed positions of its segment
+        groups, seconds = self.groups[~timeout], self.seconds[~timeout]
+        order = np.lexsort((seconds, groups))
+        groups, seconds = groups[order], seconds[order]
+        counts = np.bincount(groups, minlength=n_groups)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        timed = counts > 0
+        medians = np.full(n_groups, np.nan)
+        minimums = np.full(n_groups, np.nan)
+        low = starts[timed] + (counts[timed] - 1) // 2
+        high = starts[timed] + counts[timed] // 2
+        medians[timed] = (seconds[low] + seconds[high]) / 2
+        minimums[timed] = seconds[starts[timed]]
+        baseline_medians = {key[0]: median for key, median in zip(self.keys, medians) if key[2].lower() == baseline.lower()}
+        rows = []
+        for i, (model, tool, solver) in enumerate(self.keys):
+            baseline_median = baseline_medians.get(model, np.nan)
+            speedup = baseline_median / medians[i] if medians[i] > 0 else np.nan
+            rows.append({'model': model, 'tool': tool, 'solver': solver, 'runs': int(runs[i]), 'timeouts': int(timeouts[i]),
+                         'median': _round(medians[i]), 'min': _round(minimums[i]), 'speedup': _round(speedup)})
+        return sorted(rows, key=lambda row: (row['model'], row['tool'], row['solver']))
+
+    def save(self, filepath: str) -> None:
+        # Write to a temporary file and rename, so an interrupted save keeps the previous aggregates
+        with open(filepath + '.tmp', 'wb') as file:
+            np.savez_compressed(file, groups=self.groups, seconds=self.seconds, sources=self.sources,
+                                keys=np.array(json.dumps(self.keys)), files=np.array(json.dumps(self.files)))
+        os.replace(filepath + '.tmp', filepath)
+
+    @staticmethod
+    def load(filepath: str) -> 'ResultsAggregates':
+        with np.load(filepath) as data:
+            return ResultsAggregates(keys=[tuple(key) for key in json.loads(str(data['keys']))],
+                                     groups=data['groups'], seconds=data['seconds'], sources=data['sources'],
+                                     files=json.loads(str(data['files'])))
+
+
+def _round(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def solver_summary(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Totals of each (tool, solver): models, runs, timeouts, sum of the medians and geometric mean of the speedups."""
+    by_solver: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    for row in rows:
+        by_solver.setdefault((row['tool'], row['solver']), []).append(row)
+    totals = []
+    for (tool, solver), solver_rows in sorted(by_solver.items()):
+        speedups = np.array([row['speedup'] for row in solver_rows if row['speedup']], dtype=np.float64)
+        totals.append({'tool': tool, 'solver': solver, 'models': len(solver_rows),
+                       'runs': sum(row['runs'] for row in solver_rows),
+                       'timeouts': sum(row['timeouts'] for row in solver_rows),
+                       'median_sum': round(sum(row['median'] for row in solver_rows if row['median'] is not None), 4),
+                       'speedup_geomean': round(float(np.exp(np.log(speedups).mean())), 4) if speedups.size else None})
+    return totals
+
+
+def write_summary(filepath: str, rows: list[dict[str, Any]]) -> None:
+    with open(filepath, 'w', encoding='utf8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_COLUMNS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)